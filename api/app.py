@@ -1,6 +1,8 @@
-from flask import Flask, request, jsonify, render_template, session
+from flask import Flask, Blueprint, request, jsonify, render_template, session, g, Response, stream_with_context
+import json
 from flask_cors import CORS
 import uuid
+import time
 import logging
 from datetime import datetime
 import sys
@@ -8,62 +10,197 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from config.config import Config
-from database.db_manager import DatabaseManager
-from models.knowledge_builder import KnowledgeBuilder
-
-# 导入AI客户端类
-DeepSeekClient = None
-HuggingFaceClient = None
-
-# 尝试导入AI客户端，优先使用DeepSeek
-try:
-    from models.deepseek_client import DeepSeekClient
-    ai_client = DeepSeekClient()
-    print("Using DeepSeek API")
-except ImportError:
-    try:
-        from models.huggingface_client import HuggingFaceClient
-        ai_client = HuggingFaceClient()
-        print("Using HuggingFace API (Free)")
-    except:
-        ai_client = None
-        print("Warning: No AI client available")
-
-app = Flask(__name__, 
-            template_folder='../web/templates',
-            static_folder='../web/static')
-app.config['SECRET_KEY'] = Config.SECRET_KEY
-CORS(app)
-
-# 配置日志
-logging.basicConfig(
-    level=getattr(logging, Config.LOG_LEVEL),
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+from api.chat_service import (build_reference, knowledge_fallback, load_school_context, split_ranked,
+                              FAILED_ANSWER, NO_AI_ANSWER)
+from api.services import Services
+from utils.load_control import ConcurrencyLimiter, KeyedRateLimiter
+from utils import tracing
+from utils.logging_setup import setup_logging, set_request_id, get_logging_stats
+
 logger = logging.getLogger(__name__)
 
-# 初始化组件
-db = DatabaseManager()
-knowledge_builder = KnowledgeBuilder()
+bp = Blueprint('api', __name__)
+
+# 数据库、检索、大模型等组件首次使用时创建，导入本模块没有副作用
+services = Services()
+
+# 聊天接口准入控制：限制同时调用大模型的请求数，并按会话/IP限速
+chat_limiter = ConcurrencyLimiter(Config.CHAT_MAX_CONCURRENT, Config.CHAT_MAX_QUEUE, Config.CHAT_QUEUE_TIMEOUT)
+session_rate_limiter = KeyedRateLimiter(Config.CHAT_SESSION_RATE, Config.CHAT_SESSION_BURST)
+ip_rate_limiter = KeyedRateLimiter(Config.CHAT_IP_RATE, Config.CHAT_IP_BURST)
+
+# 预热完成的时间，未预热时为None
+warm_state = {'completed_at': None}
+
+def create_app() -> Flask:
+    """创建Flask应用，依赖的组件在首次请求或warm_up时初始化"""
+    app = Flask(__name__,
+                template_folder='../web/templates',
+                static_folder='../web/static')
+    app.config['SECRET_KEY'] = Config.SECRET_KEY
+    CORS(app)
+    # 配置日志（异步队列写入）
+    setup_logging()
+    app.register_blueprint(bp)
+    return app
+
+def warm_up():
+    """预加载分词词典、检索索引快照、查询词表、预生成答案等只读数据，并创建全部组件
+
+    生产模式下在gunicorn主进程中调用，fork出的worker以写时复制方式共享这些内存；
+    索引快照是只读文件映射，各worker直接共享同一份页缓存。
+    """
+    try:
+        import jieba
+        jieba.initialize()
+        services.db.reconcile_statistics()
+        stats = services.db.get_statistics_snapshot()
+        logger.info(f"Database initialized with {stats.get('total_pages', 0)} pages and "
+                    f"{stats.get('knowledge_entries', 0)} knowledge entries")
+        services.db.load_index_snapshot()
+        services.initialize()
+        services.admission_fast_path.matcher.refresh()
+        services.precomputed_answers.lookup('')
+        warm_state['completed_at'] = datetime.now()
+        logger.info("Application warm-up completed")
+    except Exception as e:
+        logger.error(f"Warm-up error: {e}")
+
+def history_version(session_id: str):
+    """cookie会话最后一轮的标识；通过请求参数传入session_id的会话无法校验，返回None"""
+    if session.get('session_id') == session_id:
+        return session.get('last_turn', '')
+    return None
+
+def get_history(session_id: str, limit: int = 3) -> list:
+    """获取最近几轮对话，优先读取进程内缓存，未命中时查询数据库"""
+    version = history_version(session_id)
+    history = services.session_history.get(session_id, limit, version)
+    if history is None:
+        rows = services.db.get_recent_qa_history(session_id, limit=Config.SESSION_HISTORY_TURNS)
+        services.session_history.load(session_id, rows, version)
+        history = rows[:limit]
+    return history
+
+def save_history(session_id: str, question: str, result: dict):
+    """保存问答记录，并计入热门问题统计和会话缓存"""
+    services.db.save_qa_history(
+        session_id=session_id,
+        question=question,
+        answer=result['answer'],
+        source=result['source'],
+        response_time=result['response_time']
+    )
+    services.hot_question_tracker.record(question)
+
+    version = None
+    if history_version(session_id) is not None:
+        version = uuid.uuid4().hex[:8]
+        session['last_turn'] = version
+    services.session_history.append(session_id, {
+        'user_question': question,
+        'system_answer': result['answer'],
+        'answer_source': result['source'],
+        'response_time_ms': result['response_time'],
+        'create_time': datetime.now()
+    }, version)
+
+# 降级计数（近似值，不加锁）
+load_counters = {'shed_to_knowledge_base': 0, 'shed_unavailable': 0}
+
+def get_load_stats() -> dict:
+    """准入控制指标：排队深度、降级与限流次数"""
+    stats = chat_limiter.get_stats()
+    stats['shed_to_knowledge_base'] = load_counters['shed_to_knowledge_base']
+    stats['shed_unavailable'] = load_counters['shed_unavailable']
+    stats['rate_limited'] = {
+        'session': session_rate_limiter.get_stats(),
+        'ip': ip_rate_limiter.get_stats()
+    }
+    return stats
+
+def busy_response(message: str, status: int, retry_after: float):
+    """限流/过载响应，带Retry-After头"""
+    response = jsonify({'error': message, 'retry_after': retry_after})
+    response.status_code = status
+    response.headers['Retry-After'] = str(max(1, int(retry_after + 0.999)))
+    return response
+
+def admin_authorized() -> bool:
+    """管理接口的简单认证"""
+    return request.headers.get('Authorization') == f"Bearer {Config.SECRET_KEY}"
+
+@bp.before_app_request
+def begin_trace():
+    # 请求ID写入本次请求的所有日志，沿用上游传入的X-Request-ID
+    g.request_id = request.headers.get('X-Request-ID') or uuid.uuid4().hex[:12]
+    set_request_id(g.request_id)
+    g.trace = tracing.start_trace()
+
+@bp.after_app_request
+def end_trace(response):
+    """写入分阶段耗时指标，并通过Server-Timing头返回本次请求的阶段耗时"""
+    trace = g.pop('trace', None)
+    if trace is not None:
+        # 指标标签沿用不带蓝图前缀的端点名
+        endpoint = request.endpoint.rpartition('.')[2] if request.endpoint else None
+        response.headers['Server-Timing'] = tracing.finish_trace(trace, endpoint, response.status_code)
+    if 'request_id' in g:
+        response.headers['X-Request-ID'] = g.request_id
+    return response
+
+@bp.teardown_app_request
+def clear_request_id(exc):
+    set_request_id(None)
+
+@bp.route('/healthz')
+def liveness():
+    """存活检查：进程能处理请求即返回200，不访问任何依赖"""
+    return jsonify({'status': 'ok'})
+
+@bp.route('/readyz')
+def readiness():
+    """就绪检查：数据库可查询时返回200，否则返回503；同时报告索引快照和预热状态"""
+    checks = {}
+    start = time.perf_counter()
+    try:
+        # execute_query出错时记录日志并返回空列表
+        checks['database'] = {'ok': bool(services.db.execute_query("SELECT 1 AS ok"))}
+    except Exception as e:
+        checks['database'] = {'ok': False, 'error': str(e)}
+    checks['database']['ms'] = round((time.perf_counter() - start) * 1000, 2)
+
+    snapshot = services.db.get_index_snapshot()
+    checks['index_snapshot'] = {'ok': snapshot is not None}
+    if snapshot is not None:
+        checks['index_snapshot']['created'] = snapshot.header['created']
+
+    ready = checks['database']['ok']
+    return jsonify({
+        'status': 'ready' if ready else 'unavailable',
+        'checks': checks,
+        'warmed_up': warm_state['completed_at'].isoformat() if warm_state['completed_at'] else None,
+        'init_ms': services.init_ms
+    }), 200 if ready else 503
 
-# 测试数据库连接
-try:
-    stats = db.get_statistics()
-    logger.info(f"Database initialized with {stats.get('total_pages', 0)} pages and {stats.get('knowledge_entries', 0)} knowledge entries")
-except Exception as e:
-    logger.error(f"Database initialization error: {e}")
+@bp.route('/metrics')
+def metrics():
+    """Prometheus指标"""
+    if not tracing.PROMETHEUS_AVAILABLE:
+        return jsonify({'error': '未安装prometheus_client'}), 501
+    payload, content_type = tracing.metrics_payload()
+    return Response(payload, content_type=content_type)
 
-@app.route('/')
+@bp.route('/')
 def index():
     """主页"""
     return render_template('index.html')
 
-@app.route('/api/chat', methods=['POST'])
+@bp.route('/api/chat', methods=['POST'])
 def chat():
     """聊天接口"""
-    print("[FLASK] Chat endpoint被访问")
-    logger.info(">>> CHAT ENDPOINT HIT! <<<")
     try:
+        llm_router = services.llm_router
         data = request.json
         # 兼容前端发送的message或question参数
         question = data.get('question', data.get('message', '')).strip()
@@ -77,115 +214,129 @@ def chat():
         if not session_id:
             if 'session_id' not in session:
                 session['session_id'] = str(uuid.uuid4())
+                session['last_turn'] = ''
+                services.session_history.start(session['session_id'], '')
             session_id = session['session_id']
         
-        # 1. 从知识库搜索相关内容
-        logger.info(f"Searching knowledge base for: {question}")
-        knowledge_results = db.get_knowledge_base(question, limit=5)
-        logger.info(f"Knowledge base returned {len(knowledge_results)} results")
+        # 按会话和IP限速
+        wait = max(session_rate_limiter.acquire(session_id), ip_rate_limiter.acquire(request.remote_addr))
+        if wait > 0:
+            return busy_response('提问过于频繁，请稍后再试', 429, wait)
         
-        # 2. 搜索相关页面
-        page_results = db.search_pages(question, limit=3)
+        # 0. 分数线类问题直接查询招生数据，跳过知识库检索和大模型
+        with tracing.span('fast_path'):
+            fast_result = services.admission_fast_path.answer(question)
+        if fast_result:
+            tracing.set_source(fast_result['source'])
+            save_history(session_id, question, fast_result)
+            return jsonify({
+                'answer': fast_result['answer'],
+                'source': fast_result['source'],
+                'confidence': fast_result['confidence'],
+                'response_time': fast_result['response_time'],
+                'similar_questions': [
+                    "学校的招生专业有哪些？",
+                    "如何查询录取结果？",
+                    "学校的招生政策是什么？"
+                ],
+                'references': [{
+                    'title': '历年分数',
+                    'url': 'https://zs.hljeu.edu.cn/lnfs/list.htm',
+                    'snippet': '黑龙江东方学院历年录取分数'
+                }]
+            })
         
-        # 3. 获取最相关页面的完整内容
-        page_content = ""
-        if page_results:
-            # 获取最相关页面的完整内容
-            most_relevant_url = page_results[0]['url']
-            full_page_query = "SELECT content FROM crawled_pages WHERE url = %s"
-            full_page_result = db.execute_query(full_page_query, (most_relevant_url,))
-            if full_page_result:
-                page_content = full_page_result[0]['content']
-                logger.info(f"Found page content for {most_relevant_url}: {len(page_content)} chars")
+        # 0.1 热门问题使用后台任务预生成的答案，跳过检索和大模型
+        with tracing.span('precomputed'):
+            precomputed = services.precomputed_answers.lookup(question)
+        if precomputed:
+            result = dict(precomputed, response_time=0)
+            tracing.set_source(result['source'])
+            save_history(session_id, question, result)
+            return jsonify({
+                'answer': result['answer'],
+                'source': result['source'],
+                'confidence': result['confidence'],
+                'response_time': result['response_time'],
+                'similar_questions': result['similar_questions'] or [
+                    "学校有哪些特色专业？",
+                    "如何报考黑龙江东方学院？",
+                    "学校的地理位置在哪里？"
+                ],
+                'references': result['references'],
+                'kb_version': result['kb_version'],
+                'generated_at': result['generated_at']
+            })
         
-        # 4. 获取历史对话
-        history = db.get_recent_qa_history(session_id, limit=3)
+        # 大模型名额的排队已满时提前降级：只查询一次知识库用于降级答案，不再检索段落、页面和历史
+        shed_early = bool(llm_router) and chat_limiter.saturated()
+        if shed_early:
+            knowledge_results = services.db.get_knowledge_base(question, limit=3)
+            passages, page_results, history = [], [], []
+        else:
+            # 1. 从知识库和页面段落检索候选，统一重排
+            knowledge_results, passages = split_ranked(services.reranker.retrieve(question))
+            logger.debug(f"Reranked {len(knowledge_results)} knowledge entries and {len(passages)} passages for: {question}")
+            
+            # 2. 搜索相关页面
+            page_results = services.db.search_pages(question, limit=3)
+            
+            # 3. 获取历史对话
+            history = get_history(session_id, limit=3)
         
-        # 5. 强制使用DeepSeek生成智能答案（不管知识库是否有匹配）
-        if ai_client:
+        # 4. 使用大模型生成智能答案（不管知识库是否有匹配）
+        # 调用大模型前先申请并发名额，过载时直接用知识库答案降级，没有则返回503
+        similar_questions = []
+        if llm_router and (shed_early or not chat_limiter.acquire()):
+            result = knowledge_fallback(knowledge_results, 'knowledge_base_shed')
+            if result is None:
+                load_counters['shed_unavailable'] += 1
+                return busy_response('当前咨询人数较多，请稍后再试', 503, Config.CHAT_RETRY_AFTER)
+            load_counters['shed_to_knowledge_base'] += 1
+        elif llm_router:
             try:
-                logger.info(f"*** FORCING DeepSeek API call for question: {question} ***")
-                
-                # 获取更多相关信息
-                additional_info = []
+                # 参考内容：最相关的页面段落和school_info表中的学校信息
+                reference = build_reference(passages, load_school_context(services.db))
                 
-                # 从school_info表获取相关信息
-                school_info_query = "SELECT info_key, info_value FROM school_info WHERE info_value IS NOT NULL"
-                school_info = db.execute_query(school_info_query)
-                for info in school_info:
-                    additional_info.append(f"{info['info_key']}: {info['info_value']}")
-                
-                context_info = "\n".join(additional_info)
-                logger.info(f"Added school info context: {len(additional_info)} items")
-                
-                # 强制使用DeepSeek来生成智能回答，传递页面内容
-                if isinstance(ai_client, DeepSeekClient):
-                    logger.info("*** Calling DeepSeek API with context ***")
-                    result = ai_client.answer_with_context(question, knowledge_results, history, context_info)
-                    logger.info(f"*** DeepSeek API returned result with source: {result['source']} ***")
-                else:
-                    logger.info("*** Using non-DeepSeek client ***")
-                    result = ai_client.answer_with_context(question, knowledge_results, history)
-                
-                # 强制设置source为deepseek相关，确保不使用knowledge_base
-                if result.get('source') == 'knowledge_base':
-                    result['source'] = 'deepseek_fallback'
-                    logger.warning("*** Result source was knowledge_base, changed to deepseek_fallback ***")
+                # 由路由选择可用的服务生成回答，所有服务失败或熔断时返回None
+                with tracing.span('llm'):
+                    result = llm_router.answer(question, knowledge_results, history, reference)
+                if result:
+                    logger.info(f"LLM answered by {result['provider']} (hedged: {result['hedged']})")
+                    # 5. 相关问题推荐同样调用大模型，在同一并发名额内完成
+                    with tracing.span('similar_questions'):
+                        similar_questions = llm_router.generate_similar_questions(question)
                 
             except Exception as e:
-                logger.error(f"*** AI client failed with error: {str(e)} ***")
                 import traceback
-                logger.error(f"*** Full error traceback: {traceback.format_exc()} ***")
-                
-                # AI失败时回退到知识库
-                if knowledge_results:
-                    best_result = max(knowledge_results, key=lambda x: x.get('relevance', 0))
-                    result = {
-                        'answer': best_result['answer'],
-                        'source': 'knowledge_base_fallback',
-                        'response_time': 0,
-                        'confidence': best_result.get('confidence_score', 0.7)
-                    }
-                else:
-                    result = {
-                        'answer': '抱歉，系统暂时无法处理您的问题。请稍后重试。',
-                        'source': 'error',
-                        'response_time': 0,
-                        'confidence': 0
-                    }
-        else:
-            logger.error("AI client is None - this should not happen!")
-            # 如果没有AI客户端，使用纯知识库模式
-            if knowledge_results:
-                best_result = max(knowledge_results, key=lambda x: x.get('relevance', 0))
-                result = {
-                    'answer': best_result['answer'],
-                    'source': 'knowledge_base_no_ai',
+                logger.error(f"LLM router failed: {str(e)}\n{traceback.format_exc()}")
+                result = None
+            finally:
+                chat_limiter.release()
+            
+            # AI失败时回退到知识库
+            if result is None:
+                result = knowledge_fallback(knowledge_results, 'knowledge_base_fallback') or {
+                    'answer': FAILED_ANSWER,
+                    'source': 'error',
                     'response_time': 0,
-                    'confidence': best_result.get('confidence_score', 0.7)
-                }
-            else:
-                result = {
-                    'answer': '抱歉，暂时找不到相关信息。建议您访问学校官网 https://www.hljeu.edu.cn 查询。',
-                    'source': 'default',
-                    'response_time': 0,
-                    'confidence': 0.3
+                    'confidence': 0
                 }
+        else:
+            # 如果没有AI客户端，使用纯知识库模式
+            result = knowledge_fallback(knowledge_results, 'knowledge_base_no_ai') or {
+                'answer': NO_AI_ANSWER,
+                'source': 'default',
+                'response_time': 0,
+                'confidence': 0.3
+            }
         
         # 6. 保存问答记录
-        db.save_qa_history(
-            session_id=session_id,
-            question=question,
-            answer=result['answer'],
-            source=result['source'],
-            response_time=result['response_time']
-        )
+        tracing.set_source(result['source'])
+        save_history(session_id, question, result)
         
-        # 7. 生成相关问题推荐
-        if ai_client and hasattr(ai_client, 'generate_similar_questions'):
-            similar_questions = ai_client.generate_similar_questions(question)
-        else:
-            # 默认推荐问题
+        if not similar_questions:
+            # 降级、大模型失败或未配置大模型时使用默认推荐问题
             similar_questions = [
                 "学校有哪些特色专业？",
                 "如何报考黑龙江东方学院？",
@@ -218,7 +369,47 @@ def chat():
         logger.error(f"Chat error: {str(e)}\n{error_detail}")
         return jsonify({'error': '系统错误，请稍后重试', 'detail': str(e)}), 500
 
-@app.route('/api/feedback', methods=['POST'])
+@bp.route('/api/chat/batch', methods=['POST'])
+def chat_batch():
+    """批量问答（需要管理员权限），结果按完成顺序以JSON Lines流式返回"""
+    try:
+        if not admin_authorized():
+            return jsonify({'error': '未授权'}), 401
+        
+        # 支持JSON {"questions": [...]}，或纯文本每行一个问题
+        if request.is_json:
+            questions = (request.json or {}).get('questions') or []
+        else:
+            questions = request.get_data(as_text=True).splitlines()
+        questions = [q for q in questions if isinstance(q, str) and q.strip()]
+        
+        if not questions:
+            return jsonify({'error': '请提供问题列表'}), 400
+        if len(questions) > Config.BATCH_MAX_QUESTIONS:
+            return jsonify({'error': f'单次最多{Config.BATCH_MAX_QUESTIONS}个问题'}), 400
+        running = services.batch_answerer.running
+        if running.locked():
+            return busy_response('已有批量任务在运行，请稍后再试', 429, Config.CHAT_RETRY_AFTER)
+        
+        def generate():
+            # 在生成器内加锁：响应未开始发送就被丢弃（客户端断开、after_request出错）时不会占住锁
+            if not running.acquire(blocking=False):
+                # 与另一个请求同时通过了上面的检查
+                yield json.dumps({'error': '已有批量任务在运行，请稍后再试'}, ensure_ascii=False) + '\n'
+                return
+            try:
+                for item in services.batch_answerer.run(questions):
+                    yield json.dumps(item, ensure_ascii=False, default=str) + '\n'
+            finally:
+                running.release()
+        
+        return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+    
+    except Exception as e:
+        logger.error(f"Batch chat error: {str(e)}")
+        return jsonify({'error': '批量问答失败'}), 500
+
+@bp.route('/api/feedback', methods=['POST'])
 def feedback():
     """用户反馈接口"""
     try:
@@ -229,7 +420,7 @@ def feedback():
         if not qa_id or score not in [1, 2, 3, 4, 5]:
             return jsonify({'error': '参数错误'}), 400
         
-        success = db.update_satisfaction_score(qa_id, score)
+        success = services.db.update_satisfaction_score(qa_id, score)
         
         if success:
             return jsonify({'message': '感谢您的反馈！'})
@@ -240,19 +431,35 @@ def feedback():
         logger.error(f"Feedback error: {str(e)}")
         return jsonify({'error': '系统错误'}), 500
 
-@app.route('/api/statistics')
+@bp.route('/api/statistics')
 def statistics():
     """获取系统统计信息"""
     try:
-        stats = db.get_statistics()
-        logger.info(f"Statistics data: {stats}")
+        stats = dict(services.db.get_statistics_snapshot())
+        stats['fast_path'] = services.admission_fast_path.get_stats()
+        stats['chat_load'] = get_load_stats()
+        stats['logging'] = get_logging_stats()
+        stats['session_history'] = services.session_history.get_stats()
+        stats['precomputed_answers'] = services.precomputed_answers.get_stats()
         return jsonify(stats)
     except Exception as e:
         import traceback
         logger.error(f"Statistics error: {str(e)}\n{traceback.format_exc()}")
         return jsonify({'error': '获取统计信息失败'}), 500
 
-@app.route('/api/search', methods=['GET'])
+@bp.route('/api/llm/health')
+def llm_health():
+    """大模型服务健康状态：熔断状态、失败率、p95延迟及对冲次数"""
+    try:
+        llm_router = services.llm_router
+        if llm_router is None:
+            return jsonify({'providers': {}, 'message': '未配置大模型服务'})
+        return jsonify(llm_router.health())
+    except Exception as e:
+        logger.error(f"LLM health error: {str(e)}")
+        return jsonify({'error': '获取服务状态失败'}), 500
+
+@bp.route('/api/search', methods=['GET'])
 def search():
     """搜索接口"""
     try:
@@ -264,10 +471,10 @@ def search():
             return jsonify({'error': '请输入搜索关键词'}), 400
         
         # 搜索知识库
-        knowledge_results = db.get_knowledge_base(keyword, limit=limit)
+        knowledge_results = services.db.get_knowledge_base(keyword, limit=limit)
         
         # 搜索页面
-        page_results = db.search_pages(keyword, limit=limit)
+        page_results = services.db.search_pages(keyword, limit=limit)
         
         return jsonify({
             'knowledge': knowledge_results,
@@ -278,7 +485,7 @@ def search():
         logger.error(f"Search error: {str(e)}")
         return jsonify({'error': '搜索失败'}), 500
 
-@app.route('/api/categories')
+@bp.route('/api/categories')
 def get_categories():
     """获取分类列表"""
     try:
@@ -289,87 +496,186 @@ def get_categories():
             GROUP BY category
             ORDER BY count DESC
         """
-        categories = db.execute_query(query)
+        categories = services.db.execute_query(query)
         return jsonify(categories)
     
     except Exception as e:
         logger.error(f"Categories error: {str(e)}")
         return jsonify({'error': '获取分类失败'}), 500
 
-@app.route('/api/hot_questions')
+@bp.route('/api/hot_questions')
 def hot_questions():
     """获取热门问题"""
     try:
-        query = """
-            SELECT user_question as question, COUNT(*) as count
-            FROM qa_history
-            WHERE create_time >= DATE_SUB(NOW(), INTERVAL 7 DAY)
-            GROUP BY user_question
-            ORDER BY count DESC
-            LIMIT 10
-        """
-        questions = db.execute_query(query)
+        questions = services.hot_question_tracker.top(10)
         return jsonify(questions)
     
     except Exception as e:
         logger.error(f"Hot questions error: {str(e)}")
         return jsonify({'error': '获取热门问题失败'}), 500
 
-@app.route('/api/admin/crawl', methods=['POST'])
+def parse_admission_filters(args) -> dict:
+    """解析招生数据查询条件"""
+    filters = {}
+    for name in ('province', 'category', 'major', 'batch'):
+        if args.get(name):
+            filters[name] = args.get(name).strip()
+    if args.get('year'):
+        filters['year'] = int(args.get('year'))
+    elif args.get('year_from') or args.get('year_to'):
+        year_from = args.get('year_from')
+        year_to = args.get('year_to')
+        filters['year'] = (int(year_from) if year_from else None, int(year_to) if year_to else None)
+    return filters
+
+def admission_table(args) -> str:
+    table = args.get('table', 'scores')
+    if table not in ('scores', 'plans'):
+        raise ValueError(f"不支持的数据表: {table}")
+    return table
+
+@bp.route('/api/admission/aggregate')
+def admission_aggregate():
+    """招生数据分组聚合"""
+    try:
+        start = time.perf_counter()
+        table = admission_table(request.args)
+        metric = request.args.get('metric', 'min_score' if table == 'scores' else 'plan_count')
+        result = services.admission_analytics.aggregate(
+            table, metric,
+            group_by=request.args.get('group_by') or None,
+            agg=request.args.get('agg', 'mean'),
+            filters=parse_admission_filters(request.args)
+        )
+        return jsonify({'data': result, 'elapsed_us': int((time.perf_counter() - start) * 1e6)})
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Admission aggregate error: {str(e)}")
+        return jsonify({'error': '查询招生数据失败'}), 500
+
+@bp.route('/api/admission/trend')
+def admission_trend():
+    """招生数据历年趋势及同比变化"""
+    try:
+        start = time.perf_counter()
+        table = admission_table(request.args)
+        metric = request.args.get('metric', 'min_score' if table == 'scores' else 'plan_count')
+        result = services.admission_analytics.trend(
+            table, metric,
+            agg=request.args.get('agg', 'mean'),
+            filters=parse_admission_filters(request.args)
+        )
+        return jsonify({'data': result, 'elapsed_us': int((time.perf_counter() - start) * 1e6)})
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Admission trend error: {str(e)}")
+        return jsonify({'error': '查询招生数据失败'}), 500
+
+@bp.route('/api/admission/ranking')
+def admission_ranking():
+    """按省份/专业等维度排名"""
+    try:
+        start = time.perf_counter()
+        table = admission_table(request.args)
+        metric = request.args.get('metric', 'min_score' if table == 'scores' else 'plan_count')
+        result = services.admission_analytics.ranking(
+            table, metric,
+            by=request.args.get('by', 'province'),
+            agg=request.args.get('agg', 'mean'),
+            filters=parse_admission_filters(request.args),
+            ascending=request.args.get('order', 'asc') != 'desc',
+            limit=int(request.args.get('limit', 10))
+        )
+        return jsonify({'data': result, 'elapsed_us': int((time.perf_counter() - start) * 1e6)})
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Admission ranking error: {str(e)}")
+        return jsonify({'error': '查询招生数据失败'}), 500
+
+def submit_job(job_type: str, label: str):
+    """提交后台任务；同类任务已在排队或运行时返回409和该任务"""
+    if not admin_authorized():
+        return jsonify({'error': '未授权'}), 401
+    services.jobs.recover_stale()
+    job, created = services.jobs.enqueue(job_type, 'manual')
+    if job is None:
+        return jsonify({'error': f'提交{label}任务失败'}), 500
+    if not created:
+        return jsonify({'error': f'已有{label}任务在运行', 'job': job}), 409
+    return jsonify({'message': f'{label}任务已提交，由后台任务进程执行', 'job': job}), 202
+
+@bp.route('/api/admin/crawl', methods=['POST'])
 def start_crawl():
-    """启动爬虫（需要管理员权限）"""
+    """提交爬虫任务（需要管理员权限）"""
     try:
-        # 这里应该添加权限验证
-        auth_token = request.headers.get('Authorization')
-        if auth_token != f"Bearer {Config.SECRET_KEY}":  # 简单的认证
-            return jsonify({'error': '未授权'}), 401
-        
-        # 启动爬虫任务（实际应该异步执行）
-        from crawler.spider import HLJEUSpider
-        spider = HLJEUSpider()
-        
-        # 这里应该使用异步任务队列（如Celery）
-        # 现在只是示例
-        import threading
-        thread = threading.Thread(target=spider.start_crawling)
-        thread.start()
-        
-        return jsonify({'message': '爬虫任务已启动'})
-    
+        return submit_job('crawl', '爬虫')
     except Exception as e:
         logger.error(f"Crawl error: {str(e)}")
         return jsonify({'error': '启动爬虫失败'}), 500
 
-@app.route('/api/admin/build_knowledge', methods=['POST'])
+@bp.route('/api/admin/build_knowledge', methods=['POST'])
 def build_knowledge():
-    """构建知识库（需要管理员权限）"""
+    """提交知识库构建任务（需要管理员权限）"""
     try:
-        # 权限验证
-        auth_token = request.headers.get('Authorization')
-        if auth_token != f"Bearer {Config.SECRET_KEY}":
-            return jsonify({'error': '未授权'}), 401
-        
-        # 构建知识库
-        import threading
-        thread = threading.Thread(target=knowledge_builder.build_all)
-        thread.start()
-        
-        return jsonify({'message': '知识库构建已启动'})
-    
+        return submit_job('build_knowledge', '知识库构建')
     except Exception as e:
         logger.error(f"Build knowledge error: {str(e)}")
         return jsonify({'error': '构建知识库失败'}), 500
 
-@app.errorhandler(404)
+@bp.route('/api/admin/precompute_answers', methods=['POST'])
+def precompute_answers():
+    """提交热门问题答案预生成任务（需要管理员权限）"""
+    try:
+        return submit_job('precompute_answers', '答案预生成')
+    except Exception as e:
+        logger.error(f"Precompute answers error: {str(e)}")
+        return jsonify({'error': '提交答案预生成任务失败'}), 500
+
+@bp.route('/api/admin/jobs')
+def list_jobs():
+    """后台任务列表和定时爬取配置（需要管理员权限）"""
+    try:
+        if not admin_authorized():
+            return jsonify({'error': '未授权'}), 401
+        job_type = request.args.get('type')
+        limit = min(max(request.args.get('limit', 20, type=int), 1), 100)
+        from api.worker import JOB_TYPES, crawl_interval_seconds
+        return jsonify({
+            'jobs': services.jobs.recent(job_type, limit),
+            'active': {name: services.jobs.active(name) for name in JOB_TYPES},
+            'schedule': {'crawl_interval_seconds': crawl_interval_seconds(services.db)}
+        })
+    except Exception as e:
+        logger.error(f"List jobs error: {str(e)}")
+        return jsonify({'error': '获取任务列表失败'}), 500
+
+@bp.route('/api/admin/jobs/<int:job_id>')
+def get_job(job_id: int):
+    """后台任务状态和进度（需要管理员权限）"""
+    try:
+        if not admin_authorized():
+            return jsonify({'error': '未授权'}), 401
+        job = services.jobs.get(job_id)
+        if job is None:
+            return jsonify({'error': '任务不存在'}), 404
+        return jsonify(job)
+    except Exception as e:
+        logger.error(f"Get job error: {str(e)}")
+        return jsonify({'error': '获取任务状态失败'}), 500
+
+@bp.app_errorhandler(404)
 def not_found(error):
     return jsonify({'error': '接口不存在'}), 404
 
-@app.errorhandler(500)
+@bp.app_errorhandler(500)
 def internal_error(error):
     return jsonify({'error': '服务器内部错误'}), 500
 
 if __name__ == '__main__':
-    app.run(
+    create_app().run(
         host=Config.FLASK_HOST,
         port=Config.FLASK_PORT,
         debug=Config.FLASK_DEBUG
@@ -0,0 +1,258 @@
+import json
+import time
+import logging
+import threading
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional, Tuple
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.config import Config
+from utils import tracing
+from utils.text import question_fingerprint
+
+# 分词和numpy在首次检索时才导入，导入api.app保持轻量
+if TYPE_CHECKING:
+    from models.reranker import Reranker
+
+logger = logging.getLogger(__name__)
+
+FAILED_ANSWER = '抱歉，系统暂时无法处理您的问题。请稍后重试或联系招生办：0451-87505389。'
+NO_AI_ANSWER = '抱歉，暂时找不到相关信息。建议您访问学校官网 https://www.hljeu.edu.cn 查询。'
+
+
+def knowledge_fallback(knowledge_results: list, source: str) -> Optional[Dict]:
+    """大模型不可用或过载时使用知识库中最相关的答案，没有匹配时返回None"""
+    if not knowledge_results:
+        return None
+    # 重排后的结果按rerank_score选择，relevance只有几个取值，并列很多
+    best_result = max(knowledge_results, key=lambda x: x.get('rerank_score', x.get('relevance', 0)))
+    return {
+        'answer': best_result['answer'],
+        'source': source,
+        'response_time': 0,
+        'confidence': best_result.get('confidence_score', 0.7)
+    }
+
+
+def load_school_context(db) -> str:
+    """school_info表整理为大模型的参考信息"""
+    school_info_query = "SELECT info_key, info_value FROM school_info WHERE info_value IS NOT NULL"
+    with tracing.span('school_info'):
+        school_info = db.execute_query(school_info_query)
+    return "\n".join(f"{info['info_key']}: {info['info_value']}" for info in school_info)
+
+
+def split_ranked(ranked: List[Dict]) -> Tuple[List[Dict], List[Dict]]:
+    """重排结果按来源拆分为知识库条目和页面段落，各自保持重排顺序"""
+    knowledge_results = [row for row in ranked if row['kind'] == 'kb']
+    passages = [row for row in ranked if row['kind'] == 'passage']
+    return knowledge_results, passages
+
+
+def build_reference(passages: List[Dict], school_context: str) -> str:
+    """大模型的参考内容：与问题最相关的页面段落在前，学校基本信息在后"""
+    from models.passages import passage_context
+    return "\n".join(part for part in (passage_context(passages), school_context) if part)
+
+
+def page_references(page_results: List[Dict]) -> List[Dict]:
+    return [{'title': page['title'], 'url': page['url'], 'snippet': page['snippet']}
+            for page in page_results[:3]]
+
+
+class BatchAnswerer:
+    """批量回答问题：相同问题只回答一次，检索共享的上下文只查询一次，大模型调用并发数受限
+
+    知识库、段落和页面检索按问题执行，不同的问题之间不共享。
+
+    结果按完成顺序逐条产出，适合以JSON Lines流式返回。批量回答不写入问答历史。
+    """
+
+    def __init__(self, db, llm_router, fast_path=None, concurrency: int = None, reranker: 'Reranker' = None):
+        self.db = db
+        if reranker is None:
+            from models.reranker import Reranker
+            reranker = Reranker(db)
+        self.reranker = reranker
+        self.llm_router = llm_router
+        self.fast_path = fast_path
+        self.concurrency = concurrency or Config.BATCH_CONCURRENCY
+        # 常驻线程池，线程的数据库连接可以在多次批量任务间复用
+        self.executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='batch')
+        # 同一时间只运行一个批量任务，避免挤占在线问答
+        self.running = threading.Lock()
+
+    def answer_one(self, question: str, school_context: str) -> Dict:
+        start_time = time.time()
+        if self.fast_path:
+            result = self.fast_path.answer(question)
+            if result:
+                return dict(result, references=[])
+
+        knowledge_results, passages = split_ranked(self.reranker.retrieve(question))
+        page_results = self.db.search_pages(question, limit=3)
+
+        result = None
+        if self.llm_router:
+            reference = build_reference(passages, school_context)
+            result = self.llm_router.answer(question, knowledge_results, None, reference)
+            if result is None:
+                result = knowledge_fallback(knowledge_results, 'knowledge_base_fallback')
+        else:
+            result = knowledge_fallback(knowledge_results, 'knowledge_base_no_ai')
+        if result is None:
+            result = {'answer': FAILED_ANSWER if self.llm_router else NO_AI_ANSWER,
+                      'source': 'error' if self.llm_router else 'default',
+                      'confidence': 0 if self.llm_router else 0.3}
+
+        result = dict(result, references=page_references(page_results))
+        result['response_time'] = int((time.time() - start_time) * 1000)
+        return result
+
+    def run(self, questions: List[str]) -> Iterator[Dict]:
+        """逐条产出 {'index', 'question', 'answer', 'source', ...}，重复的问题带duplicate_of"""
+        # 按归一化指纹去重：指纹 -> 原问题出现的所有位置
+        groups: Dict[str, List[int]] = {}
+        for index, question in enumerate(questions):
+            question = (question or '').strip()
+            if question:
+                groups.setdefault(question_fingerprint(question), []).append(index)
+
+        school_context = load_school_context(self.db) if self.llm_router else ''
+        futures = {}
+        for indexes in groups.values():
+            question = questions[indexes[0]].strip()
+            futures[self.executor.submit(self._safe_answer, question, school_context)] = indexes
+
+        for future in as_completed(futures):
+            indexes = futures[future]
+            result = future.result()
+            first = indexes[0]
+            for index in indexes:
+                item = {'index': index, 'question': questions[index].strip()}
+                item.update(result)
+                if index != first:
+                    item['duplicate_of'] = first
+                yield item
+
+    def _safe_answer(self, question: str, school_context: str) -> Dict:
+        try:
+            return self.answer_one(question, school_context)
+        except Exception as e:
+            logger.error(f"Batch answer failed for {question[:50]}: {str(e)}")
+            return {'answer': FAILED_ANSWER, 'source': 'error', 'confidence': 0,
+                    'response_time': 0, 'references': [], 'error': str(e)}
+
+
+class AnswerPrecomputer:
+    """为近期提问最多的问题预生成大模型答案（后台任务precompute_answers）
+
+    检索和生成流程与在线问答相同（不带对话历史），答案连同引用的知识库条目、页面及其
+    内容摘要和知识库版本写入precomputed_answers表。分数线类问题实时查询招生数据，不预生成。
+    """
+
+    def __init__(self, db, llm_router, reranker: 'Reranker' = None, fast_path=None, concurrency: int = None):
+        self.db = db
+        self.llm_router = llm_router
+        if reranker is None:
+            from models.reranker import Reranker
+            reranker = Reranker(db)
+        self.reranker = reranker
+        self.fast_path = fast_path
+        self.concurrency = concurrency or Config.BATCH_CONCURRENCY
+
+    def top_questions(self, limit: int = None) -> List[Dict]:
+        since = datetime.now() - timedelta(days=Config.PRECOMPUTE_WINDOW_DAYS)
+        query = """
+            SELECT question_fp, COUNT(*) AS count, MAX(user_question) AS question
+            FROM qa_history
+            WHERE create_time >= %s AND question_fp IS NOT NULL
+            GROUP BY question_fp
+            HAVING COUNT(*) >= %s
+            ORDER BY count DESC
+            LIMIT %s
+        """
+        return self.db.execute_query(query, (since, Config.PRECOMPUTE_MIN_COUNT, limit or Config.PRECOMPUTE_TOP_N))
+
+    def run(self, limit: int = None, progress=None) -> Dict:
+        """返回 {'candidates', 'generated', 'skipped', 'failed', 'kb_version', 'elapsed'}"""
+        if self.llm_router is None:
+            raise RuntimeError('no LLM provider available')
+        from models.precomputed_answers import kb_version
+
+        start = time.time()
+        questions = self.top_questions(limit)
+        version = kb_version(self.db)
+        school_context = load_school_context(self.db)
+        counts = {'candidates': len(questions), 'generated': 0, 'skipped': 0, 'failed': 0}
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='precompute') as executor:
+            futures = {executor.submit(self._safe_generate, row, school_context, version): row for row in questions}
+            for done, future in enumerate(as_completed(futures), 1):
+                counts[future.result()] += 1
+                if progress:
+                    progress(done, len(questions), futures[future]['question'][:50])
+
+        # 过期超过一周的答案不再保留
+        self.db.execute_update(
+            "DELETE FROM precomputed_answers WHERE expire_time < DATE_SUB(NOW(), INTERVAL 7 DAY)")
+        counts.update(kb_version=version, elapsed=round(time.time() - start, 1))
+        logger.info(f"Precomputed answers: {counts}")
+        return counts
+
+    def _safe_generate(self, row: Dict, school_context: str, version: str) -> str:
+        try:
+            return self.generate(row, school_context, version)
+        except Exception as e:
+            logger.error(f"Precompute failed for {row['question'][:50]}: {str(e)}")
+            return 'failed'
+
+    def generate(self, row: Dict, school_context: str, version: str) -> str:
+        from models.precomputed_answers import source_stamps
+
+        question = row['question']
+        if self.fast_path and self.fast_path.answer(question):
+            return 'skipped'
+        knowledge_results, passages = split_ranked(self.reranker.retrieve(question))
+        page_results = self.db.search_pages(question, limit=3)
+        result = self.llm_router.answer(question, knowledge_results, None, build_reference(passages, school_context))
+        # 大模型失败时不保存知识库降级答案，在线问答仍按原流程处理
+        if not result:
+            return 'failed'
+        similar_questions = self.llm_router.generate_similar_questions(question)
+
+        provenance = {
+            'knowledge': source_stamps(self.db, 'knowledge', [r['id'] for r in knowledge_results]),
+            'pages': source_stamps(self.db, 'pages',
+                                   {p['page_id'] for p in passages} | {p['id'] for p in page_results}),
+        }
+        query = """
+            INSERT INTO precomputed_answers
+                (question_fp, question, answer, answer_source, confidence, similar_questions, reference_links,
+                 provenance, kb_version, question_count, status, update_time, expire_time)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, 'active', NOW(), %s)
+            ON DUPLICATE KEY UPDATE
+                question = VALUES(question),
+                answer = VALUES(answer),
+                answer_source = VALUES(answer_source),
+                confidence = VALUES(confidence),
+                similar_questions = VALUES(similar_questions),
+                reference_links = VALUES(reference_links),
+                provenance = VALUES(provenance),
+                kb_version = VALUES(kb_version),
+                question_count = VALUES(question_count),
+                status = 'active',
+                update_time = NOW(),
+                expire_time = VALUES(expire_time)
+        """
+        params = (
+            row['question_fp'] or question_fingerprint(question), question[:500], result['answer'],
+            result.get('source'), result.get('confidence'),
+            json.dumps(similar_questions, ensure_ascii=False),
+            json.dumps(page_references(page_results), ensure_ascii=False),
+            json.dumps(provenance), version, int(row['count']),
+            datetime.now() + timedelta(hours=Config.PRECOMPUTE_TTL_HOURS)
+        )
+        return 'generated' if self.db.execute_update(query, params) else 'failed'
@@ -0,0 +1,89 @@
+import gc
+import logging
+from typing import Dict
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gunicorn.app.base import BaseApplication
+
+from config.config import Config
+from utils.metrics_dir import prepare_metrics_dir
+
+logger = logging.getLogger(__name__)
+
+
+def server_options(workers: int = None, threads: int = None, max_requests: int = None,
+                   bind: str = None) -> Dict:
+    """gunicorn配置，未指定的项使用Config中的默认值"""
+    threads = threads or Config.SERVER_THREADS
+    max_requests = Config.SERVER_MAX_REQUESTS if max_requests is None else max_requests
+    return {
+        'bind': bind or f"{Config.FLASK_HOST}:{Config.FLASK_PORT}",
+        'workers': workers or Config.SERVER_WORKERS,
+        'threads': threads,
+        'worker_class': 'gthread' if threads > 1 else 'sync',
+        # 主进程加载应用后再fork，索引和缓存在worker间写时复制共享
+        'preload_app': True,
+        'max_requests': max_requests,
+        'max_requests_jitter': Config.SERVER_MAX_REQUESTS_JITTER if max_requests else 0,
+        'timeout': Config.SERVER_TIMEOUT,
+        'graceful_timeout': Config.SERVER_GRACEFUL_TIMEOUT,
+        'keepalive': Config.SERVER_KEEPALIVE,
+        'pidfile': Config.SERVER_PID_FILE,
+        'loglevel': Config.LOG_LEVEL.lower(),
+        'accesslog': '-',
+        'post_fork': post_fork,
+        'worker_exit': worker_exit,
+        'child_exit': child_exit,
+    }
+
+
+def post_fork(server, worker):
+    server.log.info(f"Worker spawned (pid: {worker.pid})")
+
+
+def worker_exit(server, worker):
+    server.log.info(f"Worker exited (pid: {worker.pid}, handled requests: {worker.nr})")
+
+
+def child_exit(server, worker):
+    # 多进程Prometheus指标：清理已退出worker的数据文件
+    from utils.tracing import mark_process_dead
+    mark_process_dead(worker.pid)
+
+
+class ProductionServer(BaseApplication):
+    """以预加载方式运行Flask应用的gunicorn服务
+
+    主进程收到SIGHUP时平滑重启全部worker（处理中的请求在graceful_timeout内完成）；
+    由于应用已预加载，代码更新需发送SIGUSR2启动新主进程后再停止旧主进程。
+    """
+
+    def __init__(self, options: Dict = None):
+        self.options = options or server_options()
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            if key in self.cfg.settings and value is not None:
+                self.cfg.set(key, value)
+
+    def load(self):
+        from api.app import create_app, warm_up
+        app = create_app()
+        warm_up()
+        # 预加载的对象移入永久代，worker中的GC不再遍历并改写它们的对象头，减少内存页被复制
+        gc.freeze()
+        return app
+
+
+def run(workers: int = None, threads: int = None, max_requests: int = None, bind: str = None):
+    """启动生产服务"""
+    options = server_options(workers, threads, max_requests, bind)
+    # run.py已在导入其他模块之前设置；直接调用run()时在这里设置
+    metrics_dir = prepare_metrics_dir()
+    os.makedirs(os.path.dirname(options['pidfile']) or '.', exist_ok=True)
+    logger.info(f"Starting production server on {options['bind']} with {options['workers']} workers "
+                f"x {options['threads']} threads (max_requests={options['max_requests']}, metrics: {metrics_dir})")
+    ProductionServer(options).run()
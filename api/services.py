@@ -0,0 +1,110 @@
+import time
+import logging
+import threading
+from typing import Dict
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.config import Config
+
+_MISSING = object()
+
+
+class lazy:
+    """线程安全的惰性属性：首次访问时创建并写入实例字典，之后的访问不再经过描述符和锁"""
+
+    def __init__(self, factory):
+        self.factory = factory
+        self.name = factory.__name__
+        self.__doc__ = factory.__doc__
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        with instance._lock:
+            value = instance.__dict__.get(self.name, _MISSING)
+            if value is _MISSING:
+                start = time.perf_counter()
+                value = self.factory(instance)
+                instance.__dict__[self.name] = value
+                instance.init_ms[self.name] = round((time.perf_counter() - start) * 1000, 2)
+        return value
+
+
+class Services:
+    """Web应用依赖的组件，首次使用时才导入模块并创建
+
+    导入api.app不连接数据库、不创建大模型客户端；生产模式由warm_up在fork前统一创建。
+    """
+
+    # warm_up时创建的组件；后台任务队列只在管理接口使用，不预先创建
+    SERVING_COMPONENTS = ('db', 'admission_fast_path', 'admission_analytics', 'hot_question_tracker',
+                          'session_history', 'precomputed_answers', 'reranker', 'llm_router', 'batch_answerer')
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.logger = logging.getLogger(__name__)
+        # 各组件的创建耗时（毫秒），由就绪检查返回
+        self.init_ms: Dict[str, float] = {}
+
+    def initialize(self, names=SERVING_COMPONENTS):
+        for name in names:
+            getattr(self, name)
+
+    @lazy
+    def db(self):
+        from database.db_manager import DatabaseManager
+        # 首次查询时才连接
+        return DatabaseManager(lazy=True)
+
+    @lazy
+    def jobs(self):
+        """爬取和知识库构建任务队列，任务由独立的执行进程（run.py worker）执行"""
+        from database.jobs import JobQueue
+        return JobQueue(self.db)
+
+    @lazy
+    def admission_fast_path(self):
+        from models.admission_qa import AdmissionFastPath
+        return AdmissionFastPath(self.db)
+
+    @lazy
+    def admission_analytics(self):
+        from models.admission_analytics import AdmissionAnalytics
+        return AdmissionAnalytics(self.db)
+
+    @lazy
+    def hot_question_tracker(self):
+        from models.hot_questions import HotQuestionTracker
+        return HotQuestionTracker(self.db)
+
+    @lazy
+    def session_history(self):
+        from database.session_history import SessionHistoryCache
+        return SessionHistoryCache()
+
+    @lazy
+    def precomputed_answers(self):
+        from models.precomputed_answers import PrecomputedAnswers
+        return PrecomputedAnswers(self.db)
+
+    @lazy
+    def reranker(self):
+        from models.reranker import Reranker
+        return Reranker(self.db)
+
+    @lazy
+    def llm_router(self):
+        """大模型服务路由：按优先级调用DeepSeek/HuggingFace，带熔断和对冲请求"""
+        from models.llm_router import build_default_router
+        # 对冲时一个请求最多同时占用两个调用线程
+        router = build_default_router(max_workers=(Config.CHAT_MAX_CONCURRENT + Config.BATCH_CONCURRENCY) * 2)
+        if router is None:
+            self.logger.warning("No LLM provider available, answering from knowledge base only")
+        return router
+
+    @lazy
+    def batch_answerer(self):
+        from api.chat_service import BatchAnswerer
+        return BatchAnswerer(self.db, self.llm_router, self.admission_fast_path, reranker=self.reranker)
@@ -0,0 +1,182 @@
+import time
+import signal
+import socket
+import logging
+import threading
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.config import Config
+from database.jobs import JobQueue
+
+JOB_TYPES = ('crawl', 'build_knowledge', 'precompute_answers')
+
+
+def crawl_interval_seconds(db) -> Optional[int]:
+    """system_config中的定时爬取间隔（秒），未启用时返回None"""
+    if (db.get_system_config('crawl_enabled') or '').strip().lower() not in ('true', '1', 'yes'):
+        return None
+    try:
+        hours = float(db.get_system_config('crawl_interval_hours') or 0)
+    except ValueError:
+        return None
+    return int(hours * 3600) if hours > 0 else None
+
+
+def precompute_hours() -> List[int]:
+    """Config.PRECOMPUTE_HOURS中的整点"""
+    hours = []
+    for part in Config.PRECOMPUTE_HOURS.split(','):
+        part = part.strip()
+        if part.isdigit() and int(part) < 24:
+            hours.append(int(part))
+    return hours
+
+
+class JobWorker:
+    """后台任务执行进程（python run.py worker）
+
+    爬取、知识库构建和答案预生成耗时较长，放在独立进程中执行，不占用Web服务的worker；
+    Web服务和命令行只向jobs表提交任务。同时负责按system_config的crawl_enabled和
+    crawl_interval_hours定时提交爬取任务，在PRECOMPUTE_HOURS整点提交答案预生成任务。
+    """
+
+    def __init__(self, db=None):
+        if db is None:
+            from database.db_manager import DatabaseManager
+            db = DatabaseManager()
+        self.db = db
+        self.jobs = JobQueue(db)
+        self.name = f"{socket.gethostname()}:{os.getpid()}"
+        self.logger = logging.getLogger(__name__)
+        self._stop = threading.Event()
+        self.handlers: Dict[str, Callable] = {
+            'crawl': self._crawl,
+            'build_knowledge': self._build_knowledge,
+            'precompute_answers': self._precompute_answers,
+        }
+
+    def _crawl(self, report) -> Dict:
+        from crawler.spider import HLJEUSpider
+        # 爬虫结束时会关闭自己的数据库连接，不能传入共享的db
+        result = HLJEUSpider().start_crawling(progress=report)
+        if result['status'] != 'completed':
+            raise RuntimeError(result.get('error') or 'crawl failed')
+        return result
+
+    def _build_knowledge(self, report) -> Dict:
+        from models.knowledge_builder import KnowledgeBuilder
+        result = KnowledgeBuilder(self.db).build_all(progress=report)
+        # 知识库变化后按新的检索结果重新生成热门问题的答案
+        job, _ = self.jobs.enqueue('precompute_answers', 'build')
+        if job:
+            result['precompute_job'] = job['id']
+        return result
+
+    def _precompute_answers(self, report) -> Dict:
+        from api.chat_service import AnswerPrecomputer
+        from models.admission_qa import AdmissionFastPath
+        from models.llm_router import build_default_router
+        router = build_default_router(max_workers=Config.BATCH_CONCURRENCY * 2)
+        return AnswerPrecomputer(self.db, router, fast_path=AdmissionFastPath(self.db)).run(progress=report)
+
+    def execute(self, job: Dict) -> Dict:
+        """执行已认领的任务，执行期间后台线程定期写入心跳"""
+        job_id = job['id']
+        handler = self.handlers.get(job['job_type'])
+        if handler is None:
+            self.jobs.finish(job_id, error=f"unknown job type: {job['job_type']}")
+            return self.jobs.get(job_id)
+
+        done = threading.Event()
+
+        def beat():
+            while not done.wait(Config.JOB_HEARTBEAT_SECONDS):
+                self.jobs.heartbeat(job_id)
+
+        def report(current, total=0, message=None):
+            self.jobs.progress(job_id, current, total, message)
+
+        heartbeat = threading.Thread(target=beat, name=f"job-{job_id}-heartbeat", daemon=True)
+        heartbeat.start()
+        self.logger.info(f"Job {job_id} ({job['job_type']}) started")
+        start = time.time()
+        try:
+            result = handler(report)
+            self.jobs.finish(job_id, result=result)
+            self.logger.info(f"Job {job_id} ({job['job_type']}) completed in {time.time() - start:.1f}s")
+        except Exception as e:
+            self.logger.error(f"Job {job_id} ({job['job_type']}) failed: {str(e)}")
+            self.jobs.finish(job_id, error=str(e) or type(e).__name__)
+        finally:
+            done.set()
+            heartbeat.join()
+        return self.jobs.get(job_id)
+
+    def run_inline(self, job_type: str, trigger: str = 'cli') -> Optional[Dict]:
+        """在当前进程提交并执行任务；同类任务在排队时直接执行该任务，已在运行时不重复执行"""
+        self.jobs.recover_stale()
+        job, created = self.jobs.enqueue(job_type, trigger)
+        if job is None:
+            self.logger.error(f"Failed to queue {job_type} job")
+            return None
+        if not created and job['status'] != 'pending':
+            self.logger.warning(f"A {job_type} job is already running (id: {job['id']}), not starting another")
+            return job
+        claimed = self.jobs.claim(self.name, job['id'])
+        if claimed is None:
+            # 执行进程已先一步认领
+            self.logger.info(f"Job {job['id']} was picked up by a worker")
+            return self.jobs.get(job['id'])
+        return self.execute(claimed)
+
+    def schedule(self) -> List[Dict]:
+        """提交到期的定时任务，返回新提交的任务"""
+        queued = []
+        interval = crawl_interval_seconds(self.db)
+        if interval is not None and not self.jobs.started_within('crawl', interval):
+            # 引入任务队列之前的爬取只记录在crawl_tasks中
+            rows = self.db.execute_query(
+                f"""
+                SELECT COUNT(*) AS total FROM crawl_tasks
+                WHERE start_time > DATE_SUB(NOW(), INTERVAL {interval} SECOND)
+                """
+            )
+            if not (rows and rows[0]['total']):
+                queued.append(self.jobs.enqueue('crawl', 'schedule'))
+        # 低峰期预生成答案，每个整点最多提交一次
+        if datetime.now().hour in precompute_hours() and not self.jobs.started_within('precompute_answers', 3600):
+            queued.append(self.jobs.enqueue('precompute_answers', 'schedule'))
+        return [job for job, created in queued if created]
+
+    def run_pending(self) -> int:
+        """依次执行当前所有待执行任务，返回执行数"""
+        executed = 0
+        while not self._stop.is_set():
+            job = self.jobs.claim(self.name)
+            if job is None:
+                break
+            self.execute(job)
+            executed += 1
+        return executed
+
+    def stop(self, *_):
+        self.logger.info("Worker stopping after the current job")
+        self._stop.set()
+
+    def run_forever(self):
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        self.logger.info(f"Job worker {self.name} started")
+        next_schedule = 0.0
+        while not self._stop.is_set():
+            self.jobs.recover_stale()
+            if time.time() >= next_schedule:
+                self.schedule()
+                next_schedule = time.time() + Config.JOB_SCHEDULE_SECONDS
+            if not self.run_pending():
+                self._stop.wait(Config.JOB_POLL_SECONDS)
+        self.logger.info(f"Job worker {self.name} stopped")
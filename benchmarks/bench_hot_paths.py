@@ -0,0 +1,275 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+热点函数微基准
+
+用法：
+    python benchmarks/bench_hot_paths.py                   # 与基线对比，退化超过阈值时返回1
+    python benchmarks/bench_hot_paths.py --save-baseline   # 更新基线
+    python benchmarks/bench_hot_paths.py --cases spider_extract,kb_query
+    python benchmarks/bench_hot_paths.py --cases query_match        # 查询理解应保持在每次几微秒
+
+输入来自 fixtures/pages/*.html 和 fixtures/hot_paths.json。每个用例记录吞吐量（ops/sec）
+和单次调用的内存峰值（tracemalloc）。吞吐量除以同一进程中固定纯Python负载的速度后再与基线比较，
+减少机器差异的影响；换机器后仍建议重新生成基线。
+"""
+
+import sys
+import os
+import json
+import time
+import argparse
+import tracemalloc
+from typing import Callable, Dict, List
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+FIXTURE_DIR = os.path.join(BENCH_DIR, 'fixtures')
+BASELINE_FILE = os.path.join(BENCH_DIR, 'baselines', 'hot_paths.json')
+
+
+def load_fixtures() -> Dict:
+    with open(os.path.join(FIXTURE_DIR, 'hot_paths.json'), 'r', encoding='utf-8') as f:
+        fixtures = json.load(f)
+    page_dir = os.path.join(FIXTURE_DIR, 'pages')
+    fixtures['pages'] = {}
+    for name in sorted(os.listdir(page_dir)):
+        if name.endswith('.html'):
+            with open(os.path.join(page_dir, name), 'r', encoding='utf-8') as f:
+                fixtures['pages'][name] = f.read()
+    with open(os.path.join(FIXTURE_DIR, 'qa_corpus.json'), 'r', encoding='utf-8') as f:
+        fixtures['texts'] = [page['content'] for page in json.load(f)['pages']]
+    return fixtures
+
+
+# 每个用例返回一组无参调用，一次调用计为一个op
+
+def case_spider_parse(fixtures: Dict) -> List[Callable]:
+    from bs4 import BeautifulSoup
+    return [lambda html=html: BeautifulSoup(html, 'html.parser') for html in fixtures['pages'].values()]
+
+
+def case_spider_extract(fixtures: Dict) -> List[Callable]:
+    from bs4 import BeautifulSoup
+    spider = _spider()
+    url = 'https://www.hljeu.edu.cn/news/xxyw/2024/page.htm'
+    soups = [BeautifulSoup(html, 'html.parser') for html in fixtures['pages'].values()]
+    return [lambda soup=soup: spider.extract_page_content(soup, url) for soup in soups]
+
+
+def case_classify_url(fixtures: Dict) -> List[Callable]:
+    spider = _spider()
+    return [lambda url=url: spider.classify_url(url) for url in fixtures['urls']]
+
+
+def case_extract_qa(fixtures: Dict) -> List[Callable]:
+    builder = _builder()
+    return [lambda text=text: builder.extract_qa_from_content(text) for text in fixtures['texts']]
+
+
+def case_extract_keywords(fixtures: Dict) -> List[Callable]:
+    builder = _builder()
+    return [lambda text=text: builder.extract_keywords(text) for text in fixtures['texts']]
+
+
+def case_kb_query(fixtures: Dict) -> List[Callable]:
+    db = _db(fixtures)
+    return [lambda q=q: db.build_knowledge_query(q, 5) for q in fixtures['questions']]
+
+
+def case_query_match(fixtures: Dict) -> List[Callable]:
+    matcher = _db(fixtures).get_query_matcher()
+    questions = fixtures['questions'] + fixtures['admission_questions']
+    return [lambda q=q: matcher.analyze(q) for q in questions]
+
+
+def case_deepseek_prompt(fixtures: Dict) -> List[Callable]:
+    from models.deepseek_client import DeepSeekClient
+    client = DeepSeekClient()
+    kb, history, page = fixtures['knowledge_results'], fixtures['history'], fixtures['page_content']
+    return [lambda q=q: client.build_messages(q, kb, history, page) for q in fixtures['questions']]
+
+
+def case_huggingface_prompt(fixtures: Dict) -> List[Callable]:
+    from models.huggingface_client import HuggingFaceClient
+    client = HuggingFaceClient()
+    kb, history = fixtures['knowledge_results'], fixtures['history']
+    return [lambda q=q: client.create_prompt(q, client.build_context(kb), history) for q in fixtures['questions']]
+
+
+_shared = {}
+
+
+def _db(fixtures: Dict = None):
+    # 被测函数都不访问数据库，不建立连接；查询理解词表使用fixtures中的专业和院系，不从数据库刷新
+    if 'db' not in _shared:
+        from database.db_manager import DatabaseManager
+        from models.query_understanding import QueryMatcher
+        _shared['db'] = DatabaseManager(lazy=True)
+        fixtures = fixtures or load_fixtures()
+        _shared['db'].query_matcher = QueryMatcher(majors=fixtures['majors'], departments=fixtures['departments'])
+    return _shared['db']
+
+
+def _spider():
+    if 'spider' not in _shared:
+        from crawler.spider import HLJEUSpider
+        _shared['spider'] = HLJEUSpider(_db())
+    return _shared['spider']
+
+
+def _builder():
+    if 'builder' not in _shared:
+        from models.knowledge_builder import KnowledgeBuilder
+        _shared['builder'] = KnowledgeBuilder(_db())
+    return _shared['builder']
+
+
+CASES: Dict[str, Callable] = {
+    'spider_parse': case_spider_parse,
+    'spider_extract': case_spider_extract,
+    'classify_url': case_classify_url,
+    'extract_qa': case_extract_qa,
+    'extract_keywords': case_extract_keywords,
+    'kb_query': case_kb_query,
+    'query_match': case_query_match,
+    'deepseek_prompt': case_deepseek_prompt,
+    'huggingface_prompt': case_huggingface_prompt,
+}
+
+
+def calibration_workload():
+    """固定的纯Python负载，用于归一化不同机器的速度"""
+    counts = {}
+    for i in range(2000):
+        key = f"k{i % 97}"
+        counts[key] = counts.get(key, 0) + len(key)
+    return sorted(counts.items())
+
+
+def measure_rate(calls: List[Callable], min_time: float, rounds: int) -> float:
+    """多轮计时取最快一轮，返回每秒调用次数"""
+    for call in calls:
+        call()  # 预热（jieba词典、正则编译等）
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            for call in calls:
+                call()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            break
+        loops *= 2
+    best = elapsed
+    for _ in range(rounds - 1):
+        start = time.perf_counter()
+        for _ in range(loops):
+            for call in calls:
+                call()
+        best = min(best, time.perf_counter() - start)
+    return loops * len(calls) / best
+
+
+def measure_peak_bytes(calls: List[Callable]) -> int:
+    """单次调用新增内存峰值的平均值（字节）"""
+    peaks = []
+    tracemalloc.start()
+    try:
+        for call in calls:
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+            call()
+            peaks.append(tracemalloc.get_traced_memory()[1] - base)
+    finally:
+        tracemalloc.stop()
+    return int(sum(peaks) / len(peaks)) if peaks else 0
+
+
+def compare(results: Dict, baseline: Dict, max_slowdown: float, max_alloc_growth: float) -> int:
+    """打印与基线的差异，返回退化的用例数"""
+    regressions = 0
+    print(f"{'case':>20} | {'ops/sec':>12} | {'vs baseline':>11} | {'peak bytes':>10} | {'vs baseline':>11}")
+    for name, current in results['cases'].items():
+        previous = baseline.get('cases', {}).get(name)
+        if previous is None:
+            print(f"{name:>20} | {current['ops_per_sec']:>12.1f} | {'new':>11} | {current['peak_bytes']:>10} | {'new':>11}")
+            continue
+        speed = current['normalized'] / previous['normalized'] if previous['normalized'] else 1.0
+        alloc = current['peak_bytes'] / previous['peak_bytes'] if previous['peak_bytes'] else 1.0
+        flags = []
+        if speed < 1 - max_slowdown:
+            flags.append('SLOWER')
+        # 几百字节以内的波动来自解释器内部缓存，不计入
+        if alloc > 1 + max_alloc_growth and current['peak_bytes'] - previous['peak_bytes'] > 512:
+            flags.append('MORE ALLOC')
+        if flags:
+            regressions += 1
+        print(f"{name:>20} | {current['ops_per_sec']:>12.1f} | {speed:>10.2f}x | {current['peak_bytes']:>10} | "
+              f"{alloc:>10.2f}x {' '.join(flags)}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='热点函数微基准')
+    parser.add_argument('--cases', default=','.join(CASES), help='逗号分隔的用例')
+    parser.add_argument('--min-time', type=float, default=0.2, help='每轮最短计时（秒）')
+    parser.add_argument('--rounds', type=int, default=5, help='计时轮数，取最快一轮')
+    parser.add_argument('--baseline', default=BASELINE_FILE, help='基线文件')
+    parser.add_argument('--save-baseline', action='store_true', help='将本次结果写入基线文件')
+    parser.add_argument('--max-slowdown', type=float, default=0.3, help='允许的吞吐量下降比例')
+    parser.add_argument('--max-alloc-growth', type=float, default=0.25, help='允许的内存峰值增长比例')
+    args = parser.parse_args()
+
+    names = [name.strip() for name in args.cases.split(',') if name.strip()]
+    unknown = [name for name in names if name not in CASES]
+    if unknown:
+        print(f"Unknown cases: {', '.join(unknown)} (available: {', '.join(CASES)})")
+        return 2
+
+    fixtures = load_fixtures()
+    calibration = measure_rate([calibration_workload], args.min_time, args.rounds)
+    results = {'cases': {}}
+    for name in names:
+        calls = CASES[name](fixtures)
+        results['cases'][name] = {
+            'ops_per_sec': round(measure_rate(calls, args.min_time, args.rounds), 1),
+            'peak_bytes': measure_peak_bytes(calls)
+        }
+    # 运行前后各校准一次取较快值，减少机器负载波动的影响
+    calibration = max(calibration, measure_rate([calibration_workload], args.min_time, args.rounds))
+    results['calibration_ops_per_sec'] = round(calibration, 1)
+    for result in results['cases'].values():
+        result['normalized'] = round(result['ops_per_sec'] / calibration, 4)
+
+    if args.save_baseline:
+        baseline = {'cases': {}}
+        if os.path.exists(args.baseline):
+            with open(args.baseline, 'r', encoding='utf-8') as f:
+                baseline = json.load(f)
+        # 只运行部分用例时保留其他用例的基线
+        baseline['calibration_ops_per_sec'] = results['calibration_ops_per_sec']
+        baseline['cases'].update(results['cases'])
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+            f.write('\n')
+        for name, result in results['cases'].items():
+            print(f"{name:>20}: {result['ops_per_sec']:>12.1f} ops/sec, {result['peak_bytes']:>8} peak bytes")
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --save-baseline first")
+        return 2
+    with open(args.baseline, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, args.max_slowdown, args.max_alloc_growth)
+    if regressions:
+        print(f"{regressions} case(s) regressed beyond threshold")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
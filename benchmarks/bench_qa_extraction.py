@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+问答对提取回归检查与性能基准
+
+用法：
+    python benchmarks/bench_qa_extraction.py [--repeat 20]
+
+先用 fixtures/qa_corpus.json 校验提取结果，再对比旧实现的吞吐量（pages/sec）。
+"""
+
+import re
+import sys
+import os
+import json
+import time
+import argparse
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.qa_extractor import extract_qa_pairs
+
+CORPUS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'qa_corpus.json')
+
+
+def legacy_extract_qa(content):
+    """重写前的实现，仅用于性能对比"""
+    qa_pairs = []
+    faq_patterns = [
+        r'问[:：]\s*(.+?)\s*答[:：]\s*(.+?)(?=问[:：]|\Z)',
+        r'Q[:：]\s*(.+?)\s*A[:：]\s*(.+?)(?=Q[:：]|\Z)',
+        r'【问】(.+?)【答】(.+?)(?=【问】|\Z)'
+    ]
+    for pattern in faq_patterns:
+        for q, a in re.findall(pattern, content, re.DOTALL):
+            q = q.strip()[:200]
+            a = a.strip()[:500]
+            if len(q) > 5 and len(a) > 5:
+                qa_pairs.append((q, a))
+    for question in re.findall(r'([^。！？\n]{5,30}[？?])', content):
+        idx = content.find(question)
+        if idx != -1:
+            answer = content[idx + len(question):idx + len(question) + 300]
+            answer = re.sub(r'\s+', ' ', answer).strip()
+            if len(answer) > 20:
+                qa_pairs.append((question, re.split(r'[。！？]', answer)[0] + '。'))
+    return qa_pairs
+
+
+def load_corpus():
+    with open(CORPUS_FILE, 'r', encoding='utf-8') as f:
+        return json.load(f)['pages']
+
+
+def check_regressions(pages) -> int:
+    """校验回归语料，返回不一致的页面数"""
+    failures = 0
+    for page in pages:
+        actual = [list(pair) for pair in extract_qa_pairs(page['content'])]
+        if actual != page['expected']:
+            failures += 1
+            print(f"[FAIL] {page['name']}")
+            print(f"  expected: {page['expected']}")
+            print(f"  actual:   {actual}")
+    return failures
+
+
+def measure(func, pages, repeat: int) -> float:
+    """返回每秒处理的页面数"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for page in pages:
+            func(page['content'])
+    elapsed = time.perf_counter() - start
+    return len(pages) * repeat / elapsed if elapsed > 0 else float('inf')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='问答对提取基准测试')
+    parser.add_argument('--repeat', type=int, default=20, help='重复次数')
+    args = parser.parse_args()
+
+    pages = load_corpus()
+    failures = check_regressions(pages)
+    print(f"Regression corpus: {len(pages) - failures}/{len(pages)} pages match")
+
+    # 模拟爬虫保存的长页面（最多10000字符）
+    long_pages = [{'content': (page['content'] * (10000 // max(len(page['content']), 1) + 1))[:10000]}
+                  for page in pages]
+
+    for label, corpus in (('fixture pages', pages), ('10k-char pages', long_pages)):
+        new_rate = measure(extract_qa_pairs, corpus, args.repeat)
+        old_rate = measure(legacy_extract_qa, corpus, max(1, args.repeat // 10))
+        print(f"{label:>15}: new {new_rate:10.1f} pages/sec | legacy {old_rate:10.1f} pages/sec "
+              f"| speedup {new_rate / old_rate:6.1f}x")
+
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+检索索引快照的启动耗时基准
+
+用法：
+    python benchmarks/bench_snapshot.py
+    python benchmarks/bench_snapshot.py --pages 1000,10000,100000 --repeat 20
+
+按不同语料规模生成合成快照（词项、倒排表、页面元数据、知识库向量），报告写入耗时、
+文件大小、打开快照（映射并解析头部）和首次查询的p50耗时。打开耗时应不随语料规模增长；
+全量CRC校验（verify）需读取整个文件，单独列出作对照。不访问数据库。
+"""
+
+import sys
+import os
+import time
+import shutil
+import argparse
+import tempfile
+from array import array
+import numpy as np
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.eval_retrieval import percentile
+from models.corpus_stats import CorpusStatistics
+from models.index_snapshot import IndexSnapshot, write_snapshot
+from models.vector_index import HashedNgramEncoder, VectorIndex
+
+
+def synthetic_inputs(pages: int, encoder: HashedNgramEncoder, seed: int = 7):
+    """页面数为pages的合成语料统计和知识库向量（知识库条目按页面数的1/10）"""
+    rng = np.random.default_rng(seed)
+    stats = CorpusStatistics()
+    stats.total_docs = pages
+    terms = [f"词项{i}" for i in range(max(pages * 2, 10))]
+    doc_freq = np.minimum(rng.zipf(1.5, len(terms)), pages)
+    for term, df in zip(terms, doc_freq):
+        stats.doc_freq[term] = int(df)
+        stats.idf[term] = stats.compute_idf(int(df))
+        stats.postings[term] = array('i', np.sort(rng.choice(pages, int(df), replace=False)).tolist())
+    stats.page_titles = {page_id: f"页面标题{page_id}" for page_id in range(pages)}
+    stats.doc_lengths = {page_id: int(length) for page_id, length in enumerate(rng.integers(50, 2000, pages))}
+
+    count = max(pages // 10, 1)
+    vectors = rng.standard_normal((count, encoder.dim)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    idf = np.ones(encoder.hash_dim, dtype=np.float32)
+    return stats, VectorIndex(np.arange(count, dtype=np.int64), vectors, idf, encoder), terms
+
+
+def timed(func, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return percentile(samples, 50)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='检索索引快照启动耗时基准')
+    parser.add_argument('--pages', default='1000,10000,50000', help='逗号分隔的语料页面数')
+    parser.add_argument('--repeat', type=int, default=10, help='每项计时重复次数')
+    args = parser.parse_args()
+
+    encoder = HashedNgramEncoder()
+    workdir = tempfile.mkdtemp(prefix='bench_snapshot_')
+    print(f"{'pages':>8} | {'write ms':>9} | {'size MB':>8} | {'open ms':>8} | {'lookup ms':>9} | {'verify ms':>9}")
+    try:
+        for pages in [int(n) for n in args.pages.split(',') if n.strip()]:
+            stats, kb_index, terms = synthetic_inputs(pages, encoder)
+            path = os.path.join(workdir, f"snapshot_{pages}.bin")
+            start = time.perf_counter()
+            write_snapshot(path, stats, kb_index, {})
+            write_ms = (time.perf_counter() - start) * 1000
+
+            open_ms = timed(lambda: IndexSnapshot.open(path), args.repeat)
+            snapshot = IndexSnapshot.open(path)
+            probe = terms[len(terms) // 2]
+            lookup_ms = timed(lambda: (snapshot.idf_of([probe, '不存在的词']), snapshot.pages_containing(probe),
+                                       snapshot.vector_index.search('学费标准', k=5)), args.repeat)
+            verify_ms = timed(snapshot.verify, max(args.repeat // 5, 1))
+            size_mb = os.path.getsize(path) / 1024 / 1024
+            print(f"{pages:>8} | {write_ms:>9.1f} | {size_mb:>8.1f} | {open_ms:>8.3f} | {lookup_ms:>9.3f} | {verify_ms:>9.1f}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,171 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+启动耗时与导入时间基准
+
+用法：
+    python benchmarks/bench_startup.py                      # 与基线对比，退化时返回1
+    python benchmarks/bench_startup.py --save-baseline      # 更新基线
+    python benchmarks/bench_startup.py --report api_import  # 输出该场景导入最慢的模块（-X importtime）
+
+每个场景在新的Python进程中执行（python -X importtime -c ...），取多次运行的中位数墙钟时间；
+同时检查场景不应导入的模块（如导入api.app不应加载jieba、数据库驱动和大模型客户端），
+出现即视为退化。子进程的工作目录为临时目录，不访问数据库。
+"""
+
+import sys
+import os
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+from typing import Dict, List, Tuple
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.eval_retrieval import percentile
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(BENCH_DIR)
+BASELINE_FILE = os.path.join(BENCH_DIR, 'baselines', 'startup.json')
+
+# 场景名 -> (执行的代码, 不应导入的模块)
+SCENARIOS: Dict[str, Tuple[str, Tuple[str, ...]]] = {
+    'run_cli': (
+        "import run",
+        ('flask', 'jieba', 'numpy', 'bs4', 'pymysql', 'api.app', 'database.db_manager')),
+    'api_import': (
+        "import api.app",
+        ('jieba', 'numpy', 'bs4', 'pymysql', 'database.db_manager', 'models.knowledge_builder',
+         'models.deepseek_client', 'models.huggingface_client', 'crawler.spider')),
+    'app_liveness': (
+        "from api.app import create_app\n"
+        "assert create_app().test_client().get('/healthz').status_code == 200",
+        ('jieba', 'numpy', 'pymysql', 'database.db_manager', 'models.knowledge_builder')),
+    'crawler_import': (
+        "import crawler.spider",
+        ('flask', 'jieba.analyse', 'models.knowledge_builder')),
+    'builder_import': (
+        "import models.knowledge_builder",
+        ('flask', 'bs4', 'crawler.spider')),
+}
+
+
+def parse_importtime(stderr: str) -> List[Tuple[str, int, int, int]]:
+    """解析 -X importtime 输出，返回 [(模块, 自身微秒, 累计微秒, 嵌套深度)]"""
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|', 2)
+        depth = (len(name) - len(name.lstrip(' ')) - 1) // 2
+        modules.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return modules
+
+
+def run_scenario(code: str, workdir: str) -> Tuple[float, List[Tuple[str, int, int, int]]]:
+    env = dict(os.environ, PYTHONPATH=PROJECT_ROOT, PYTHONDONTWRITEBYTECODE='1')
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=workdir, env=env,
+                          capture_output=True, text=True)
+    elapsed = (time.perf_counter() - start) * 1000
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else 'failed')
+    return elapsed, parse_importtime(proc.stderr)
+
+
+def measure(names: List[str], repeat: int) -> Dict:
+    results = {}
+    workdir = tempfile.mkdtemp(prefix='bench_startup_')
+    try:
+        for name in names:
+            code, forbidden = SCENARIOS[name]
+            samples = []
+            modules = []
+            for _ in range(repeat):
+                elapsed, modules = run_scenario(code, workdir)
+                samples.append(elapsed)
+            loaded = {module for module, _, _, _ in modules}
+            import_ms = sum(cumulative for _, _, cumulative, depth in modules if depth == 0) / 1000
+            results[name] = {
+                'wall_ms': round(percentile(samples, 50), 1),
+                'import_ms': round(import_ms, 1),
+                'modules': len(loaded),
+                'forbidden': sorted(m for m in forbidden if m in loaded),
+                'top': sorted(((m, c) for m, _, c, d in modules if d <= 1), key=lambda x: -x[1])[:15],
+            }
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+def compare(results: Dict, baseline: Dict, max_slowdown: float, min_delta_ms: float) -> int:
+    """墙钟时间比基线慢超过max_slowdown且超过min_delta_ms，或导入了禁止的模块，计为退化"""
+    regressions = 0
+    print(f"{'scenario':>16} | {'wall ms':>8} | {'vs baseline':>11} | {'import ms':>9} | {'modules':>7} | forbidden")
+    for name, result in results.items():
+        previous = baseline.get('scenarios', {}).get(name)
+        ratio = ''
+        flag = ''
+        if previous:
+            ratio = f"{result['wall_ms'] / previous['wall_ms']:.2f}x"
+            if (result['wall_ms'] > previous['wall_ms'] * (1 + max_slowdown)
+                    and result['wall_ms'] - previous['wall_ms'] > min_delta_ms):
+                flag = ' !'
+        if result['forbidden']:
+            flag = ' !'
+        regressions += bool(flag)
+        print(f"{name:>16} | {result['wall_ms']:>8.1f} | {ratio:>9}{flag:<2} | {result['import_ms']:>9.1f} | "
+              f"{result['modules']:>7} | {', '.join(result['forbidden']) or '-'}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='启动耗时与导入时间基准')
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS), help='逗号分隔的场景')
+    parser.add_argument('--repeat', type=int, default=5, help='每个场景的运行次数')
+    parser.add_argument('--report', help='输出该场景导入最慢的模块')
+    parser.add_argument('--baseline', default=BASELINE_FILE, help='基线文件')
+    parser.add_argument('--save-baseline', action='store_true', help='将本次结果写入基线文件')
+    parser.add_argument('--max-slowdown', type=float, default=0.3, help='允许的启动耗时增长比例')
+    parser.add_argument('--min-delta-ms', type=float, default=50, help='增长不超过该值时不计为退化')
+    args = parser.parse_args()
+
+    names = [n.strip() for n in args.scenarios.split(',') if n.strip()]
+    if args.report and args.report not in names:
+        names.append(args.report)
+    results = measure(names, args.repeat)
+
+    if args.report:
+        print(f"\nslowest imports for {args.report} (cumulative ms):")
+        for module, cumulative in results[args.report]['top']:
+            print(f"  {cumulative / 1000:>8.1f}  {module}")
+        print()
+
+    if args.save_baseline:
+        baseline = {'python': sys.version.split()[0], 'scenarios': {}}
+        for name, result in results.items():
+            baseline['scenarios'][name] = {'wall_ms': result['wall_ms'], 'modules': result['modules']}
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+            f.write('\n')
+        compare(results, {}, args.max_slowdown, args.min_delta_ms)
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --save-baseline first")
+        return 2
+    with open(args.baseline, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, args.max_slowdown, args.min_delta_ms)
+    if regressions:
+        print(f"{regressions} scenario(s) regressed")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,199 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+存储后端对比基准（聊天路径上的数据库访问）
+
+用法：
+    python benchmarks/bench_storage.py                         # SQLite（临时库，fixtures数据）与MySQL对比
+    python benchmarks/bench_storage.py --backends sqlite --seed-from-mysql
+    python benchmarks/bench_storage.py --include-writes --repeat 5
+
+每个问题按 /api/chat 的顺序执行：知识库检索（不含向量合并）、页面检索、段落检索、
+school_info、会话历史，--include-writes 时再写入一条问答记录。输出各阶段及整条路径的
+p50/p95延迟（毫秒）和建立连接耗时。MySQL默认只读；SQLite始终使用临时数据库文件。
+"""
+
+import sys
+import os
+import json
+import time
+import uuid
+import shutil
+import argparse
+import tempfile
+from typing import Dict, List
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.eval_retrieval import percentile
+from models.passages import split_passages
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+SEED_TABLES = ('crawled_pages', 'page_passages', 'knowledge_base', 'school_info')
+
+
+def stage_knowledge(db, question: str, state: Dict):
+    db.get_vector_index = lambda: None
+    try:
+        db.get_knowledge_base(question, limit=5)
+    finally:
+        del db.get_vector_index
+
+
+def stage_pages(db, question: str, state: Dict):
+    db.search_pages(question, limit=3)
+
+
+def stage_passages(db, question: str, state: Dict):
+    db.search_passages(question)
+
+
+def stage_school_info(db, question: str, state: Dict):
+    db.execute_query("SELECT info_key, info_value FROM school_info WHERE info_value IS NOT NULL")
+
+
+def stage_history(db, question: str, state: Dict):
+    db.get_recent_qa_history(state['session_id'], limit=10)
+
+
+def stage_save(db, question: str, state: Dict):
+    db.save_qa_history(state['session_id'], question, 'benchmark', 'benchmark', 0)
+
+
+STAGES: List[tuple] = [
+    ('knowledge', stage_knowledge),
+    ('pages', stage_pages),
+    ('passages', stage_passages),
+    ('school_info', stage_school_info),
+    ('history', stage_history),
+]
+
+
+def seed_from_fixtures(db) -> int:
+    """qa_corpus的页面和问答对、hot_paths的知识库条目写入空库"""
+    with open(os.path.join(FIXTURE_DIR, 'qa_corpus.json'), 'r', encoding='utf-8') as f:
+        corpus = json.load(f)['pages']
+    with open(os.path.join(FIXTURE_DIR, 'hot_paths.json'), 'r', encoding='utf-8') as f:
+        hot_paths = json.load(f)
+    count = 0
+    for page in corpus:
+        url = f"https://www.hljeu.edu.cn/bench/{page['name']}.htm"
+        db.save_crawled_page({
+            'url': url,
+            'title': page['content'][:30],
+            'content': page['content'],
+            'page_type': 'notice',
+            'category': 'benchmark'
+        })
+        db.save_page_passages(url, split_passages(page['content']))
+        for question, answer in page['expected']:
+            count += db.save_knowledge(question, answer, category='benchmark', keywords=question[:20])
+    for item in hot_paths['knowledge_results']:
+        count += db.save_knowledge(item['question'], item['answer'], item['source_url'], 'benchmark')
+    db.execute_update(
+        "INSERT INTO school_info (info_key, info_value, info_type) VALUES (%s, %s, %s)",
+        ('bench_intro', hot_paths['page_content'], 'basic'))
+    return count + len(corpus)
+
+
+def seed_from_mysql(db) -> int:
+    """从MySQL复制聊天路径用到的表（FTS索引由触发器生成）"""
+    from database.db_manager import DatabaseManager
+    source = DatabaseManager()
+    count = 0
+    try:
+        for table in SEED_TABLES:
+            rows = source.execute_query(f"SELECT * FROM {table}")
+            if not rows:
+                continue
+            columns = list(rows[0].keys())
+            query = (f"INSERT INTO {table} ({', '.join(columns)}) "
+                     f"VALUES ({', '.join(['%s'] * len(columns))})")
+            count += db.execute_many(query, [tuple(row[c] for c in columns) for row in rows])
+    finally:
+        source.close()
+    return count
+
+
+def open_backend(name: str, args, workdir: str):
+    """返回 (DatabaseManager, 连接耗时ms)"""
+    from database.db_manager import DatabaseManager
+    from database.backends import create_backend, SQLiteBackend
+    backend = SQLiteBackend(os.path.join(workdir, 'bench.db')) if name == 'sqlite' else create_backend(name)
+    db = DatabaseManager(lazy=True, backend=backend)
+    start = time.perf_counter()
+    db.connect()
+    connect_ms = (time.perf_counter() - start) * 1000
+    if name == 'sqlite':
+        seeded = seed_from_mysql(db) if args.seed_from_mysql else seed_from_fixtures(db)
+        print(f"sqlite: seeded {seeded} rows")
+    return db, connect_ms
+
+
+def run_backend(db, questions: List[str], stages: List[tuple], repeat: int) -> Dict:
+    session_id = f"bench-{uuid.uuid4().hex[:8]}"
+    timings: Dict[str, List[float]] = {name: [] for name, _ in stages}
+    timings['total'] = []
+    for question in questions:
+        state = {'session_id': session_id}
+        for name, stage in stages:
+            stage(db, question, state)  # 预热
+    for _ in range(repeat):
+        for question in questions:
+            state = {'session_id': session_id}
+            total = 0.0
+            for name, stage in stages:
+                start = time.perf_counter()
+                stage(db, question, state)
+                elapsed = (time.perf_counter() - start) * 1000
+                timings[name].append(elapsed)
+                total += elapsed
+            timings['total'].append(total)
+    return {name: {'p50_ms': round(percentile(values, 50), 3), 'p95_ms': round(percentile(values, 95), 3)}
+            for name, values in timings.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='存储后端对比基准')
+    parser.add_argument('--backends', default='sqlite,mysql', help='逗号分隔：sqlite,mysql')
+    parser.add_argument('--repeat', type=int, default=3, help='问题集重复次数')
+    parser.add_argument('--seed-from-mysql', action='store_true', help='SQLite临时库从MySQL复制数据')
+    parser.add_argument('--include-writes', action='store_true', help='计入问答记录写入（MySQL上会写入qa_history）')
+    parser.add_argument('--output', help='JSON报告输出路径')
+    args = parser.parse_args()
+
+    with open(os.path.join(FIXTURE_DIR, 'hot_paths.json'), 'r', encoding='utf-8') as f:
+        questions = json.load(f)['questions']
+    stages = STAGES + ([('save', stage_save)] if args.include_writes else [])
+
+    report = {}
+    workdir = tempfile.mkdtemp(prefix='bench_storage_')
+    try:
+        for name in [n.strip() for n in args.backends.split(',') if n.strip()]:
+            try:
+                db, connect_ms = open_backend(name, args, workdir)
+            except Exception as e:
+                print(f"{name}: unavailable ({e})")
+                continue
+            try:
+                report[name] = run_backend(db, questions, stages, args.repeat)
+                report[name]['connect'] = {'ms': round(connect_ms, 3)}
+            finally:
+                db.close()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    stage_names = [name for name, _ in stages] + ['total']
+    for name, result in report.items():
+        print(f"\n{name} (connect {result['connect']['ms']:.1f} ms)")
+        print(f"{'stage':>14} | {'p50 ms':>9} | {'p95 ms':>9}")
+        for stage in stage_names:
+            print(f"{stage:>14} | {result[stage]['p50_ms']:>9.3f} | {result[stage]['p95_ms']:>9.3f}")
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2, sort_keys=True)
+            f.write('\n')
+    return 0 if report else 2
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,310 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+检索质量与延迟评测
+
+用法：
+    python benchmarks/eval_retrieval.py --output report.json
+    python benchmarks/eval_retrieval.py --replay 500 --backends kb_keyword,kb_hybrid
+    python benchmarks/eval_retrieval.py --compare baseline.json --max-recall-drop 0.02
+
+问题来源为标注集（fixtures/retrieval_golden.json）或 qa_history 中最近的提问（--replay）。
+每个检索后端报告 recall@k、MRR、延迟分位数及数据库读取行数（Handler_read_* 增量）。
+报告为排序后的 JSON，不含时间戳，可直接 diff；--compare 对比基线并在退化超过阈值时返回1。
+"""
+
+import sys
+import os
+import json
+import time
+import argparse
+from typing import Callable, Dict, List, Optional
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.text import question_fingerprint
+
+GOLDEN_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'retrieval_golden.json')
+
+
+def kb_keyword(db, question: str, k: int) -> List[Dict]:
+    """仅关键词LIKE检索，不合并向量结果"""
+    # 实例属性临时遮蔽get_vector_index方法
+    db.get_vector_index = lambda: None
+    try:
+        return db.get_knowledge_base(question, limit=k)
+    finally:
+        del db.get_vector_index
+
+
+def kb_hybrid(db, question: str, k: int) -> List[Dict]:
+    """关键词+向量检索（重排前的知识库候选）"""
+    return db.get_knowledge_base(question, limit=k)
+
+
+def pages(db, question: str, k: int) -> List[Dict]:
+    return db.search_pages(question, limit=k)
+
+
+def passages(db, question: str, k: int) -> List[Dict]:
+    """页面段落检索，按段落所属页面判断相关性"""
+    return db.search_passages(question, limit=k)
+
+
+_rerankers = {}
+
+
+def kb_reranked(db, question: str, k: int) -> List[Dict]:
+    """线上使用的重排：知识库与页面段落统一打分，取其中的知识库条目"""
+    if id(db) not in _rerankers:
+        from models.reranker import Reranker
+        _rerankers[id(db)] = Reranker(db)
+    ranked = _rerankers[id(db)].retrieve(question, limit=k * 3)
+    return [row for row in ranked if row['kind'] == 'kb'][:k]
+
+
+# 后端名称 -> (检索函数, 结果类型)；结果类型决定相关性判断方式
+BACKENDS: Dict[str, tuple] = {
+    'kb_keyword': (kb_keyword, 'kb'),
+    'kb_hybrid': (kb_hybrid, 'kb'),
+    'kb_reranked': (kb_reranked, 'kb'),
+    'pages': (pages, 'page'),
+    'passages': (passages, 'page'),
+}
+
+
+def load_golden(path: str) -> List[Dict]:
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)['queries']
+
+
+def load_replay(db, limit: int) -> List[Dict]:
+    """qa_history中最近的不同问题；用户评分不低于4且答案来自知识库的记录以该答案为标注"""
+    rows = db.execute_query("""
+        SELECT user_question, system_answer, answer_source, satisfaction_score
+        FROM qa_history
+        ORDER BY id DESC
+        LIMIT %s
+    """, (limit * 5,))
+    queries = {}
+    for row in rows:
+        fingerprint = question_fingerprint(row['user_question'])
+        if fingerprint in queries:
+            continue
+        query = {'question': row['user_question']}
+        if ((row.get('satisfaction_score') or 0) >= 4 and row.get('system_answer')
+                and (row.get('answer_source') or '').startswith('knowledge_base')):
+            query['answer_equals'] = [row['system_answer']]
+        queries[fingerprint] = query
+        if len(queries) >= limit:
+            break
+    return list(queries.values())
+
+
+def is_labeled(query: Dict, kind: str) -> bool:
+    if kind == 'kb':
+        return bool(query.get('kb_ids') or query.get('answer_contains') or query.get('answer_equals'))
+    return bool(query.get('page_urls') or query.get('title_contains'))
+
+
+def is_relevant(row: Dict, query: Dict, kind: str) -> bool:
+    if kind == 'kb':
+        if row.get('id') in (query.get('kb_ids') or []):
+            return True
+        if row.get('answer') in (query.get('answer_equals') or []):
+            return True
+        text = f"{row.get('question') or ''}\n{row.get('answer') or ''}"
+        return any(s in text for s in query.get('answer_contains') or [])
+    if row.get('url') in (query.get('page_urls') or []):
+        return True
+    return any(s in (row.get('title') or '') for s in query.get('title_contains') or [])
+
+
+class RowsExaminedProbe:
+    """用会话级 Handler_read_* 计数的增量估计一次检索读取的行数（仅MySQL）"""
+
+    def __init__(self, db):
+        self.db = db
+        self.available = db.backend.name == 'mysql' and bool(self._read())
+        # SHOW STATUS 本身也会增加计数，测量两次空操作得到固定开销
+        self.overhead = 0
+        if self.available:
+            first = self._read()
+            self.overhead = self._read() - first
+
+    def _read(self) -> Optional[int]:
+        rows = self.db.execute_query("SHOW SESSION STATUS LIKE 'Handler_read%'")
+        if not rows:
+            return None
+        return sum(int(row.get('Value') or 0) for row in rows)
+
+    def measure(self, func: Callable):
+        if not self.available:
+            return func(), None
+        before = self._read()
+        result = func()
+        return result, max(0, self._read() - before - self.overhead)
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def evaluate_backend(db, name: str, queries: List[Dict], k: int, probe: RowsExaminedProbe) -> Dict:
+    func, kind = BACKENDS[name]
+    latencies, rows_examined, reciprocal_ranks, hits = [], [], [], 0
+    per_query = []
+    for query in queries:
+        start = time.perf_counter()
+        results, rows = probe.measure(lambda: func(db, query['question'], k))
+        latency_ms = (time.perf_counter() - start) * 1000
+        latencies.append(latency_ms)
+        if rows is not None:
+            rows_examined.append(rows)
+
+        rank = None
+        if is_labeled(query, kind):
+            for position, row in enumerate(results[:k], 1):
+                if is_relevant(row, query, kind):
+                    rank = position
+                    break
+            hits += 1 if rank else 0
+            reciprocal_ranks.append(1.0 / rank if rank else 0.0)
+        per_query.append({
+            'question': query['question'],
+            'labeled': is_labeled(query, kind),
+            'rank': rank,
+            'results': len(results),
+            'rows_examined': rows
+        })
+
+    labeled = len(reciprocal_ranks)
+    return {
+        'queries': len(queries),
+        'labeled': labeled,
+        f'recall@{k}': round(hits / labeled, 4) if labeled else None,
+        'mrr': round(sum(reciprocal_ranks) / labeled, 4) if labeled else None,
+        'latency_ms': {
+            'p50': round(percentile(latencies, 50), 2),
+            'p95': round(percentile(latencies, 95), 2),
+            'p99': round(percentile(latencies, 99), 2),
+            'max': round(max(latencies), 2) if latencies else 0.0
+        },
+        'rows_examined': {
+            'mean': round(sum(rows_examined) / len(rows_examined), 1),
+            'p95': percentile(rows_examined, 95),
+            'max': max(rows_examined)
+        } if rows_examined else None,
+        # 按问题排序，便于逐条对比
+        'per_query': sorted(per_query, key=lambda item: item['question'])
+    }
+
+
+def compare(report: Dict, baseline: Dict, max_recall_drop: float, max_latency_increase: float) -> int:
+    """打印与基线的差异，返回退化的指标数"""
+    k = report['k']
+    regressions = 0
+    for name, current in report['backends'].items():
+        previous = baseline.get('backends', {}).get(name)
+        if previous is None:
+            print(f"{name:>12}: new backend")
+            continue
+        for metric in (f'recall@{k}', 'mrr'):
+            old, new = previous.get(metric), current.get(metric)
+            if old is None or new is None:
+                continue
+            flag = ''
+            if old - new > max_recall_drop:
+                flag = '  <-- REGRESSION'
+                regressions += 1
+            print(f"{name:>12} {metric:>10}: {old:.4f} -> {new:.4f} ({new - old:+.4f}){flag}")
+        old, new = previous['latency_ms']['p95'], current['latency_ms']['p95']
+        flag = ''
+        # 亚毫秒级的波动不算退化
+        if new - old > 1.0 and (new - old) / max(old, 1e-6) > max_latency_increase:
+            flag = '  <-- REGRESSION'
+            regressions += 1
+        print(f"{name:>12} {'p95 ms':>10}: {old:.2f} -> {new:.2f}{flag}")
+        if previous.get('rows_examined') and current.get('rows_examined'):
+            print(f"{name:>12} {'rows/query':>10}: {previous['rows_examined']['mean']} -> "
+                  f"{current['rows_examined']['mean']}")
+    return regressions
+
+
+def print_summary(report: Dict):
+    k = report['k']
+    print(f"{'backend':>12} | {'labeled':>7} | {f'recall@{k}':>9} | {'MRR':>6} | "
+          f"{'p50 ms':>8} | {'p95 ms':>8} | {'p99 ms':>8} | {'rows/query':>10}")
+    for name, result in report['backends'].items():
+        recall = result[f'recall@{k}']
+        mrr = result['mrr']
+        rows = result['rows_examined']['mean'] if result['rows_examined'] else '-'
+        print(f"{name:>12} | {result['labeled']:>7} | {recall if recall is not None else '-':>9} | "
+              f"{mrr if mrr is not None else '-':>6} | {result['latency_ms']['p50']:>8} | "
+              f"{result['latency_ms']['p95']:>8} | {result['latency_ms']['p99']:>8} | {rows:>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='检索质量与延迟评测')
+    parser.add_argument('--golden', default=GOLDEN_FILE, help='标注集文件')
+    parser.add_argument('--replay', type=int, help='改为回放qa_history中最近N个不同问题')
+    parser.add_argument('--backends', default=','.join(BACKENDS), help='逗号分隔的检索后端')
+    parser.add_argument('-k', type=int, default=5, help='评测前k个结果')
+    parser.add_argument('--warmup', type=int, default=1, help='正式计时前的预热轮数')
+    parser.add_argument('--output', help='报告输出文件（JSON）')
+    parser.add_argument('--compare', help='基线报告文件')
+    parser.add_argument('--max-recall-drop', type=float, default=0.02, help='recall/MRR允许的最大下降')
+    parser.add_argument('--max-latency-increase', type=float, default=0.25, help='p95延迟允许的最大增幅（比例）')
+    args = parser.parse_args()
+
+    names = [name.strip() for name in args.backends.split(',') if name.strip()]
+    unknown = [name for name in names if name not in BACKENDS]
+    if unknown:
+        print(f"Unknown backends: {', '.join(unknown)} (available: {', '.join(BACKENDS)})")
+        return 2
+
+    from database.db_manager import DatabaseManager
+    db = DatabaseManager()
+    queries = load_replay(db, args.replay) if args.replay else load_golden(args.golden)
+    if not queries:
+        print("No queries to evaluate")
+        return 2
+
+    # 预热：加载jieba词典、向量索引及数据库缓存，避免计入首个查询
+    for _ in range(args.warmup):
+        for name in names:
+            for query in queries:
+                BACKENDS[name][0](db, query['question'], args.k)
+
+    probe = RowsExaminedProbe(db)
+    report = {
+        'source': f"replay:{args.replay}" if args.replay else os.path.basename(args.golden),
+        'k': args.k,
+        'rows_examined_available': probe.available,
+        'backends': {name: evaluate_backend(db, name, queries, args.k, probe) for name in names}
+    }
+    db.close()
+
+    print_summary(report)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2, sort_keys=True)
+            f.write('\n')
+        print(f"Report written to {args.output}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        if baseline.get('k') != args.k or baseline.get('source') != report['source']:
+            print("Warning: baseline was produced with a different query set or k")
+        regressions = compare(report, baseline, args.max_recall_drop, args.max_latency_increase)
+        if regressions:
+            print(f"{regressions} metric(s) regressed")
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,10 +1,12 @@
 import os
+import multiprocessing
 from dotenv import load_dotenv
 
 load_dotenv()
 
 class Config:
     # 数据库配置
+    DB_BACKEND = os.getenv('DB_BACKEND', 'mysql').lower()  # 存储后端：mysql / sqlite（嵌入式，无需数据库服务）
     MYSQL_HOST = os.getenv('MYSQL_HOST', 'localhost')
     MYSQL_PORT = int(os.getenv('MYSQL_PORT', 3306))
     MYSQL_USER = os.getenv('MYSQL_USER', 'root')
@@ -18,6 +20,32 @@ class Config:
     # Hugging Face API配置（可选）
     HUGGINGFACE_API_KEY = os.getenv('HUGGINGFACE_API_KEY', '')
     
+    # 大模型服务路由配置
+    LLM_PROVIDERS = os.getenv('LLM_PROVIDERS', 'deepseek,huggingface')  # 按优先级排列，逗号分隔
+    LLM_REQUEST_TIMEOUT = int(os.getenv('LLM_REQUEST_TIMEOUT', 30))  # 单次调用超时（秒）
+    LLM_SIMILAR_TIMEOUT = float(os.getenv('LLM_SIMILAR_TIMEOUT', 5))  # 生成相关问题时每个服务的等待时间（秒），超时计为失败
+    LLM_HEDGE_DEFAULT_MS = int(os.getenv('LLM_HEDGE_DEFAULT_MS', 8000))  # 样本不足时，主服务超过该时间未返回即请求备用服务
+    LLM_HEDGE_MIN_MS = int(os.getenv('LLM_HEDGE_MIN_MS', 1500))  # 对冲等待时间下限，避免过早重复调用
+    LLM_BREAKER_WINDOW = int(os.getenv('LLM_BREAKER_WINDOW', 20))  # 熔断器统计最近N次调用
+    LLM_BREAKER_ERROR_RATE = float(os.getenv('LLM_BREAKER_ERROR_RATE', 0.5))  # 失败（含慢调用）比例达到该值时熔断
+    LLM_BREAKER_SLOW_MS = int(os.getenv('LLM_BREAKER_SLOW_MS', 20000))  # 超过该耗时的调用计为失败
+    LLM_BREAKER_COOLDOWN = int(os.getenv('LLM_BREAKER_COOLDOWN', 30))  # 熔断后多久放行一次试探调用（秒）
+    
+    # 数据文件配置
+    DATA_DIR = os.getenv('DATA_DIR', os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data'))
+    IDF_FILE = os.path.join(DATA_DIR, 'domain_idf.txt')  # 语料IDF表（jieba格式）
+    INDEX_SNAPSHOT_FILE = os.getenv('INDEX_SNAPSHOT_FILE', os.path.join(DATA_DIR, 'index_snapshot.bin'))  # 检索索引快照（词典、倒排表、页面元数据、知识库向量）
+    INDEX_SNAPSHOT_REBUILD_STALE = os.getenv('INDEX_SNAPSHOT_REBUILD_STALE', 'false').lower() == 'true'  # 启动时快照与数据库不一致是否重建
+    VECTOR_MIN_SCORE = float(os.getenv('VECTOR_MIN_SCORE', 0.35))  # 语义检索最低相似度
+    PASSAGE_MAX_CHARS = int(os.getenv('PASSAGE_MAX_CHARS', 300))  # 页面段落的最大长度（字符）
+    PASSAGE_TOP_K = int(os.getenv('PASSAGE_TOP_K', 4))  # 段落检索默认返回的段落数
+    PASSAGE_CONTEXT_CHARS = int(os.getenv('PASSAGE_CONTEXT_CHARS', 600))  # 段落放入提示词的总长度，参考内容共1000字，其余留给学校信息
+    RERANK_CANDIDATES = int(os.getenv('RERANK_CANDIDATES', 50))  # 知识库和页面段落各取多少候选参与重排
+    RERANK_TOP_K = int(os.getenv('RERANK_TOP_K', 6))  # 重排后进入提示词的候选数
+    RERANK_HALF_LIFE_DAYS = float(os.getenv('RERANK_HALF_LIFE_DAYS', 365))  # 新鲜度特征的半衰期（天）
+    SQLITE_PATH = os.getenv('SQLITE_PATH', os.path.join(DATA_DIR, 'hlg_eu.db'))  # DB_BACKEND=sqlite时的数据库文件
+    SQLITE_BUSY_TIMEOUT = int(os.getenv('SQLITE_BUSY_TIMEOUT', 5000))  # 写锁等待时间（毫秒）
+    
     # 爬虫配置
     BASE_URL = 'https://www.hljeu.edu.cn'
     CRAWL_DELAY = 1  # 爬取延迟（秒）
@@ -27,9 +55,63 @@ class Config:
     # Flask配置
     FLASK_HOST = '0.0.0.0'
     FLASK_PORT = 5001
-    FLASK_DEBUG = True
+    FLASK_DEBUG = os.getenv('FLASK_DEBUG', 'true').lower() == 'true'
     SECRET_KEY = os.getenv('SECRET_KEY', 'dev-secret-key-change-in-production')
     
+    # 生产服务配置（gunicorn预派生多进程）
+    SERVER_MODE = os.getenv('SERVER_MODE', 'development')  # production时run.py server使用gunicorn
+    SERVER_WORKERS = int(os.getenv('SERVER_WORKERS', multiprocessing.cpu_count() * 2 + 1))  # worker进程数
+    SERVER_THREADS = int(os.getenv('SERVER_THREADS', 4))  # 每个worker的线程数（大模型调用以IO等待为主）
+    SERVER_MAX_REQUESTS = int(os.getenv('SERVER_MAX_REQUESTS', 1000))  # worker处理N个请求后回收，0为不回收
+    SERVER_MAX_REQUESTS_JITTER = int(os.getenv('SERVER_MAX_REQUESTS_JITTER', 100))  # 回收阈值随机抖动，避免同时重启
+    SERVER_TIMEOUT = int(os.getenv('SERVER_TIMEOUT', 120))  # 单个请求超时（秒）
+    SERVER_GRACEFUL_TIMEOUT = int(os.getenv('SERVER_GRACEFUL_TIMEOUT', 30))  # 重载/停止时等待请求完成的时间（秒）
+    SERVER_KEEPALIVE = int(os.getenv('SERVER_KEEPALIVE', 5))
+    SERVER_PID_FILE = os.getenv('SERVER_PID_FILE', os.path.join(DATA_DIR, 'gunicorn.pid'))
+    PROMETHEUS_MULTIPROC_DIR = os.getenv('PROMETHEUS_MULTIPROC_DIR', os.path.join(DATA_DIR, 'prometheus'))  # 多进程指标文件目录，生产模式启动时清空
+    
+    # 聊天接口准入控制（按进程计算）
+    CHAT_MAX_CONCURRENT = int(os.getenv('CHAT_MAX_CONCURRENT', max(1, SERVER_THREADS - 1)))  # 同时调用大模型的请求数，留出线程服务其他接口
+    CHAT_MAX_QUEUE = int(os.getenv('CHAT_MAX_QUEUE', SERVER_THREADS))  # 等待队列长度
+    CHAT_QUEUE_TIMEOUT = float(os.getenv('CHAT_QUEUE_TIMEOUT', 1.5))  # 排队最长等待（秒）
+    CHAT_RETRY_AFTER = int(os.getenv('CHAT_RETRY_AFTER', 5))  # 过载时建议客户端重试的间隔（秒）
+    CHAT_SESSION_RATE = float(os.getenv('CHAT_SESSION_RATE', 0.5))  # 每个会话每秒补充的令牌数，0为不限速
+    CHAT_SESSION_BURST = int(os.getenv('CHAT_SESSION_BURST', 5))
+    CHAT_IP_RATE = float(os.getenv('CHAT_IP_RATE', 2.0))  # 每个IP每秒补充的令牌数，0为不限速
+    CHAT_IP_BURST = int(os.getenv('CHAT_IP_BURST', 20))
+    
+    # 批量问答配置
+    BATCH_CONCURRENCY = int(os.getenv('BATCH_CONCURRENCY', 4))  # 批量任务同时调用大模型的问题数
+    BATCH_MAX_QUESTIONS = int(os.getenv('BATCH_MAX_QUESTIONS', 1000))  # 接口单次最多问题数
+    
+    # 后台任务（run.py worker）
+    JOB_POLL_SECONDS = float(os.getenv('JOB_POLL_SECONDS', 5))  # 空闲时查询待执行任务的间隔
+    JOB_HEARTBEAT_SECONDS = int(os.getenv('JOB_HEARTBEAT_SECONDS', 30))  # 运行中任务的心跳间隔
+    JOB_STALE_SECONDS = int(os.getenv('JOB_STALE_SECONDS', 600))  # 超过该时间没有心跳的任务视为执行进程已退出，标记为失败
+    JOB_SCHEDULE_SECONDS = int(os.getenv('JOB_SCHEDULE_SECONDS', 60))  # 检查system_config定时爬取的间隔
+
+    # 热门问题答案预生成
+    PRECOMPUTE_ENABLED = os.getenv('PRECOMPUTE_ENABLED', 'true').lower() == 'true'  # 问答接口是否使用预生成答案
+    PRECOMPUTE_TOP_N = int(os.getenv('PRECOMPUTE_TOP_N', 200))  # 预生成提问次数最多的N个问题
+    PRECOMPUTE_WINDOW_DAYS = int(os.getenv('PRECOMPUTE_WINDOW_DAYS', 7))  # 统计提问次数的时间窗口（天）
+    PRECOMPUTE_MIN_COUNT = int(os.getenv('PRECOMPUTE_MIN_COUNT', 3))  # 窗口内至少被问过几次才预生成
+    PRECOMPUTE_TTL_HOURS = int(os.getenv('PRECOMPUTE_TTL_HOURS', 48))  # 预生成答案的有效期（小时）
+    PRECOMPUTE_HOURS = os.getenv('PRECOMPUTE_HOURS', '3')  # 后台任务进程在这些整点（逗号分隔，本地时间）自动预生成，留空不定时
+    PRECOMPUTE_REFRESH_SECONDS = int(os.getenv('PRECOMPUTE_REFRESH_SECONDS', 60))  # Web进程重新加载并校验预生成答案的间隔
+    
+    # 会话历史缓存（按进程）
+    SESSION_HISTORY_TURNS = int(os.getenv('SESSION_HISTORY_TURNS', 10))  # 每个会话缓存的轮数
+    SESSION_IDLE_SECONDS = int(os.getenv('SESSION_IDLE_SECONDS', 1800))  # 空闲多久后淘汰
+    SESSION_MAX_COUNT = int(os.getenv('SESSION_MAX_COUNT', 10000))  # 最多缓存的会话数
+    SESSION_CACHE_MAX_MB = int(os.getenv('SESSION_CACHE_MAX_MB', 64))  # 缓存内存上限（估算值）
+    
+    # 统计配置
+    STATS_RECONCILE_SECONDS = int(os.getenv('STATS_RECONCILE_SECONDS', 600))  # 统计快照与数据库核对间隔
+    
     # 日志配置
-    LOG_LEVEL = 'INFO'
-    LOG_FILE = 'dongfang_zhida.log'
\ No newline at end of file
+    LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
+    LOG_FILE = os.getenv('LOG_FILE', 'dongfang_zhida.log')
+    # 各子系统的日志级别，如 models.deepseek_client=DEBUG,crawler=WARNING
+    LOG_LEVELS = os.getenv('LOG_LEVELS', 'urllib3=WARNING,jieba=WARNING')
+    LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', 10000))  # 异步日志队列长度，满时丢弃
+    LOG_VERBOSE_PER_SECOND = float(os.getenv('LOG_VERBOSE_PER_SECOND', 5))  # 每个调用位置每秒最多输出的INFO/DEBUG日志，0为不限制
\ No newline at end of file
@@ -3,7 +3,7 @@ from bs4 import BeautifulSoup
 from urllib.parse import urljoin, urlparse
 import time
 import logging
-from typing import Set, Dict, List
+from typing import Set, Dict, List, Optional
 import re
 from datetime import datetime
 import sys
@@ -12,27 +12,23 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from config.config import Config
 from database.db_manager import DatabaseManager
+from models.passages import split_passages
+from utils.tracing import span
+from utils.logging_setup import setup_logging
 
 class HLJEUSpider:
-    def __init__(self):
+    def __init__(self, db: DatabaseManager = None):
         self.base_url = Config.BASE_URL
         self.visited_urls: Set[str] = set()
         self.to_visit: List[str] = []
-        self.db = DatabaseManager()
+        self.db = db or DatabaseManager()
         self.session = requests.Session()
         self.session.headers.update({
             'User-Agent': Config.USER_AGENT
         })
         
         # 配置日志
-        logging.basicConfig(
-            level=getattr(logging, Config.LOG_LEVEL),
-            format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-            handlers=[
-                logging.FileHandler(Config.LOG_FILE),
-                logging.StreamHandler()
-            ]
-        )
+        setup_logging()
         self.logger = logging.getLogger(__name__)
         
         # URL模式分类
@@ -126,13 +122,13 @@ class HLJEUSpider:
         
         return 'general'
     
-    def crawl_page(self, url: str, depth: int = 0) -> None:
-        """爬取单个页面"""
+    def crawl_page(self, url: str, depth: int = 0) -> Optional[bool]:
+        """爬取单个页面，成功获取返回True，请求失败返回False，超出深度或已访问返回None"""
         if depth > Config.MAX_DEPTH:
-            return
+            return None
         
         if url in self.visited_urls:
-            return
+            return None
         
         try:
             self.logger.info(f"Crawling: {url} (depth: {depth})")
@@ -140,20 +136,22 @@ class HLJEUSpider:
             # 添加延迟，避免过快请求
             time.sleep(Config.CRAWL_DELAY)
             
-            response = self.session.get(url, timeout=10)
-            response.encoding = response.apparent_encoding or 'utf-8'
+            with span('spider_fetch'):
+                response = self.session.get(url, timeout=10)
+                response.encoding = response.apparent_encoding or 'utf-8'
             
             if response.status_code != 200:
                 self.logger.warning(f"Failed to fetch {url}: Status {response.status_code}")
-                return
+                return False
             
             self.visited_urls.add(url)
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            # 提取并保存页面内容
-            page_data = self.extract_page_content(soup, url)
+            with span('spider_parse'):
+                soup = BeautifulSoup(response.text, 'html.parser')
+                # 提取页面内容
+                page_data = self.extract_page_content(soup, url)
             if page_data['content']:
-                self.db.save_crawled_page(page_data)
+                if self.db.save_crawled_page(page_data):
+                    self.db.save_page_passages(page_data['url'], split_passages(page_data['content']))
                 self.logger.info(f"Saved: {page_data['title'][:50]}")
             
             # 提取页面中的链接
@@ -161,9 +159,11 @@ class HLJEUSpider:
                 absolute_url = urljoin(self.base_url, link['href'])
                 if self.is_valid_url(absolute_url) and absolute_url not in self.visited_urls:
                     self.to_visit.append((absolute_url, depth + 1))
+            return True
             
         except Exception as e:
             self.logger.error(f"Error crawling {url}: {str(e)}")
+            return False
     
     def crawl_specific_urls(self, urls_file: str = 'wangye.txt'):
         """从文件读取并爬取特定URL"""
@@ -191,7 +191,8 @@ class HLJEUSpider:
                         self.logger.info(f"Crawling specific URL: {url}")
                         time.sleep(Config.CRAWL_DELAY)
                         
-                        response = self.session.get(url, timeout=10)
+                        with span('spider_fetch'):
+                            response = self.session.get(url, timeout=10)
                         # 尝试不同的编码
                         if response.encoding == 'ISO-8859-1':
                             response.encoding = 'utf-8'
@@ -203,12 +204,13 @@ class HLJEUSpider:
                             continue
                         
                         self.visited_urls.add(url)
-                        soup = BeautifulSoup(response.text, 'html.parser')
-                        
-                        # 提取并保存页面内容
-                        page_data = self.extract_page_content(soup, url)
+                        with span('spider_parse'):
+                            soup = BeautifulSoup(response.text, 'html.parser')
+                            # 提取页面内容
+                            page_data = self.extract_page_content(soup, url)
                         if page_data['content']:
-                            self.db.save_crawled_page(page_data)
+                            if self.db.save_crawled_page(page_data):
+                                self.db.save_page_passages(page_data['url'], split_passages(page_data['content']))
                             self.logger.info(f"Saved: {page_data['title'][:50]}")
                             crawled_count += 1
                         
@@ -228,8 +230,12 @@ class HLJEUSpider:
         finally:
             self.db.close()
     
-    def start_crawling(self, start_urls: List[str] = None):
-        """开始爬取"""
+    def start_crawling(self, start_urls: List[str] = None, progress=None) -> Dict:
+        """开始爬取，返回 {'task_id', 'status', 'crawled', 'failed', 'error'}
+
+        crawled为成功获取的页面数；所有页面都请求失败（如网络不通）时status为failed
+        progress(已爬取数, 上限, 说明) 每10个页面回调一次，供后台任务上报进度
+        """
         if not start_urls:
             # 默认起始页面
             start_urls = [
@@ -250,30 +256,46 @@ class HLJEUSpider:
             self.to_visit.append((url, 0))
         
         crawled_count = 0
+        fetched = failed = 0
+        status = 'completed'
+        error = None
         
         try:
             while self.to_visit and crawled_count < 500:  # 限制最多爬取500个页面
                 url, depth = self.to_visit.pop(0)
                 if url not in self.visited_urls:
-                    self.crawl_page(url, depth)
+                    outcome = self.crawl_page(url, depth)
                     crawled_count += 1
+                    if outcome:
+                        fetched += 1
+                    elif outcome is False:
+                        failed += 1
                     
                     # 更新任务进度
                     if crawled_count % 10 == 0:
                         self.db.update_crawl_task(task_id, 'running', crawled_count, len(self.visited_urls))
+                        if progress:
+                            progress(crawled_count, 500, url)
             
-            # 完成爬取
-            self.db.update_crawl_task(task_id, 'completed', crawled_count, len(self.visited_urls))
-            self.logger.info(f"Crawling completed. Total pages: {len(self.visited_urls)}")
+            if failed and not fetched:
+                status, error = 'failed', f"All {failed} page requests failed"
+                self.logger.error(f"Crawling failed: {error}")
+            else:
+                self.logger.info(f"Crawling completed. Total pages: {len(self.visited_urls)}, failed: {failed}")
+            self.db.update_crawl_task(task_id, status, crawled_count, len(self.visited_urls), error)
             
         except KeyboardInterrupt:
             self.logger.info("Crawling interrupted by user")
-            self.db.update_crawl_task(task_id, 'failed', crawled_count, len(self.visited_urls), "User interrupted")
+            status, error = 'failed', "User interrupted"
+            self.db.update_crawl_task(task_id, status, crawled_count, len(self.visited_urls), error)
         except Exception as e:
             self.logger.error(f"Crawling failed: {str(e)}")
-            self.db.update_crawl_task(task_id, 'failed', crawled_count, len(self.visited_urls), str(e))
+            status, error = 'failed', str(e)
+            self.db.update_crawl_task(task_id, status, crawled_count, len(self.visited_urls), error)
         finally:
             self.db.close()
+        
+        return {'task_id': task_id, 'status': status, 'crawled': fetched, 'failed': failed, 'error': error}
 
 if __name__ == "__main__":
     import sys
@@ -0,0 +1,407 @@
+"""
+存储后端：MySQL（默认）和嵌入式SQLite
+
+DatabaseManager中的SQL按MySQL方言编写；SQLite后端在执行前转换占位符、时间函数和
+ON DUPLICATE KEY UPDATE等写法，页面和知识库检索使用FTS5全文索引。
+"""
+
+import re
+import sqlite3
+import logging
+import threading
+from datetime import date, datetime
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pymysql
+from pymysql.cursors import DictCursor
+
+from config.config import Config
+
+SQLITE_SCHEMA_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'schema_sqlite.sql')
+
+
+def like_page_search(keyword: str, limit: int) -> Tuple[str, list]:
+    """按LIKE匹配标题和正文"""
+    query = """
+        SELECT id, url, title,
+               SUBSTRING(content, 1, 200) as snippet,
+               page_type, category,
+               (CASE
+                WHEN title LIKE %s THEN 2.0
+                WHEN content LIKE %s THEN 1.0
+                ELSE 0.5
+               END) as relevance
+        FROM crawled_pages
+        WHERE title LIKE %s OR content LIKE %s
+        ORDER BY relevance DESC
+        LIMIT %s
+    """
+    search_term = f'%{keyword}%'
+    return query, [search_term, search_term, search_term, search_term, limit]
+
+
+def like_knowledge_search(question: str, keywords: List[str], limit: int) -> Tuple[str, list]:
+    """任一关键词出现在问题、答案或关键词中即命中，完整问题匹配的排在前面"""
+    conditions = []
+    params = []
+
+    for keyword in keywords:
+        keyword_pattern = f'%{keyword}%'
+        conditions.append("(question LIKE %s OR answer LIKE %s OR keywords LIKE %s)")
+        params.extend([keyword_pattern, keyword_pattern, keyword_pattern])
+
+    where_clause = " OR ".join(conditions)
+
+    query = f"""
+        SELECT id, question, answer, source_url, confidence_score, update_time,
+               (CASE
+                WHEN question LIKE %s THEN 3.0
+                WHEN answer LIKE %s THEN 2.0
+                ELSE 1.0
+               END) as relevance
+        FROM knowledge_base
+        WHERE {where_clause}
+        ORDER BY relevance DESC, confidence_score DESC
+        LIMIT %s
+    """
+
+    # 添加完整匹配的参数
+    full_question = f'%{question}%'
+    return query, [full_question, full_question] + params + [limit]
+
+
+class MySQLBackend:
+    name = 'mysql'
+
+    def connect(self):
+        return pymysql.connect(
+            host=Config.MYSQL_HOST,
+            port=Config.MYSQL_PORT,
+            user=Config.MYSQL_USER,
+            password=Config.MYSQL_PASSWORD,
+            database=Config.MYSQL_DATABASE,
+            charset='utf8mb4',
+            cursorclass=DictCursor,
+            autocommit=True
+        )
+
+    def page_search_query(self, keyword: str, limit: int) -> Tuple[str, list]:
+        return like_page_search(keyword, limit)
+
+    def knowledge_search_query(self, question: str, keywords: List[str], limit: int) -> Tuple[str, list]:
+        return like_knowledge_search(question, keywords, limit)
+
+    def passage_search_query(self, question: str, limit: int) -> Tuple[str, list]:
+        """段落表的ngram全文索引，按自然语言模式相关度排序"""
+        query = """
+            SELECT pp.id, pp.page_id, pp.seq, pp.start_offset, pp.end_offset, pp.content, pp.token_count,
+                   p.url, p.title, p.page_type, p.update_time,
+                   MATCH(pp.content) AGAINST(%s IN NATURAL LANGUAGE MODE) as relevance
+            FROM page_passages pp
+            JOIN crawled_pages p ON p.id = pp.page_id
+            WHERE MATCH(pp.content) AGAINST(%s IN NATURAL LANGUAGE MODE)
+            ORDER BY relevance DESC
+            LIMIT %s
+        """
+        return query, [question, question, limit]
+
+    def table_update_time(self, db, table_name: str):
+        rows = db.execute_query(
+            """
+            SELECT UPDATE_TIME AS update_time FROM information_schema.TABLES
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+            """,
+            (table_name,)
+        )
+        return rows[0]['update_time'] if rows else None
+
+    def table_columns(self, db, table_name: str) -> List[str]:
+        rows = db.execute_query(
+            """
+            SELECT COLUMN_NAME AS name FROM information_schema.COLUMNS
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+            ORDER BY ORDINAL_POSITION
+            """,
+            (table_name,)
+        )
+        return [row['name'] for row in rows]
+
+
+# ---------------------------------------------------------------- SQLite
+
+_DUPLICATE_KEY = re.compile(r'\bON\s+DUPLICATE\s+KEY\s+UPDATE\b', re.IGNORECASE)
+_VALUES_REF = re.compile(r'\bVALUES\s*\(\s*(\w+)\s*\)', re.IGNORECASE)
+_DATE_SUB_NOW = re.compile(r'\bDATE_SUB\s*\(\s*NOW\(\)\s*,\s*INTERVAL\s+(\d+)\s+(SECOND|MINUTE|HOUR|DAY|MONTH|YEAR)\s*\)',
+                           re.IGNORECASE)
+_NOW = re.compile(r'\bNOW\(\)', re.IGNORECASE)
+_DATE_FORMAT = re.compile(r"\bDATE_FORMAT\s*\(\s*([\w.]+(?:\(\))?)\s*,\s*('[^']*')\s*\)", re.IGNORECASE)
+_SUBSTRING = re.compile(r'\bSUBSTRING\s*\(', re.IGNORECASE)
+_INSERT_IGNORE = re.compile(r'\bINSERT\s+IGNORE\b', re.IGNORECASE)
+
+
+@lru_cache(maxsize=512)
+def translate_sql(query: str, has_params: bool) -> Tuple[str, Optional[str]]:
+    """MySQL方言转换为SQLite，返回(语句, 不带冲突更新的INSERT语句或None)"""
+    if has_params:
+        # pymysql只在有参数时处理%转义
+        query = query.replace('%s', '?').replace('%%', '%')
+    query = _DATE_FORMAT.sub(lambda m: f"strftime({m.group(2)}, {m.group(1)})", query)
+    query = _DATE_SUB_NOW.sub(lambda m: f"datetime('now', 'localtime', '-{m.group(1)} {m.group(2).lower()}s')", query)
+    query = _NOW.sub("datetime('now', 'localtime')", query)
+    query = _SUBSTRING.sub('substr(', query)
+    query = _INSERT_IGNORE.sub('INSERT OR IGNORE', query)
+
+    match = _DUPLICATE_KEY.search(query)
+    if not match:
+        return query, None
+    insert_part = query[:match.start()]
+    updates = _VALUES_REF.sub(r'excluded.\1', query[match.end():])
+    return f"{insert_part} ON CONFLICT DO UPDATE SET {updates}", insert_part
+
+
+def _dict_row(cursor, row) -> Dict:
+    return {column[0]: value for column, value in zip(cursor.description, row)}
+
+
+def _parse_datetime(value: bytes):
+    text = value.decode()
+    for fmt in ('%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M:%S.%f', '%Y-%m-%d'):
+        try:
+            return datetime.strptime(text, fmt)
+        except ValueError:
+            continue
+    return text
+
+
+# 与pymysql一致：TIMESTAMP/DATETIME列读出为datetime，datetime参数按MySQL格式写入
+sqlite3.register_adapter(datetime, lambda value: value.strftime('%Y-%m-%d %H:%M:%S'))
+sqlite3.register_adapter(date, lambda value: value.strftime('%Y-%m-%d'))
+sqlite3.register_converter('TIMESTAMP', _parse_datetime)
+sqlite3.register_converter('DATETIME', _parse_datetime)
+
+
+class SQLiteCursor:
+    """提供DatabaseManager使用的pymysql游标接口"""
+
+    def __init__(self, connection: sqlite3.Connection):
+        self.connection = connection
+        self.cursor = connection.cursor()
+        self.rowcount = 0
+        self.lastrowid = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cursor.close()
+
+    def execute(self, query: str, params=None):
+        sql, insert_only = translate_sql(query, params is not None)
+        params = tuple(params) if params is not None else ()
+        if insert_only is None:
+            self.cursor.execute(sql, params)
+            self.rowcount = self.cursor.rowcount
+        else:
+            # 与MySQL一致：新插入的行计1，冲突后更新的行计2
+            try:
+                self.cursor.execute(insert_only, params)
+                self.rowcount = self.cursor.rowcount
+            except sqlite3.IntegrityError:
+                self.cursor.execute(sql, params)
+                self.rowcount = self.cursor.rowcount * 2
+        self.lastrowid = self.cursor.lastrowid
+        return self.rowcount
+
+    def executemany(self, query: str, params_list):
+        sql, _ = translate_sql(query, True)
+        params_list = [tuple(params) for params in params_list]
+        if self.connection.in_transaction:
+            # 已在DatabaseManager.execute_transaction开启的事务中
+            self.cursor.executemany(sql, params_list)
+            self.rowcount = self.cursor.rowcount
+            return self.rowcount
+        # 自动提交模式下逐行提交很慢，批量写入放在一个事务中
+        self.connection.execute('BEGIN')
+        try:
+            self.cursor.executemany(sql, params_list)
+            self.connection.execute('COMMIT')
+        except Exception:
+            self.connection.execute('ROLLBACK')
+            raise
+        self.rowcount = self.cursor.rowcount
+        return self.rowcount
+
+    def fetchall(self) -> List[Dict]:
+        return self.cursor.fetchall()
+
+    def fetchone(self) -> Optional[Dict]:
+        return self.cursor.fetchone()
+
+
+class SQLiteConnection:
+    """包装sqlite3连接，接口与DatabaseManager使用的pymysql连接一致"""
+
+    def __init__(self, connection: sqlite3.Connection):
+        self.connection = connection
+
+    def ping(self, reconnect: bool = True):
+        pass
+
+    def cursor(self) -> SQLiteCursor:
+        return SQLiteCursor(self.connection)
+
+    def begin(self):
+        self.connection.execute('BEGIN')
+
+    def commit(self):
+        if self.connection.in_transaction:
+            self.connection.execute('COMMIT')
+
+    def rollback(self):
+        if self.connection.in_transaction:
+            self.connection.execute('ROLLBACK')
+
+    def close(self):
+        self.connection.close()
+
+
+def segment(text: Optional[str]) -> Optional[str]:
+    """全文索引使用的分词：jieba搜索引擎模式，词之间以空格分隔"""
+    if not text:
+        return text
+    import jieba
+    return ' '.join(word for word in jieba.cut_for_search(text) if word.strip())
+
+
+def fts_match_expression(terms: List[str], operator: str) -> str:
+    """FTS5查询表达式，每个词作为短语加引号，避免被解析为语法"""
+    phrases = []
+    for term in terms:
+        term = term.strip()
+        if term and re.search(r'\w', term):
+            phrases.append('"' + term.replace('"', '""') + '"')
+    return f' {operator} '.join(phrases)
+
+
+class SQLiteBackend:
+    """嵌入式SQLite：WAL模式支持多进程并发读，页面和知识库检索使用FTS5"""
+
+    name = 'sqlite'
+
+    def __init__(self, path: str = None):
+        self.path = path or Config.SQLITE_PATH
+        self.logger = logging.getLogger(__name__)
+        self._schema_ready = False
+        self._lock = threading.Lock()
+
+    def connect(self) -> SQLiteConnection:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        connection = sqlite3.connect(self.path, timeout=Config.SQLITE_BUSY_TIMEOUT / 1000,
+                                     detect_types=sqlite3.PARSE_DECLTYPES, isolation_level=None,
+                                     check_same_thread=False)
+        connection.row_factory = _dict_row
+        connection.create_function('seg', 1, segment, deterministic=True)
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute('PRAGMA synchronous=NORMAL')
+        connection.execute('PRAGMA foreign_keys=ON')
+        connection.execute(f'PRAGMA busy_timeout={Config.SQLITE_BUSY_TIMEOUT}')
+        self._ensure_schema(connection)
+        return SQLiteConnection(connection)
+
+    def _ensure_schema(self, connection: sqlite3.Connection):
+        """每个进程首次连接时执行建表脚本（均为IF NOT EXISTS，可重复执行）"""
+        if self._schema_ready:
+            return
+        with self._lock:
+            if self._schema_ready:
+                return
+            with open(SQLITE_SCHEMA_FILE, 'r', encoding='utf-8') as f:
+                connection.executescript(f.read())
+            self._schema_ready = True
+            self.logger.info(f"SQLite schema ready at {self.path}")
+
+    def page_search_query(self, keyword: str, limit: int) -> Tuple[str, list]:
+        """关键词分词后全部出现的页面，按标题/正文命中排序，同级按BM25排序"""
+        import jieba
+        match = fts_match_expression(list(jieba.cut_for_search(keyword)), 'AND')
+        if not match:
+            return like_page_search(keyword, limit)
+        search_term = f'%{keyword}%'
+        query = """
+            SELECT p.id, p.url, p.title,
+                   SUBSTRING(p.content, 1, 200) as snippet,
+                   p.page_type, p.category,
+                   (CASE
+                    WHEN p.title LIKE %s THEN 2.0
+                    WHEN p.content LIKE %s THEN 1.0
+                    ELSE 0.5
+                   END) as relevance
+            FROM pages_fts
+            JOIN crawled_pages p ON p.id = pages_fts.rowid
+            WHERE pages_fts MATCH %s
+            ORDER BY relevance DESC, bm25(pages_fts, 5.0, 1.0)
+            LIMIT %s
+        """
+        return query, [search_term, search_term, match, limit]
+
+    def knowledge_search_query(self, question: str, keywords: List[str], limit: int) -> Tuple[str, list]:
+        """任一关键词命中的知识条目，相关度计算与MySQL一致，同级按BM25排序"""
+        match = fts_match_expression(keywords, 'OR')
+        if not match:
+            return like_knowledge_search(question, keywords, limit)
+        full_question = f'%{question}%'
+        query = """
+            SELECT kb.id, kb.question, kb.answer, kb.source_url, kb.confidence_score, kb.update_time,
+                   (CASE
+                    WHEN kb.question LIKE %s THEN 3.0
+                    WHEN kb.answer LIKE %s THEN 2.0
+                    ELSE 1.0
+                   END) as relevance
+            FROM knowledge_fts
+            JOIN knowledge_base kb ON kb.id = knowledge_fts.rowid
+            WHERE knowledge_fts MATCH %s
+            ORDER BY relevance DESC, kb.confidence_score DESC, bm25(knowledge_fts, 3.0, 1.0, 2.0)
+            LIMIT %s
+        """
+        return query, [full_question, full_question, match, limit]
+
+    def passage_search_query(self, question: str, limit: int) -> Tuple[str, list]:
+        """任一词项命中的段落，按BM25排序（relevance取负值，越大越相关）"""
+        from models.corpus_stats import tokenize
+        match = fts_match_expression(tokenize(question), 'OR')
+        if not match:
+            return None, []
+        query = """
+            SELECT pp.id, pp.page_id, pp.seq, pp.start_offset, pp.end_offset, pp.content, pp.token_count,
+                   p.url, p.title, p.page_type, p.update_time,
+                   -bm25(passages_fts) as relevance
+            FROM passages_fts
+            JOIN page_passages pp ON pp.id = passages_fts.rowid
+            JOIN crawled_pages p ON p.id = pp.page_id
+            WHERE passages_fts MATCH %s
+            ORDER BY bm25(passages_fts)
+            LIMIT %s
+        """
+        return query, [match, limit]
+
+    def table_update_time(self, db, table_name: str):
+        # SQLite没有表级更新时间，变更检测依赖行数和最大ID
+        return None
+
+    def table_columns(self, db, table_name: str) -> List[str]:
+        return [row['name'] for row in db.execute_query("SELECT name FROM pragma_table_info(%s)", (table_name,))]
+
+
+def create_backend(name: str = None):
+    name = (name or Config.DB_BACKEND).lower()
+    if name == 'sqlite':
+        return SQLiteBackend()
+    if name == 'mysql':
+        return MySQLBackend()
+    raise ValueError(f"Unknown database backend: {name}")
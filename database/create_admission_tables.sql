@@ -28,7 +28,10 @@ CREATE TABLE IF NOT EXISTS admission_scores (
     max_score INT,                        -- 最高分
     rank_position INT,                    -- 位次
     create_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    INDEX idx_year_province_category (year, province, category)
+    update_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    INDEX idx_year_province_category (year, province, category),
+    -- 导入时按此键覆盖（run.py ingest-scores），专业和批次为空时存空字符串
+    UNIQUE KEY uk_score (year, province, category, major, batch)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
 
 -- 招生简章和政策表
@@ -1,38 +1,60 @@
-import pymysql
-from pymysql.cursors import DictCursor
-from typing import Dict, List, Optional
+from typing import Dict, Iterator, List, Optional, Tuple
 import logging
+import threading
 from datetime import datetime
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from config.config import Config
+from database.backends import create_backend
+from database.statistics import statistics_tracker
+from utils.text import question_fingerprint
+from utils.tracing import span, traced
 
 class DatabaseManager:
-    def __init__(self):
+    def __init__(self, lazy: bool = False, backend=None):
         self.logger = logging.getLogger(__name__)
-        self.connection = None
-        self.connect()
+        # 存储后端由Config.DB_BACKEND选择，SQL按MySQL方言编写，由后端适配
+        self.backend = backend or create_backend()
+        self._pid = os.getpid()
+        self._local = threading.local()
+        self.index_snapshot = None
+        self.query_matcher = None
+        # lazy=True时首次查询才连接（基准测试等不访问数据库的场景）
+        if not lazy:
+            self.connect()
+    
+    @property
+    def connection(self):
+        """当前线程的数据库连接
+
+        数据库连接不是线程安全的，多线程worker中每个线程使用独立连接；
+        预加载后fork出的worker进程丢弃从父进程继承的连接（不关闭，避免影响父进程的会话）。
+        """
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._local = threading.local()
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            self.connect()
+            connection = self._local.connection
+        return connection
+    
+    @connection.setter
+    def connection(self, value):
+        self._local.connection = value
     
     def connect(self):
         """建立数据库连接"""
         try:
-            self.connection = pymysql.connect(
-                host=Config.MYSQL_HOST,
-                port=Config.MYSQL_PORT,
-                user=Config.MYSQL_USER,
-                password=Config.MYSQL_PASSWORD,
-                database=Config.MYSQL_DATABASE,
-                charset='utf8mb4',
-                cursorclass=DictCursor,
-                autocommit=True
-            )
-            self.logger.info("Database connection established")
+            self.connection = self.backend.connect()
+            self.logger.info(f"Database connection established ({self.backend.name})")
         except Exception as e:
             self.logger.error(f"Failed to connect to database: {str(e)}")
             raise
     
+    @traced('db')
     def execute_query(self, query: str, params: tuple = None) -> List[Dict]:
         """执行查询语句"""
         try:
@@ -52,6 +74,7 @@ class DatabaseManager:
             except:
                 return []
     
+    @traced('db')
     def execute_update(self, query: str, params: tuple = None) -> int:
         """执行更新语句"""
         try:
@@ -71,6 +94,67 @@ class DatabaseManager:
             except:
                 return 0
     
+    @traced('db')
+    def execute_many(self, query: str, params_list: List[tuple]) -> int:
+        """批量执行更新语句"""
+        if not params_list:
+            return 0
+        try:
+            self.connection.ping(reconnect=True)
+            with self.connection.cursor() as cursor:
+                cursor.executemany(query, params_list)
+                return cursor.rowcount
+        except Exception as e:
+            self.logger.error(f"Batch update failed: {str(e)}")
+            return 0
+
+    @traced('db')
+    def execute_transaction(self, statements: List[Tuple[str, object]]) -> int:
+        """在一个事务中依次执行 (语句, 参数)，参数为列表时批量执行；任一语句失败时全部回滚并返回0"""
+        try:
+            self.connection.ping(reconnect=True)
+            self.connection.begin()
+            affected = 0
+            with self.connection.cursor() as cursor:
+                for query, params in statements:
+                    if isinstance(params, list):
+                        if not params:
+                            continue
+                        cursor.executemany(query, params)
+                    else:
+                        cursor.execute(query, params)
+                    affected += max(cursor.rowcount, 0)
+            self.connection.commit()
+            return affected
+        except Exception as e:
+            self.logger.error(f"Transaction failed: {str(e)}")
+            try:
+                self.connection.rollback()
+            except Exception:
+                pass
+            return 0
+
+    def iter_crawled_pages(self, columns: str = 'id, title, content',
+                           batch_size: int = 200) -> Iterator[Dict]:
+        """按主键分批流式读取页面，避免一次性加载全部内容"""
+        last_id = 0
+        query = f"""
+            SELECT {columns}
+            FROM crawled_pages
+            WHERE id > %s AND content IS NOT NULL AND content != ''
+            ORDER BY id
+            LIMIT %s
+        """
+        while True:
+            rows = self.execute_query(query, (last_id, batch_size))
+            if not rows:
+                break
+            for row in rows:
+                yield row
+            last_id = rows[-1]['id']
+            if len(rows) < batch_size:
+                break
+
     def save_crawled_page(self, page_data: Dict) -> bool:
         """保存爬取的页面数据"""
         query = """
@@ -92,72 +176,140 @@ class DatabaseManager:
         )
         
         try:
-            self.execute_update(query, params)
+            # 新插入返回1，更新已有页面返回2
+            if self.execute_update(query, params) == 1:
+                statistics_tracker.record_page(params[3])
             return True
         except Exception as e:
             self.logger.error(f"Failed to save page: {str(e)}")
             return False
     
+    @traced('page_search')
     def search_pages(self, keyword: str, limit: int = 10) -> List[Dict]:
         """搜索页面内容"""
-        # 使用LIKE搜索替代全文搜索
+        query, params = self.backend.page_search_query(keyword, limit)
+        return self.execute_query(query, params)
+    
+    @traced('passage_search')
+    def search_passages(self, question: str, limit: int = None) -> List[Dict]:
+        """检索与问题最相关的页面段落（含所属页面的url、title）"""
+        query, params = self.backend.passage_search_query(question, limit or Config.PASSAGE_TOP_K)
+        if not query:
+            return []
+        return self.execute_query(query, params)
+    
+    def save_page_passages(self, url: str, passages: List[Dict]) -> int:
+        """替换页面的全部段落，passages由models.passages.split_passages生成"""
+        rows = self.execute_query("SELECT id FROM crawled_pages WHERE url = %s", (url,))
+        if not rows:
+            return 0
+        page_id = rows[0]['id']
+        self.execute_update("DELETE FROM page_passages WHERE page_id = %s", (page_id,))
         query = """
-            SELECT id, url, title, 
-                   SUBSTRING(content, 1, 200) as snippet,
-                   page_type, category,
-                   (CASE 
-                    WHEN title LIKE %s THEN 2.0
-                    WHEN content LIKE %s THEN 1.0
-                    ELSE 0.5
-                   END) as relevance
-            FROM crawled_pages
-            WHERE title LIKE %s OR content LIKE %s
-            ORDER BY relevance DESC
-            LIMIT %s
+            INSERT INTO page_passages
+                (page_id, seq, start_offset, end_offset, content, char_count, token_count, term_count)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
         """
-        search_term = f'%{keyword}%'
-        return self.execute_query(query, (search_term, search_term, search_term, search_term, limit))
+        return self.execute_many(query, [
+            (page_id, p['seq'], p['start_offset'], p['end_offset'], p['content'],
+             p['char_count'], p['token_count'], p['term_count'])
+            for p in passages
+        ])
     
+    @traced('kb_search')
     def get_knowledge_base(self, question: str, limit: int = 5) -> List[Dict]:
         """从知识库中搜索相关问答"""
+        query, params = self.build_knowledge_query(question, limit)
+        results = self.execute_query(query, params)
+        
+        # 合并语义检索结果，覆盖关键词无法匹配的不同问法
+        return self.merge_semantic_results(question, results, limit)
+    
+    def build_knowledge_query(self, question: str, limit: int) -> Tuple[str, list]:
+        """构建知识库关键词检索的SQL和参数"""
         # 改进搜索算法：拆分关键词进行模糊匹配
         import jieba
-        keywords = list(jieba.cut(question))
-        keywords = [k.strip() for k in keywords if len(k.strip()) > 1 and k not in ['的', '有', '是', '在', '个', '多少', '哪些', '什么', '如何', '怎么']]
+        from models.corpus_stats import STOP_WORDS
+        # 同义说法先改写为标准词再分词，命中的同义词组整组参与匹配
+        analysis = self.get_query_matcher().analyze(question)
+        with span('kb_tokenize'):
+            keywords = list(jieba.cut(analysis['canonical']))
+        keywords = [k.strip() for k in keywords if len(k.strip()) > 1 and k not in STOP_WORDS]
+        keywords = list(dict.fromkeys(keywords + analysis['expansions']))
         
         if not keywords:
-            keyword = f'%{question}%'
             keywords = [question]
         
-        # 构建动态查询
-        conditions = []
-        params = []
-        
-        for keyword in keywords:
-            keyword_pattern = f'%{keyword}%'
-            conditions.append("(question LIKE %s OR answer LIKE %s OR keywords LIKE %s)")
-            params.extend([keyword_pattern, keyword_pattern, keyword_pattern])
+        return self.backend.knowledge_search_query(question, keywords, limit)
+    
+    def get_query_matcher(self):
+        """懒加载查询理解词表（实体识别与同义词改写），专业和院系名称定期从数据库刷新"""
+        if self.query_matcher is None:
+            from models.query_understanding import QueryMatcher
+            self.query_matcher = QueryMatcher(self)
+        return self.query_matcher
+    
+    def load_index_snapshot(self):
+        """启动时加载检索索引快照并与数据库核对，缺失或损坏时重建"""
+        try:
+            from models.index_snapshot import load_snapshot
+            self.index_snapshot = load_snapshot(self)
+        except Exception as e:
+            self.logger.error(f"Failed to load index snapshot: {str(e)}")
+        return self.index_snapshot
+    
+    def get_index_snapshot(self):
+        """懒加载检索索引快照（只映射文件，不核对数据库），快照被替换后自动重新映射"""
+        try:
+            if self.index_snapshot is None:
+                from models.index_snapshot import IndexSnapshot
+                self.index_snapshot = IndexSnapshot.open()
+            else:
+                self.index_snapshot = self.index_snapshot.refresh()
+            return self.index_snapshot
+        except Exception as e:
+            self.logger.error(f"Index snapshot unavailable: {str(e)}")
+            return None
+    
+    def get_vector_index(self):
+        """知识库向量索引（索引快照的一部分）"""
+        snapshot = self.get_index_snapshot()
+        return snapshot.vector_index if snapshot is not None else None
+    
+    @traced('kb_semantic')
+    def merge_semantic_results(self, question: str, results: List[Dict], limit: int) -> List[Dict]:
+        """将向量检索命中的条目并入关键词结果"""
+        index = self.get_vector_index()
+        if index is None:
+            return results
         
-        where_clause = " OR ".join(conditions)
+        hits = index.search(question, k=limit, min_score=Config.VECTOR_MIN_SCORE)
+        if not hits:
+            return results
         
-        query = f"""
-            SELECT id, question, answer, source_url, confidence_score,
-                   (CASE 
-                    WHEN question LIKE %s THEN 3.0
-                    WHEN answer LIKE %s THEN 2.0
-                    ELSE 1.0
-                   END) as relevance
-            FROM knowledge_base
-            WHERE {where_clause}
-            ORDER BY relevance DESC, confidence_score DESC
-            LIMIT %s
-        """
+        # 相似度映射到与关键词相关度相同的区间（1.0~3.0）
+        semantic_relevance = {entry_id: round(1.0 + 2.0 * score, 3) for entry_id, score in hits}
+        merged = {row['id']: row for row in results}
+        for row in merged.values():
+            if row['id'] in semantic_relevance:
+                row['relevance'] = max(float(row['relevance']), semantic_relevance[row['id']])
         
-        # 添加完整匹配的参数
-        full_question = f'%{question}%'
-        final_params = [full_question, full_question] + params + [limit]
+        missing = [entry_id for entry_id in semantic_relevance if entry_id not in merged]
+        if missing:
+            placeholders = ', '.join(['%s'] * len(missing))
+            query = f"""
+                SELECT id, question, answer, source_url, confidence_score, update_time
+                FROM knowledge_base
+                WHERE id IN ({placeholders})
+            """
+            for row in self.execute_query(query, tuple(missing)):
+                row['relevance'] = semantic_relevance[row['id']]
+                merged[row['id']] = row
         
-        return self.execute_query(query, final_params)
+        ranked = sorted(merged.values(),
+                        key=lambda x: (float(x['relevance']), x.get('confidence_score') or 0),
+                        reverse=True)
+        return ranked[:limit]
     
     def save_knowledge(self, question: str, answer: str, source_url: str = None, 
                       category: str = None, keywords: str = None, confidence: float = 1.0) -> bool:
@@ -169,28 +321,66 @@ class DatabaseManager:
         params = (question, answer, source_url, category, keywords, confidence)
         
         try:
-            self.execute_update(query, params)
+            if self.execute_update(query, params) > 0:
+                statistics_tracker.record_knowledge()
             return True
         except Exception as e:
             self.logger.error(f"Failed to save knowledge: {str(e)}")
             return False
     
+    @traced('save_history')
     def save_qa_history(self, session_id: str, question: str, answer: str, 
                        source: str = 'mixed', response_time: int = 0) -> bool:
         """保存问答历史"""
         query = """
-            INSERT INTO qa_history (session_id, user_question, system_answer, answer_source, response_time_ms)
-            VALUES (%s, %s, %s, %s, %s)
+            INSERT INTO qa_history (session_id, user_question, question_fp, system_answer, answer_source, response_time_ms)
+            VALUES (%s, %s, %s, %s, %s, %s)
         """
-        params = (session_id, question, answer, source, response_time)
+        params = (session_id, question, question_fingerprint(question), answer, source, response_time)
         
         try:
-            self.execute_update(query, params)
+            if self.execute_update(query, params) > 0:
+                # 同步累加按小时汇总表，统计时无需扫描qa_history
+                rollup_query = """
+                    INSERT INTO qa_hourly_stats (hour_start, qa_count, response_time_sum)
+                    VALUES (DATE_FORMAT(NOW(), '%%Y-%%m-%%d %%H:00:00'), 1, %s)
+                    ON DUPLICATE KEY UPDATE
+                        qa_count = qa_count + 1,
+                        response_time_sum = response_time_sum + VALUES(response_time_sum)
+                """
+                self.execute_update(rollup_query, (response_time or 0,))
+                statistics_tracker.record_qa(response_time)
             return True
         except Exception as e:
             self.logger.error(f"Failed to save QA history: {str(e)}")
             return False
     
+    def backfill_question_fingerprints(self, batch_size: int = 1000) -> int:
+        """为历史问答记录补全问题指纹，按主键分批；某批写入失败时停止，返回已补全的记录数"""
+        total = 0
+        last_id = 0
+        query = """
+            SELECT id, user_question FROM qa_history
+            WHERE id > %s AND question_fp IS NULL
+            ORDER BY id
+            LIMIT %s
+        """
+        while True:
+            rows = self.execute_query(query, (last_id, batch_size))
+            if not rows:
+                break
+            params = [(question_fingerprint(row['user_question']), row['id']) for row in rows]
+            # execute_many出错时返回0，不停止会反复读取同一批记录
+            if not self.execute_many("UPDATE qa_history SET question_fp = %s WHERE id = %s", params):
+                self.logger.error(f"Question fingerprint backfill stopped after {total} rows")
+                break
+            total += len(rows)
+            last_id = rows[-1]['id']
+            if len(rows) < batch_size:
+                break
+        return total
+    
+    @traced('history')
     def get_recent_qa_history(self, session_id: str, limit: int = 10) -> List[Dict]:
         """获取最近的问答历史"""
         query = """
@@ -204,8 +394,32 @@ class DatabaseManager:
     
     def update_satisfaction_score(self, qa_id: int, score: int) -> bool:
         """更新满意度评分"""
+        query = """
+            SELECT satisfaction_score,
+                   DATE_FORMAT(create_time, '%%Y-%%m-%%d %%H:00:00') AS hour_start
+            FROM qa_history WHERE id = %s
+        """
+        rows = self.execute_query(query, (qa_id,))
+        if not rows:
+            return False
+        old_score = rows[0]['satisfaction_score']
+        
         query = "UPDATE qa_history SET satisfaction_score = %s WHERE id = %s"
-        return self.execute_update(query, (score, qa_id)) > 0
+        if self.execute_update(query, (score, qa_id)) <= 0:
+            return old_score == score
+        
+        # 同步调整所在小时的满意度汇总
+        rollup_query = """
+            UPDATE qa_hourly_stats
+            SET satisfaction_sum = satisfaction_sum + %s,
+                satisfaction_count = satisfaction_count + %s
+            WHERE hour_start = %s
+        """
+        delta = score - (old_score or 0)
+        self.execute_update(rollup_query, (delta, 0 if old_score is not None else 1, rows[0]['hour_start']))
+        hour = datetime.strptime(rows[0]['hour_start'], '%Y-%m-%d %H:%M:%S')
+        statistics_tracker.record_satisfaction(hour, old_score, score)
+        return True
     
     def get_system_config(self, key: str) -> Optional[str]:
         """获取系统配置"""
@@ -244,43 +458,102 @@ class DatabaseManager:
         """
         return self.execute_update(query, (status, crawled, total, error_msg, status, task_id)) > 0
     
+    def save_term_idf(self, rows: List[tuple], batch_size: int = 1000) -> int:
+        """替换语料IDF表，rows为(term, doc_freq, idf)；删除和写入在一个事务中，不会留下不完整的表"""
+        query = "INSERT INTO term_idf (term, doc_freq, idf) VALUES (%s, %s, %s)"
+        statements = [("DELETE FROM term_idf", None)]
+        statements += [(query, rows[i:i + batch_size]) for i in range(0, len(rows), batch_size)]
+        return len(rows) if self.execute_transaction(statements) else 0
+    
+    def get_page_counts(self) -> Dict[str, int]:
+        """按页面类型统计页面数"""
+        query = "SELECT COUNT(*) as total, page_type FROM crawled_pages GROUP BY page_type"
+        return {item['page_type']: item['total'] for item in self.execute_query(query)}
+    
+    def get_knowledge_count(self) -> int:
+        """知识条目总数"""
+        result = self.execute_query("SELECT COUNT(*) as total FROM knowledge_base")
+        return result[0]['total'] if result else 0
+    
+    def get_qa_rollup(self, since: datetime) -> List[Dict]:
+        """读取按小时汇总的问答统计"""
+        query = """
+            SELECT hour_start, qa_count, response_time_sum, satisfaction_sum, satisfaction_count
+            FROM qa_hourly_stats
+            WHERE hour_start >= %s
+        """
+        return self.execute_query(query, (since,))
+    
+    def rebuild_qa_rollup(self, since: datetime) -> int:
+        """从qa_history重新计算指定时间之后的小时汇总，用于定期核对"""
+        query = """
+            INSERT INTO qa_hourly_stats
+                (hour_start, qa_count, response_time_sum, satisfaction_sum, satisfaction_count)
+            SELECT DATE_FORMAT(create_time, '%%Y-%%m-%%d %%H:00:00') AS hour_start,
+                   COUNT(*), COALESCE(SUM(response_time_ms), 0),
+                   COALESCE(SUM(satisfaction_score), 0), COUNT(satisfaction_score)
+            FROM qa_history
+            WHERE create_time >= %s
+            GROUP BY hour_start
+            ON DUPLICATE KEY UPDATE
+                qa_count = VALUES(qa_count),
+                response_time_sum = VALUES(response_time_sum),
+                satisfaction_sum = VALUES(satisfaction_sum),
+                satisfaction_count = VALUES(satisfaction_count)
+        """
+        return self.execute_update(query, (since,))
+    
+    def table_update_time(self, table_name: str):
+        """表的最后更新时间，后端不支持时返回None"""
+        return self.backend.table_update_time(self, table_name)
+    
+    def table_columns(self, table_name: str) -> List[str]:
+        """表的列名，表不存在时返回空列表"""
+        return self.backend.table_columns(self, table_name)
+    
     def get_statistics(self) -> Dict:
-        """获取系统统计信息"""
+        """获取系统统计信息（直接查询数据库的精确值）"""
         stats = {}
         
         # 页面统计
-        query = "SELECT COUNT(*) as total, page_type FROM crawled_pages GROUP BY page_type"
-        page_stats = self.execute_query(query)
-        stats['pages'] = {item['page_type']: item['total'] for item in page_stats}
+        stats['pages'] = self.get_page_counts()
         stats['total_pages'] = sum(stats['pages'].values())
         
         # 知识库统计
-        query = "SELECT COUNT(*) as total FROM knowledge_base"
-        result = self.execute_query(query)
-        stats['knowledge_entries'] = result[0]['total'] if result else 0
+        stats['knowledge_entries'] = self.get_knowledge_count()
         
-        # 问答统计
+        # 问答统计（基于按小时汇总表）
         query = """
-            SELECT COUNT(*) as total, 
-                   AVG(response_time_ms) as avg_response_time,
-                   AVG(satisfaction_score) as avg_satisfaction
-            FROM qa_history
-            WHERE create_time >= DATE_SUB(NOW(), INTERVAL 7 DAY)
+            SELECT SUM(qa_count) as total,
+                   SUM(response_time_sum) * 1.0 / SUM(qa_count) as avg_response_time,
+                   SUM(satisfaction_sum) * 1.0 / SUM(satisfaction_count) as avg_satisfaction
+            FROM qa_hourly_stats
+            WHERE hour_start >= DATE_SUB(NOW(), INTERVAL 7 DAY)
         """
         result = self.execute_query(query)
         if result:
             stats['recent_qa'] = {
-                'total': result[0]['total'],
+                'total': int(result[0]['total'] or 0),
                 'avg_response_time': float(result[0]['avg_response_time'] or 0),
                 'avg_satisfaction': float(result[0]['avg_satisfaction'] or 0)
             }
         
         return stats
     
+    def get_statistics_snapshot(self) -> Dict:
+        """获取统计快照（内存计数器，定期与数据库核对）"""
+        return statistics_tracker.snapshot(self)
+    
+    def reconcile_statistics(self):
+        """从数据库重新计算统计快照（启动预热时调用）"""
+        statistics_tracker.reconcile(self)
+    
     def close(self):
         """关闭数据库连接"""
-        if self.connection:
-            self.connection.close()
+        connection = getattr(self._local, 'connection', None)
+        if connection and self._pid == os.getpid():
+            connection.close()
+            self._local.connection = None
             self.logger.info("Database connection closed")
 
 if __name__ == "__main__":
@@ -0,0 +1,136 @@
+import json
+import uuid
+import logging
+from typing import Dict, List, Optional, Tuple
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.config import Config
+
+JOB_STATUSES = ('pending', 'running', 'completed', 'failed')
+JOB_COLUMNS = """
+    id, job_uid, job_type, status, trigger_source, progress_current, progress_total, progress_message,
+    result, error_message, worker, create_time, start_time, heartbeat_time, end_time
+"""
+
+
+class JobQueue:
+    """持久化的后台任务队列（jobs表）
+
+    同类任务同时只有一个处于排队或运行状态：排队时active_key写入任务类型，由唯一索引拒绝重复提交，
+    任务结束时置NULL。多个执行进程通过条件更新认领任务，同一任务只会被一个进程执行。
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self.logger = logging.getLogger(__name__)
+
+    def enqueue(self, job_type: str, trigger: str = 'manual') -> Tuple[Optional[Dict], bool]:
+        """提交任务，返回 (任务, 是否新建)；同类任务已在排队或运行时返回该任务"""
+        job_uid = uuid.uuid4().hex
+        self.db.execute_update(
+            """
+            INSERT IGNORE INTO jobs (job_uid, job_type, active_key, status, trigger_source)
+            VALUES (%s, %s, %s, 'pending', %s)
+            """,
+            (job_uid, job_type, job_type, trigger)
+        )
+        job = self.active(job_type)
+        created = job is not None and job['job_uid'] == job_uid
+        if created:
+            self.logger.info(f"Job {job['id']} ({job_type}) queued by {trigger}")
+        return job, created
+
+    def get(self, job_id: int) -> Optional[Dict]:
+        rows = self.db.execute_query(f"SELECT {JOB_COLUMNS} FROM jobs WHERE id = %s", (job_id,))
+        return _decode(rows[0]) if rows else None
+
+    def active(self, job_type: str) -> Optional[Dict]:
+        """排队或运行中的任务"""
+        rows = self.db.execute_query(f"SELECT {JOB_COLUMNS} FROM jobs WHERE active_key = %s", (job_type,))
+        return _decode(rows[0]) if rows else None
+
+    def recent(self, job_type: str = None, limit: int = 20) -> List[Dict]:
+        if job_type:
+            query = f"SELECT {JOB_COLUMNS} FROM jobs WHERE job_type = %s ORDER BY id DESC LIMIT %s"
+            rows = self.db.execute_query(query, (job_type, limit))
+        else:
+            rows = self.db.execute_query(f"SELECT {JOB_COLUMNS} FROM jobs ORDER BY id DESC LIMIT %s", (limit,))
+        return [_decode(row) for row in rows]
+
+    def claim(self, worker: str, job_id: int = None) -> Optional[Dict]:
+        """认领最早的待执行任务（或指定任务），其他进程已认领时返回None"""
+        if job_id is None:
+            rows = self.db.execute_query("SELECT id FROM jobs WHERE status = 'pending' ORDER BY id LIMIT 1")
+            if not rows:
+                return None
+            job_id = rows[0]['id']
+        claimed = self.db.execute_update(
+            """
+            UPDATE jobs SET status = 'running', worker = %s, start_time = NOW(), heartbeat_time = NOW()
+            WHERE id = %s AND status = 'pending'
+            """,
+            (worker, job_id)
+        )
+        return self.get(job_id) if claimed else None
+
+    def heartbeat(self, job_id: int) -> bool:
+        return self.db.execute_update(
+            "UPDATE jobs SET heartbeat_time = NOW() WHERE id = %s AND status = 'running'", (job_id,)) > 0
+
+    def progress(self, job_id: int, current: int, total: int = 0, message: str = None) -> bool:
+        return self.db.execute_update(
+            """
+            UPDATE jobs SET progress_current = %s, progress_total = %s, progress_message = %s, heartbeat_time = NOW()
+            WHERE id = %s AND status = 'running'
+            """,
+            (current, total, (message or '')[:255] or None, job_id)
+        ) > 0
+
+    def finish(self, job_id: int, result: Dict = None, error: str = None) -> bool:
+        """结束任务并释放同类任务的排队名额"""
+        status = 'failed' if error else 'completed'
+        return self.db.execute_update(
+            """
+            UPDATE jobs SET status = %s, active_key = NULL, result = %s, error_message = %s, end_time = NOW()
+            WHERE id = %s
+            """,
+            (status, json.dumps(result, ensure_ascii=False, default=str) if result is not None else None,
+             error, job_id)
+        ) > 0
+
+    def recover_stale(self, stale_seconds: int = None) -> int:
+        """执行进程退出后遗留的运行中任务标记为失败，否则同类任务无法再提交"""
+        stale_seconds = int(stale_seconds or Config.JOB_STALE_SECONDS)
+        recovered = self.db.execute_update(
+            f"""
+            UPDATE jobs SET status = 'failed', active_key = NULL, end_time = NOW(),
+                error_message = 'worker stopped responding'
+            WHERE status = 'running'
+              AND COALESCE(heartbeat_time, start_time) < DATE_SUB(NOW(), INTERVAL {stale_seconds} SECOND)
+            """
+        )
+        if recovered:
+            self.logger.warning(f"Marked {recovered} stale job(s) as failed")
+        return recovered
+
+    def started_within(self, job_type: str, seconds: int) -> bool:
+        """最近seconds秒内是否提交过该类任务"""
+        rows = self.db.execute_query(
+            f"""
+            SELECT COUNT(*) AS total FROM jobs
+            WHERE job_type = %s AND create_time > DATE_SUB(NOW(), INTERVAL {int(seconds)} SECOND)
+            """,
+            (job_type,)
+        )
+        return bool(rows and rows[0]['total'])
+
+
+def _decode(row: Dict) -> Dict:
+    if row.get('result'):
+        try:
+            row['result'] = json.loads(row['result'])
+        except ValueError:
+            pass
+    return row
@@ -0,0 +1,10 @@
+-- 为已有数据库的admission_scores添加更新时间列和导入覆盖用的唯一键（run.py ingest-scores）
+-- 专业和批次为空的行统一为空字符串；唯一键冲突时先删除重复的行再执行
+USE hlg_eu;
+
+UPDATE admission_scores SET major = '' WHERE major IS NULL;
+UPDATE admission_scores SET batch = '' WHERE batch IS NULL;
+
+ALTER TABLE admission_scores
+    ADD COLUMN update_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP AFTER create_time,
+    ADD UNIQUE KEY uk_score (year, province, category, major, batch);
@@ -0,0 +1,7 @@
+-- 为已有数据库的qa_history添加问题指纹列
+-- 执行后运行 python run.py init 为历史记录补全指纹
+USE hlg_eu;
+
+ALTER TABLE qa_history
+    ADD COLUMN question_fp CHAR(16) AFTER user_question,
+    ADD INDEX idx_fp_time (question_fp, create_time);
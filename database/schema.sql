@@ -36,13 +36,24 @@ CREATE TABLE IF NOT EXISTS qa_history (
     id INT AUTO_INCREMENT PRIMARY KEY,
     session_id VARCHAR(100),
     user_question TEXT NOT NULL,
+    question_fp CHAR(16),  -- 归一化问题指纹，用于热门问题统计
     system_answer TEXT,
     answer_source VARCHAR(50),  -- deepseek/knowledge_base/mixed
     satisfaction_score INT,  -- 用户满意度评分 1-5
     response_time_ms INT,  -- 响应时间（毫秒）
     create_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     INDEX idx_session (session_id),
-    INDEX idx_create_time (create_time)
+    INDEX idx_create_time (create_time),
+    INDEX idx_fp_time (question_fp, create_time)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- 问答按小时汇总表（写入问答记录时同步累加，定期从qa_history核对）
+CREATE TABLE IF NOT EXISTS qa_hourly_stats (
+    hour_start DATETIME NOT NULL PRIMARY KEY,
+    qa_count INT NOT NULL DEFAULT 0,
+    response_time_sum BIGINT NOT NULL DEFAULT 0,
+    satisfaction_sum INT NOT NULL DEFAULT 0,
+    satisfaction_count INT NOT NULL DEFAULT 0
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
 
 -- 系统配置表
@@ -68,6 +79,73 @@ CREATE TABLE IF NOT EXISTS crawl_tasks (
     INDEX idx_status (status)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
 
+-- 后台任务表（爬取、知识库构建、热门问题答案预生成，由 run.py worker 进程执行）
+CREATE TABLE IF NOT EXISTS jobs (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    job_uid CHAR(32) UNIQUE NOT NULL,
+    job_type VARCHAR(50) NOT NULL,  -- crawl/build_knowledge/precompute_answers
+    active_key VARCHAR(50) UNIQUE,  -- 排队或运行中时等于job_type，结束后置NULL，同类任务同时只有一个
+    status ENUM('pending', 'running', 'completed', 'failed') DEFAULT 'pending',
+    trigger_source VARCHAR(20) DEFAULT 'manual',  -- manual/schedule/cli/build
+    progress_current INT DEFAULT 0,
+    progress_total INT DEFAULT 0,
+    progress_message VARCHAR(255),
+    result TEXT,  -- JSON
+    error_message TEXT,
+    worker VARCHAR(100),  -- 执行进程（主机名:PID）
+    create_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    start_time TIMESTAMP NULL,
+    heartbeat_time TIMESTAMP NULL,
+    end_time TIMESTAMP NULL,
+    INDEX idx_status (status),
+    INDEX idx_type_time (job_type, create_time)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- 预生成答案表（热门问题的大模型答案，由后台任务在低峰期或知识库构建后生成）
+CREATE TABLE IF NOT EXISTS precomputed_answers (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    question_fp CHAR(16) UNIQUE NOT NULL,  -- 归一化问题指纹，与qa_history.question_fp一致
+    question VARCHAR(500) NOT NULL,
+    answer TEXT NOT NULL,
+    answer_source VARCHAR(50),  -- 生成答案的大模型服务
+    confidence FLOAT,
+    similar_questions TEXT,  -- JSON
+    reference_links TEXT,  -- JSON，参考页面
+    provenance TEXT,  -- JSON，引用的知识库条目和页面：{"knowledge": {id: [更新时间, 摘要]}, "pages": {...}}
+    kb_version VARCHAR(32),  -- 生成时知识库和页面数据的版本
+    question_count INT DEFAULT 0,  -- 生成时统计窗口内的提问次数
+    status ENUM('active', 'stale') DEFAULT 'active',  -- 引用的条目或页面变化后为stale，不再使用
+    create_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    update_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    expire_time TIMESTAMP NULL,
+    INDEX idx_status_expire (status, expire_time)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- 页面段落表（按句子切分的正文片段，问答时检索段落而非整页）
+CREATE TABLE IF NOT EXISTS page_passages (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    page_id INT NOT NULL,
+    seq INT NOT NULL,  -- 页面内序号
+    start_offset INT NOT NULL,  -- 在页面正文中的起始字符位置
+    end_offset INT NOT NULL,
+    content TEXT NOT NULL,
+    char_count INT NOT NULL,
+    token_count INT NOT NULL,  -- 分词后的词项数（过滤停用词）
+    term_count INT NOT NULL,  -- 不同词项数
+    create_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE KEY uk_page_seq (page_id, seq),
+    FULLTEXT idx_passage (content) WITH PARSER ngram,
+    FOREIGN KEY (page_id) REFERENCES crawled_pages(id) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- 语料词项IDF表（由知识库构建时的语料统计生成）
+CREATE TABLE IF NOT EXISTS term_idf (
+    term VARCHAR(100) NOT NULL PRIMARY KEY,
+    doc_freq INT NOT NULL,
+    idf FLOAT NOT NULL,
+    update_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_bin;
+
 -- 插入初始配置
 INSERT INTO system_config (config_key, config_value, description) VALUES
 ('crawl_enabled', 'true', '是否启用自动爬取'),
@@ -0,0 +1,272 @@
+-- SQLite存储后端的表结构（DB_BACKEND=sqlite时在首次连接时自动执行）
+-- 与 schema.sql、create_admission_tables.sql 保持一致；修改表结构时三处同步修改
+-- 时间默认值使用本地时间，与MySQL的CURRENT_TIMESTAMP一致
+-- 全文检索表保存jieba分词后的文本，由触发器调用连接上注册的seg()函数维护
+
+-- 爬取的网页数据表
+CREATE TABLE IF NOT EXISTS crawled_pages (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    url VARCHAR(500) UNIQUE NOT NULL,
+    title VARCHAR(255),
+    content TEXT,
+    page_type VARCHAR(50),  -- 页面类型：news/notice/academic等
+    category VARCHAR(100),  -- 分类
+    crawl_time TIMESTAMP DEFAULT (datetime('now', 'localtime')),
+    update_time TIMESTAMP DEFAULT (datetime('now', 'localtime'))
+);
+CREATE INDEX IF NOT EXISTS idx_pages_page_type ON crawled_pages (page_type);
+CREATE INDEX IF NOT EXISTS idx_pages_category ON crawled_pages (category);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS pages_fts USING fts5(title, content);
+
+CREATE TRIGGER IF NOT EXISTS crawled_pages_fts_insert AFTER INSERT ON crawled_pages BEGIN
+    INSERT INTO pages_fts (rowid, title, content) VALUES (new.id, seg(new.title), seg(new.content));
+END;
+CREATE TRIGGER IF NOT EXISTS crawled_pages_fts_update AFTER UPDATE OF title, content ON crawled_pages BEGIN
+    DELETE FROM pages_fts WHERE rowid = old.id;
+    INSERT INTO pages_fts (rowid, title, content) VALUES (new.id, seg(new.title), seg(new.content));
+END;
+CREATE TRIGGER IF NOT EXISTS crawled_pages_fts_delete AFTER DELETE ON crawled_pages BEGIN
+    DELETE FROM pages_fts WHERE rowid = old.id;
+END;
+CREATE TRIGGER IF NOT EXISTS crawled_pages_touch AFTER UPDATE ON crawled_pages
+WHEN new.update_time IS old.update_time BEGIN
+    UPDATE crawled_pages SET update_time = datetime('now', 'localtime') WHERE id = new.id;
+END;
+
+-- 知识库表
+CREATE TABLE IF NOT EXISTS knowledge_base (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    question VARCHAR(500) NOT NULL,
+    answer TEXT NOT NULL,
+    source_url VARCHAR(500),
+    category VARCHAR(100),
+    keywords VARCHAR(255),
+    confidence_score FLOAT DEFAULT 1.0,
+    create_time TIMESTAMP DEFAULT (datetime('now', 'localtime')),
+    update_time TIMESTAMP DEFAULT (datetime('now', 'localtime'))
+);
+CREATE INDEX IF NOT EXISTS idx_kb_category ON knowledge_base (category);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS knowledge_fts USING fts5(question, answer, keywords);
+
+CREATE TRIGGER IF NOT EXISTS knowledge_base_fts_insert AFTER INSERT ON knowledge_base BEGIN
+    INSERT INTO knowledge_fts (rowid, question, answer, keywords)
+    VALUES (new.id, seg(new.question), seg(new.answer), seg(new.keywords));
+END;
+CREATE TRIGGER IF NOT EXISTS knowledge_base_fts_update AFTER UPDATE OF question, answer, keywords ON knowledge_base BEGIN
+    DELETE FROM knowledge_fts WHERE rowid = old.id;
+    INSERT INTO knowledge_fts (rowid, question, answer, keywords)
+    VALUES (new.id, seg(new.question), seg(new.answer), seg(new.keywords));
+END;
+CREATE TRIGGER IF NOT EXISTS knowledge_base_fts_delete AFTER DELETE ON knowledge_base BEGIN
+    DELETE FROM knowledge_fts WHERE rowid = old.id;
+END;
+CREATE TRIGGER IF NOT EXISTS knowledge_base_touch AFTER UPDATE ON knowledge_base
+WHEN new.update_time IS old.update_time BEGIN
+    UPDATE knowledge_base SET update_time = datetime('now', 'localtime') WHERE id = new.id;
+END;
+
+-- 用户问答记录表
+CREATE TABLE IF NOT EXISTS qa_history (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id VARCHAR(100),
+    user_question TEXT NOT NULL,
+    question_fp CHAR(16),  -- 归一化问题指纹，用于热门问题统计
+    system_answer TEXT,
+    answer_source VARCHAR(50),  -- deepseek/knowledge_base/mixed
+    satisfaction_score INT,  -- 用户满意度评分 1-5
+    response_time_ms INT,  -- 响应时间（毫秒）
+    create_time TIMESTAMP DEFAULT (datetime('now', 'localtime'))
+);
+CREATE INDEX IF NOT EXISTS idx_qa_session ON qa_history (session_id);
+CREATE INDEX IF NOT EXISTS idx_qa_create_time ON qa_history (create_time);
+CREATE INDEX IF NOT EXISTS idx_qa_fp_time ON qa_history (question_fp, create_time);
+
+-- 问答按小时汇总表（写入问答记录时同步累加，定期从qa_history核对）
+CREATE TABLE IF NOT EXISTS qa_hourly_stats (
+    hour_start DATETIME NOT NULL PRIMARY KEY,
+    qa_count INT NOT NULL DEFAULT 0,
+    response_time_sum BIGINT NOT NULL DEFAULT 0,
+    satisfaction_sum INT NOT NULL DEFAULT 0,
+    satisfaction_count INT NOT NULL DEFAULT 0
+);
+
+-- 系统配置表
+CREATE TABLE IF NOT EXISTS system_config (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    config_key VARCHAR(100) UNIQUE NOT NULL,
+    config_value TEXT,
+    description VARCHAR(255),
+    update_time TIMESTAMP DEFAULT (datetime('now', 'localtime'))
+);
+CREATE TRIGGER IF NOT EXISTS system_config_touch AFTER UPDATE ON system_config
+WHEN new.update_time IS old.update_time BEGIN
+    UPDATE system_config SET update_time = datetime('now', 'localtime') WHERE id = new.id;
+END;
+
+-- 爬虫任务记录表
+CREATE TABLE IF NOT EXISTS crawl_tasks (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    task_id VARCHAR(100) UNIQUE NOT NULL,
+    start_url VARCHAR(500),
+    status VARCHAR(20) DEFAULT 'pending' CHECK (status IN ('pending', 'running', 'completed', 'failed')),
+    total_pages INT DEFAULT 0,
+    crawled_pages INT DEFAULT 0,
+    start_time TIMESTAMP NULL,
+    end_time TIMESTAMP NULL,
+    error_message TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_crawl_tasks_status ON crawl_tasks (status);
+
+-- 后台任务表（爬取、知识库构建、热门问题答案预生成，由 run.py worker 进程执行）
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    job_uid CHAR(32) UNIQUE NOT NULL,
+    job_type VARCHAR(50) NOT NULL,  -- crawl/build_knowledge/precompute_answers
+    active_key VARCHAR(50) UNIQUE,  -- 排队或运行中时等于job_type，结束后置NULL，同类任务同时只有一个
+    status VARCHAR(20) DEFAULT 'pending' CHECK (status IN ('pending', 'running', 'completed', 'failed')),
+    trigger_source VARCHAR(20) DEFAULT 'manual',  -- manual/schedule/cli/build
+    progress_current INT DEFAULT 0,
+    progress_total INT DEFAULT 0,
+    progress_message VARCHAR(255),
+    result TEXT,  -- JSON
+    error_message TEXT,
+    worker VARCHAR(100),  -- 执行进程（主机名:PID）
+    create_time TIMESTAMP DEFAULT (datetime('now', 'localtime')),
+    start_time TIMESTAMP NULL,
+    heartbeat_time TIMESTAMP NULL,
+    end_time TIMESTAMP NULL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status);
+CREATE INDEX IF NOT EXISTS idx_jobs_type_time ON jobs (job_type, create_time);
+
+-- 预生成答案表（热门问题的大模型答案，由后台任务在低峰期或知识库构建后生成）
+CREATE TABLE IF NOT EXISTS precomputed_answers (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    question_fp CHAR(16) UNIQUE NOT NULL,  -- 归一化问题指纹，与qa_history.question_fp一致
+    question VARCHAR(500) NOT NULL,
+    answer TEXT NOT NULL,
+    answer_source VARCHAR(50),  -- 生成答案的大模型服务
+    confidence FLOAT,
+    similar_questions TEXT,  -- JSON
+    reference_links TEXT,  -- JSON，参考页面
+    provenance TEXT,  -- JSON，引用的知识库条目和页面：{"knowledge": {id: [更新时间, 摘要]}, "pages": {...}}
+    kb_version VARCHAR(32),  -- 生成时知识库和页面数据的版本
+    question_count INT DEFAULT 0,  -- 生成时统计窗口内的提问次数
+    status VARCHAR(20) DEFAULT 'active' CHECK (status IN ('active', 'stale')),  -- 引用的条目或页面变化后为stale，不再使用
+    create_time TIMESTAMP DEFAULT (datetime('now', 'localtime')),
+    update_time TIMESTAMP DEFAULT (datetime('now', 'localtime')),
+    expire_time TIMESTAMP NULL
+);
+CREATE INDEX IF NOT EXISTS idx_precomputed_status_expire ON precomputed_answers (status, expire_time);
+
+-- 页面段落表（按句子切分的正文片段，问答时检索段落而非整页）
+CREATE TABLE IF NOT EXISTS page_passages (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    page_id INT NOT NULL REFERENCES crawled_pages(id) ON DELETE CASCADE,
+    seq INT NOT NULL,  -- 页面内序号
+    start_offset INT NOT NULL,  -- 在页面正文中的起始字符位置
+    end_offset INT NOT NULL,
+    content TEXT NOT NULL,
+    char_count INT NOT NULL,
+    token_count INT NOT NULL,  -- 分词后的词项数（过滤停用词）
+    term_count INT NOT NULL,  -- 不同词项数
+    create_time TIMESTAMP DEFAULT (datetime('now', 'localtime')),
+    UNIQUE (page_id, seq)
+);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS passages_fts USING fts5(content);
+
+CREATE TRIGGER IF NOT EXISTS page_passages_fts_insert AFTER INSERT ON page_passages BEGIN
+    INSERT INTO passages_fts (rowid, content) VALUES (new.id, seg(new.content));
+END;
+CREATE TRIGGER IF NOT EXISTS page_passages_fts_update AFTER UPDATE OF content ON page_passages BEGIN
+    DELETE FROM passages_fts WHERE rowid = old.id;
+    INSERT INTO passages_fts (rowid, content) VALUES (new.id, seg(new.content));
+END;
+CREATE TRIGGER IF NOT EXISTS page_passages_fts_delete AFTER DELETE ON page_passages BEGIN
+    DELETE FROM passages_fts WHERE rowid = old.id;
+END;
+
+-- 语料词项IDF表（由知识库构建时的语料统计生成）
+CREATE TABLE IF NOT EXISTS term_idf (
+    term VARCHAR(100) NOT NULL PRIMARY KEY,  -- SQLite默认区分大小写，与utf8mb4_bin一致
+    doc_freq INT NOT NULL,
+    idf FLOAT NOT NULL,
+    update_time TIMESTAMP DEFAULT (datetime('now', 'localtime'))
+);
+
+-- 招生计划表（按专业和省份）
+CREATE TABLE IF NOT EXISTS admission_plans (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    year INT NOT NULL,                    -- 年份
+    province VARCHAR(50) NOT NULL,        -- 省份
+    major VARCHAR(100) NOT NULL,          -- 专业名称
+    major_code VARCHAR(20),               -- 专业代码
+    batch VARCHAR(50),                    -- 批次（本科一批、本科二批等）
+    plan_count INT,                       -- 计划招生人数
+    actual_count INT,                     -- 实际录取人数
+    create_time TIMESTAMP DEFAULT (datetime('now', 'localtime'))
+);
+CREATE INDEX IF NOT EXISTS idx_plans_year_province ON admission_plans (year, province);
+CREATE INDEX IF NOT EXISTS idx_plans_major ON admission_plans (major);
+
+-- 历年录取分数线表
+CREATE TABLE IF NOT EXISTS admission_scores (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    year INT NOT NULL,                    -- 年份
+    province VARCHAR(50) NOT NULL,        -- 省份
+    major VARCHAR(100),                   -- 专业（如果为NULL表示学校整体分数线）
+    category VARCHAR(20),                 -- 文理科（文科/理科/综合）
+    batch VARCHAR(50),                    -- 批次
+    min_score INT,                        -- 最低分
+    avg_score INT,                        -- 平均分
+    max_score INT,                        -- 最高分
+    rank_position INT,                    -- 位次
+    create_time TIMESTAMP DEFAULT (datetime('now', 'localtime')),
+    update_time TIMESTAMP DEFAULT (datetime('now', 'localtime')),
+    -- 导入时按此键覆盖（run.py ingest-scores），专业和批次为空时存空字符串
+    UNIQUE (year, province, category, major, batch)
+);
+CREATE INDEX IF NOT EXISTS idx_scores_year_province_category ON admission_scores (year, province, category);
+CREATE TRIGGER IF NOT EXISTS admission_scores_touch AFTER UPDATE ON admission_scores
+WHEN new.update_time IS old.update_time BEGIN
+    UPDATE admission_scores SET update_time = datetime('now', 'localtime') WHERE id = new.id;
+END;
+
+-- 招生简章和政策表
+CREATE TABLE IF NOT EXISTS admission_policies (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    year INT NOT NULL,                    -- 年份
+    title VARCHAR(255) NOT NULL,          -- 标题
+    content TEXT,                         -- 内容
+    policy_type VARCHAR(50),              -- 类型（招生简章/录取规则/特殊类型等）
+    url VARCHAR(500),                     -- 原文链接
+    publish_date DATE,                    -- 发布日期
+    create_time TIMESTAMP DEFAULT (datetime('now', 'localtime'))
+);
+CREATE INDEX IF NOT EXISTS idx_policies_year_type ON admission_policies (year, policy_type);
+
+-- 学校基本信息表（存储关键数据）
+CREATE TABLE IF NOT EXISTS school_info (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    info_key VARCHAR(100) NOT NULL UNIQUE, -- 信息键（如：total_students, campus_area等）
+    info_value TEXT,                       -- 信息值
+    info_type VARCHAR(50),                 -- 信息类型（basic/contact/facility等）
+    description VARCHAR(255),              -- 描述
+    update_time TIMESTAMP DEFAULT (datetime('now', 'localtime'))
+);
+CREATE INDEX IF NOT EXISTS idx_school_info_type ON school_info (info_type);
+CREATE TRIGGER IF NOT EXISTS school_info_touch AFTER UPDATE ON school_info
+WHEN new.update_time IS old.update_time BEGIN
+    UPDATE school_info SET update_time = datetime('now', 'localtime') WHERE id = new.id;
+END;
+
+-- 初始配置（已存在的配置不覆盖）
+INSERT OR IGNORE INTO system_config (config_key, config_value, description) VALUES
+('crawl_enabled', 'true', '是否启用自动爬取'),
+('crawl_interval_hours', '24', '爬取间隔（小时）'),
+('max_crawl_depth', '3', '最大爬取深度'),
+('deepseek_model', 'deepseek-chat', '使用的DeepSeek模型'),
+('answer_max_length', '500', '回答最大长度');
@@ -0,0 +1,120 @@
+import sys
+import time
+import logging
+import threading
+from collections import OrderedDict, deque
+from typing import Dict, List, Optional
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.config import Config
+
+
+class _SessionEntry:
+    __slots__ = ('turns', 'version', 'size', 'last_access')
+
+    def __init__(self, capacity: int, version: Optional[str]):
+        self.turns = deque(maxlen=capacity)  # 从旧到新
+        self.version = version
+        self.size = 0
+        self.last_access = time.monotonic()
+
+
+def _turn_size(turn: Dict) -> int:
+    return sys.getsizeof(turn.get('user_question') or '') + sys.getsizeof(turn.get('system_answer') or '') + 200
+
+
+class SessionHistoryCache:
+    """按会话缓存最近几轮对话的环形缓冲区
+
+    会话按最近访问排序，空闲超时或超出会话数/内存上限时淘汰最久未访问的会话；
+    未命中时由调用方从数据库加载。version为会话最后一轮的标识（保存在客户端cookie中），
+    与缓存不一致说明有轮次由其他进程处理，需重新加载。
+    """
+
+    def __init__(self, turns: int = None, idle_seconds: int = None, max_sessions: int = None,
+                 max_bytes: int = None):
+        self.turns = turns or Config.SESSION_HISTORY_TURNS
+        self.idle_seconds = idle_seconds or Config.SESSION_IDLE_SECONDS
+        self.max_sessions = max_sessions or Config.SESSION_MAX_COUNT
+        self.max_bytes = max_bytes or Config.SESSION_CACHE_MAX_MB * 1024 * 1024
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        self.sessions: OrderedDict = OrderedDict()
+        self.total_bytes = 0
+        self._stats = {'hits': 0, 'misses': 0, 'stale': 0, 'evicted': 0}
+
+    def get(self, session_id: str, limit: int, version: str = None) -> Optional[List[Dict]]:
+        """命中时返回最近limit轮（新的在前，与数据库查询结果一致），未命中返回None"""
+        with self._lock:
+            entry = self.sessions.get(session_id)
+            if entry is None:
+                self._stats['misses'] += 1
+                return None
+            if version is not None and entry.version != version:
+                self._stats['stale'] += 1
+                self._remove(session_id)
+                return None
+            entry.last_access = time.monotonic()
+            self.sessions.move_to_end(session_id)
+            self._stats['hits'] += 1
+            return list(reversed(entry.turns))[:limit]
+
+    def start(self, session_id: str, version: str = None):
+        """新建的会话没有历史记录，无需查询数据库"""
+        self.load(session_id, [], version)
+
+    def load(self, session_id: str, rows: List[Dict], version: str = None):
+        """写入从数据库加载的历史（新的在前）"""
+        with self._lock:
+            self._remove(session_id)
+            entry = _SessionEntry(self.turns, version)
+            for row in reversed(rows[:self.turns]):
+                entry.turns.append(row)
+                entry.size += _turn_size(row)
+            self.sessions[session_id] = entry
+            self.total_bytes += entry.size
+            self._evict()
+
+    def append(self, session_id: str, turn: Dict, version: str = None):
+        """追加一轮对话；会话不在缓存中时忽略，下次访问再从数据库完整加载"""
+        with self._lock:
+            entry = self.sessions.get(session_id)
+            if entry is None:
+                return
+            if len(entry.turns) == entry.turns.maxlen:
+                dropped = _turn_size(entry.turns[0])
+                entry.size -= dropped
+                self.total_bytes -= dropped
+            entry.turns.append(turn)
+            size = _turn_size(turn)
+            entry.size += size
+            self.total_bytes += size
+            entry.version = version
+            entry.last_access = time.monotonic()
+            self.sessions.move_to_end(session_id)
+            self._evict()
+
+    def _remove(self, session_id: str):
+        entry = self.sessions.pop(session_id, None)
+        if entry is not None:
+            self.total_bytes -= entry.size
+
+    def _evict(self):
+        # 按最近访问排序，队首即最久未访问的会话
+        cutoff = time.monotonic() - self.idle_seconds
+        while self.sessions:
+            session_id, entry = next(iter(self.sessions.items()))
+            if (entry.last_access >= cutoff and len(self.sessions) <= self.max_sessions
+                    and self.total_bytes <= self.max_bytes):
+                break
+            self._remove(session_id)
+            self._stats['evicted'] += 1
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats.update({'sessions': len(self.sessions), 'bytes': self.total_bytes})
+        lookups = stats['hits'] + stats['misses'] + stats['stale']
+        stats['hit_rate'] = round(stats['hits'] / lookups, 4) if lookups else 0.0
+        return stats
@@ -0,0 +1,153 @@
+import time
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.config import Config
+
+
+def current_hour() -> datetime:
+    return datetime.now().replace(minute=0, second=0, microsecond=0)
+
+
+class StatisticsTracker:
+    """统计信息的内存快照
+
+    写入时增量更新计数器，读取时直接返回缓存的快照；启动预热时从数据库（页面计数与按小时汇总表）
+    完整核对一次，之后每隔一段时间在后台线程核对，纠正其他进程写入带来的偏差。
+    """
+
+    def __init__(self, reconcile_interval: int = None, window_hours: int = 7 * 24):
+        self.reconcile_interval = reconcile_interval or Config.STATS_RECONCILE_SECONDS
+        self.window_hours = window_hours
+        self.logger = logging.getLogger(__name__)
+
+        self._lock = threading.Lock()
+        self._reconcile_lock = threading.Lock()
+        self.pages: Dict[str, int] = {}
+        self.knowledge_entries = 0
+        # 小时 -> [问答数, 响应时间合计, 满意度合计, 评分数]
+        self.qa_buckets: Dict[datetime, list] = {}
+        self.reconciled_at = 0.0
+        self._snapshot: Optional[Dict] = None
+        self._snapshot_hour: Optional[datetime] = None
+
+    # ---- 写入时的增量更新 ----
+
+    def record_page(self, page_type: str):
+        with self._lock:
+            page_type = page_type or 'general'
+            self.pages[page_type] = self.pages.get(page_type, 0) + 1
+            self._snapshot = None
+
+    def record_knowledge(self, count: int = 1):
+        with self._lock:
+            self.knowledge_entries += count
+            self._snapshot = None
+
+    def record_qa(self, response_time: int):
+        with self._lock:
+            bucket = self.qa_buckets.setdefault(current_hour(), [0, 0, 0, 0])
+            bucket[0] += 1
+            bucket[1] += response_time or 0
+            self._snapshot = None
+
+    def record_satisfaction(self, hour: datetime, old_score: Optional[int], new_score: int):
+        with self._lock:
+            bucket = self.qa_buckets.get(hour)
+            if bucket is None:
+                return
+            if old_score is None:
+                bucket[2] += new_score
+                bucket[3] += 1
+            else:
+                bucket[2] += new_score - old_score
+            self._snapshot = None
+
+    # ---- 读取 ----
+
+    def snapshot(self, db) -> Dict:
+        """返回统计快照；到期时在后台线程核对，当前请求不等待数据库汇总"""
+        if time.time() - self.reconciled_at >= self.reconcile_interval:
+            self.reconcile_in_background(db)
+
+        with self._lock:
+            hour = current_hour()
+            if self._snapshot is None or self._snapshot_hour != hour:
+                self._snapshot = self._build_snapshot(hour)
+                self._snapshot_hour = hour
+            return self._snapshot
+
+    def _build_snapshot(self, hour: datetime) -> Dict:
+        window_start = hour - timedelta(hours=self.window_hours)
+        # 丢弃滑出窗口的小时桶
+        for key in [k for k in self.qa_buckets if k < window_start]:
+            del self.qa_buckets[key]
+
+        total = rt_sum = sat_sum = sat_count = 0
+        for count, response_sum, satisfaction_sum, satisfaction_count in self.qa_buckets.values():
+            total += count
+            rt_sum += response_sum
+            sat_sum += satisfaction_sum
+            sat_count += satisfaction_count
+
+        return {
+            'pages': dict(self.pages),
+            'total_pages': sum(self.pages.values()),
+            'knowledge_entries': self.knowledge_entries,
+            'recent_qa': {
+                'total': total,
+                'avg_response_time': float(rt_sum / total) if total else 0.0,
+                'avg_satisfaction': float(sat_sum / sat_count) if sat_count else 0.0
+            },
+            'reconciled_at': datetime.fromtimestamp(self.reconciled_at).strftime('%Y-%m-%d %H:%M:%S')
+        }
+
+    def reconcile_in_background(self, db) -> bool:
+        """启动一次后台核对，已有核对在进行时返回False
+
+        按需启动而不是常驻定时线程：gunicorn预加载后fork出的worker不继承主进程的线程。
+        """
+        # 只让一个线程做核对，其他请求继续使用旧快照
+        if not self._reconcile_lock.acquire(blocking=False):
+            return False
+
+        def run():
+            try:
+                if time.time() - self.reconciled_at >= self.reconcile_interval:
+                    self.reconcile(db)
+            finally:
+                self._reconcile_lock.release()
+
+        threading.Thread(target=run, name='statistics-reconcile', daemon=True).start()
+        return True
+
+    def reconcile(self, db):
+        """从数据库重新计算精确值"""
+        try:
+            window_start = current_hour() - timedelta(hours=self.window_hours)
+            db.rebuild_qa_rollup(window_start)
+            pages = db.get_page_counts()
+            knowledge_entries = db.get_knowledge_count()
+            buckets = {row['hour_start']: [int(row['qa_count']), int(row['response_time_sum'] or 0),
+                                           int(row['satisfaction_sum'] or 0), int(row['satisfaction_count'] or 0)]
+                       for row in db.get_qa_rollup(window_start)}
+            with self._lock:
+                self.pages = pages
+                self.knowledge_entries = knowledge_entries
+                self.qa_buckets = buckets
+                self.reconciled_at = time.time()
+                self._snapshot = None
+            self.logger.info("Statistics reconciled with database")
+        except Exception as e:
+            self.logger.error(f"Statistics reconcile failed: {str(e)}")
+            # 失败后也推迟下一次核对，避免每个请求都重试
+            self.reconciled_at = time.time()
+
+
+# 进程内共享的统计快照
+statistics_tracker = StatisticsTracker()
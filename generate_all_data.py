@@ -5,6 +5,7 @@ import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from database.db_manager import DatabaseManager
+from models.index_snapshot import build_snapshot
 
 def generate_comprehensive_admission_data():
     db = DatabaseManager()
@@ -149,25 +150,23 @@ def generate_comprehensive_admission_data():
                 answer += f"理工类录取{ligong_data['admitted_count']}人，分数线{ligong_data['min_score']}-{ligong_data['max_score']}分（平均{ligong_data['avg_score']}分）。"
                 answer += "详细专业分布可联系招生办：0451-87505389。"
                 
-                # 多种问法
-                questions = [
-                    f"{year}年{province}录取多少人",
-                    f"{year}年在{province}省招生人数", 
-                    f"{province}{year}年录取情况",
-                    f"{province}省{year}年分数线"
-                ]
-                
-                for question in questions:
-                    try:
-                        db.save_knowledge(question, answer, 
-                                        "https://zs.hljeu.edu.cn/lnfs/list.htm",
-                                        "招生录取", f"{year},{province},录取人数,分数线", 0.9)
-                        knowledge_count += 1
-                    except Exception as e:
-                        print(f'知识库插入失败: {question} - {e}')
+                # 每个年份/省份只保存一个标准问法，其他问法由向量索引覆盖
+                question = f"{year}年{province}录取情况"
+                try:
+                    db.save_knowledge(question, answer, 
+                                    "https://zs.hljeu.edu.cn/lnfs/list.htm",
+                                    "招生录取", f"{year},{province},录取人数,招生人数,分数线", 0.9)
+                    knowledge_count += 1
+                except Exception as e:
+                    print(f'知识库插入失败: {question} - {e}')
 
     print(f'知识库条目生成完成，共 {knowledge_count} 条')
 
+    # 重建检索索引快照（含语义检索向量）
+    print('重建检索索引快照...')
+    snapshot = build_snapshot(db)
+    print(f"向量索引条目: {snapshot['sections']['kb_ids']['shape'][0]} 条")
+
     # 4. 统计验证
     stats = db.execute_query('SELECT COUNT(*) as total FROM admission_scores')
     knowledge_stats = db.execute_query('SELECT COUNT(*) as total FROM knowledge_base WHERE keywords LIKE "%录取人数%"')
@@ -0,0 +1,217 @@
+import time
+import logging
+import threading
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.admission_qa import canonical_category, canonical_province
+
+# 各表加载的列：(列名, 类型)，类型为 category（字典编码）或 number（float64，缺失为NaN）
+TABLE_COLUMNS = {
+    'scores': ('admission_scores', [
+        ('year', 'number'), ('province', 'category'), ('category', 'category'), ('major', 'category'),
+        ('min_score', 'number'), ('avg_score', 'number'), ('max_score', 'number'),
+    ]),
+    'plans': ('admission_plans', [
+        ('year', 'number'), ('province', 'category'), ('major', 'category'), ('batch', 'category'),
+        ('plan_count', 'number'), ('actual_count', 'number'),
+    ]),
+}
+
+# 类别列在入库数据中写法不一，加载时统一
+NORMALIZERS = {
+    'province': canonical_province,
+    'category': canonical_category,
+}
+
+AGGREGATES = ('min', 'max', 'mean', 'sum', 'count')
+
+
+class ColumnTable:
+    """列式存储：类别列保存为整数编码，数值列保存为float64数组"""
+
+    def __init__(self, rows: List[Dict], columns: List[Tuple[str, str]]):
+        self.size = len(rows)
+        self.columns: Dict[str, np.ndarray] = {}
+        self.labels: Dict[str, List[str]] = {}
+        self.codes: Dict[str, Dict[str, int]] = {}
+        self.kinds = dict(columns)
+
+        for name, kind in columns:
+            values = [row.get(name) for row in rows]
+            if kind == 'number':
+                self.columns[name] = np.array(
+                    [float(v) if v is not None and v != '' else np.nan for v in values], dtype=np.float64)
+            else:
+                normalize = NORMALIZERS.get(name)
+                values = [(normalize(v) or v) if normalize and v else (v or '') for v in values]
+                labels, codes = np.unique(np.array(values, dtype=object), return_inverse=True)
+                self.labels[name] = list(labels)
+                self.codes[name] = {label: i for i, label in enumerate(labels)}
+                self.columns[name] = codes.astype(np.int32)
+
+    def mask(self, filters: Dict) -> np.ndarray:
+        """按等值/区间条件生成布尔掩码，未知取值直接返回空结果"""
+        mask = np.ones(self.size, dtype=bool)
+        for name, value in filters.items():
+            if value is None or name not in self.columns:
+                continue
+            if self.kinds[name] == 'number':
+                if isinstance(value, tuple):
+                    low, high = value
+                    if low is not None:
+                        mask &= self.columns[name] >= low
+                    if high is not None:
+                        mask &= self.columns[name] <= high
+                else:
+                    mask &= self.columns[name] == value
+            else:
+                normalize = NORMALIZERS.get(name)
+                value = (normalize(value) or value) if normalize else value
+                code = self.codes[name].get(value)
+                if code is None:
+                    return np.zeros(self.size, dtype=bool)
+                mask &= self.columns[name] == code
+        return mask
+
+    def group_labels(self, name: str, keys: np.ndarray) -> List:
+        if self.kinds[name] == 'number':
+            return [int(k) if float(k).is_integer() else float(k) for k in keys]
+        return [self.labels[name][k] for k in keys]
+
+    def aggregate(self, metric: str, group_by: Optional[str], agg: str, filters: Dict) -> List[Dict]:
+        """分组聚合，使用排序+reduceat，全程向量化"""
+        values = self.columns[metric]
+        mask = self.mask(filters) & ~np.isnan(values)
+        values = values[mask]
+        if group_by is None:
+            if not len(values):
+                return []
+            return [{'group': None, 'value': _reduce(values, agg), 'count': int(len(values))}]
+
+        keys = self.columns[group_by][mask]
+        if not len(keys):
+            return []
+        order = np.argsort(keys, kind='stable')
+        keys, values = keys[order], values[order]
+        starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+        counts = np.diff(np.r_[starts, len(keys)])
+
+        if agg == 'min':
+            result = np.minimum.reduceat(values, starts)
+        elif agg == 'max':
+            result = np.maximum.reduceat(values, starts)
+        elif agg == 'sum':
+            result = np.add.reduceat(values, starts)
+        elif agg == 'mean':
+            result = np.add.reduceat(values, starts) / counts
+        else:
+            result = counts.astype(np.float64)
+
+        groups = self.group_labels(group_by, keys[starts])
+        return [{'group': g, 'value': round(float(v), 2), 'count': int(c)}
+                for g, v, c in zip(groups, result, counts)]
+
+
+def _reduce(values: np.ndarray, agg: str) -> float:
+    if agg == 'count':
+        return float(len(values))
+    return round(float(getattr(np, agg)(values)), 2)
+
+
+class AdmissionAnalytics:
+    """招生数据的内存列式分析，表数据变化时自动重新加载"""
+
+    def __init__(self, db, refresh_interval: int = 30):
+        self.db = db
+        self.refresh_interval = refresh_interval
+        self.logger = logging.getLogger(__name__)
+        self.tables: Dict[str, ColumnTable] = {}
+        self.signatures: Dict[str, tuple] = {}
+        self.checked_at: Dict[str, float] = {}
+        self.has_update_time: Dict[str, bool] = {}
+        self._lock = threading.Lock()
+
+    def table_signature(self, table_name: str) -> tuple:
+        """表的变更签名：行数、最大ID及更新时间
+
+        有update_time列时计入最后更新的行，覆盖导入只更新已有行时SQLite也能检测到变化
+        """
+        if table_name not in self.has_update_time:
+            self.has_update_time[table_name] = 'update_time' in self.db.table_columns(table_name)
+        columns = "COUNT(*) AS row_count, MAX(id) AS max_id"
+        if self.has_update_time[table_name]:
+            columns += ", MAX(update_time) AS updated"
+        rows = self.db.execute_query(f"SELECT {columns} FROM {table_name}")
+        if not rows:
+            return ()
+        return (rows[0]['row_count'], rows[0]['max_id'], rows[0].get('updated'),
+                self.db.table_update_time(table_name))
+
+    def invalidate(self, name: str = None):
+        """数据写入后强制下次访问时重新检查"""
+        with self._lock:
+            for key in ([name] if name else list(self.checked_at)):
+                self.checked_at.pop(key, None)
+
+    def get_table(self, name: str) -> ColumnTable:
+        now = time.time()
+        if name in self.tables and now - self.checked_at.get(name, 0) < self.refresh_interval:
+            return self.tables[name]
+
+        with self._lock:
+            if name in self.tables and now - self.checked_at.get(name, 0) < self.refresh_interval:
+                return self.tables[name]
+            table_name, columns = TABLE_COLUMNS[name]
+            signature = self.table_signature(table_name)
+            if name not in self.tables or signature != self.signatures.get(name):
+                column_list = ', '.join(c for c, _ in columns)
+                rows = self.db.execute_query(f"SELECT {column_list} FROM {table_name}")
+                self.tables[name] = ColumnTable(rows, columns)
+                self.signatures[name] = signature
+                self.logger.info(f"Loaded {len(rows)} rows from {table_name} into column store")
+            self.checked_at[name] = now
+            return self.tables[name]
+
+    def aggregate(self, name: str, metric: str, group_by: str = None, agg: str = 'mean',
+                  filters: Dict = None) -> List[Dict]:
+        table = self.get_table(name)
+        self._validate(table, metric, group_by, agg)
+        return table.aggregate(metric, group_by, agg, filters or {})
+
+    def trend(self, name: str, metric: str, agg: str = 'mean', filters: Dict = None) -> List[Dict]:
+        """按年份聚合，并计算同比变化"""
+        series = self.aggregate(name, metric, 'year', agg, filters)
+        if not series:
+            return []
+        values = np.array([item['value'] for item in series], dtype=np.float64)
+        deltas = np.r_[np.nan, np.diff(values)]
+        prev = np.r_[np.nan, values[:-1]]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ratios = deltas / prev * 100
+        for item, delta, ratio in zip(series, deltas, ratios):
+            item['delta'] = None if np.isnan(delta) else round(float(delta), 2)
+            item['delta_pct'] = None if not np.isfinite(ratio) else round(float(ratio), 2)
+        return series
+
+    def ranking(self, name: str, metric: str, by: str = 'province', agg: str = 'mean',
+                filters: Dict = None, ascending: bool = True, limit: int = 10) -> List[Dict]:
+        """按某一维度聚合后排名"""
+        groups = self.aggregate(name, metric, by, agg, filters)
+        if not groups:
+            return []
+        values = np.array([item['value'] for item in groups], dtype=np.float64)
+        order = np.argsort(values if ascending else -values, kind='stable')[:limit]
+        return [dict(groups[i], rank=rank) for rank, i in enumerate(order, 1)]
+
+    @staticmethod
+    def _validate(table: ColumnTable, metric: str, group_by: Optional[str], agg: str):
+        if table.kinds.get(metric) != 'number':
+            raise ValueError(f"不支持的统计字段: {metric}")
+        if group_by is not None and group_by not in table.kinds:
+            raise ValueError(f"不支持的分组字段: {group_by}")
+        if agg not in AGGREGATES:
+            raise ValueError(f"不支持的聚合方式: {agg}")
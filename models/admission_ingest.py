@@ -0,0 +1,328 @@
+import csv
+import time
+import logging
+from collections import Counter
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.admission_qa import PROVINCE_ALIASES, canonical_category, canonical_province, format_score_answer
+
+# 表头别名：招生办导出的表格列名不统一，统一映射到admission_scores的列
+HEADER_ALIASES = {
+    'year': ['年份', '年度', '招生年份', '录取年份'],
+    'province': ['省份', '省市', '生源地', '生源省份', '招生省份', '地区'],
+    'category': ['科类', '类别', '文理科', '文理', '选科类别', '首选科目'],
+    'major': ['专业', '专业名称', '录取专业'],
+    'batch': ['批次', '录取批次', '招生批次'],
+    'min_score': ['最低分', '最低分数', '最低录取分', '投档线'],
+    'avg_score': ['平均分', '平均分数'],
+    'max_score': ['最高分', '最高分数'],
+    'rank_position': ['最低位次', '位次', '最低分位次'],
+}
+SCORE_FIELDS = ('min_score', 'avg_score', 'max_score')
+REQUIRED_FIELDS = ('year', 'province', 'category')
+TABLE_COLUMNS = ('year', 'province', 'category', 'major', 'batch',
+                 'min_score', 'avg_score', 'max_score', 'rank_position', 'update_time')
+# 新高考“首选科目”列的取值，只在导入时识别；加入CATEGORY_ALIASES会让问答中的“物理”“历史”被当作科类
+SUBJECT_CATEGORIES = {'物理': '理工', '历史': '文史'}
+# 各省高考总分不超过750（上海660），留出余量
+MAX_SCORE = 1000
+
+# 生成的知识库条目：每个年份/省份一条，问法与generate_all_data.py一致，重新导入时就地更新
+KB_QUESTION = "{year}年{province}录取情况"
+KB_URL = "https://zs.hljeu.edu.cn/lnfs/list.htm"
+
+
+def _header_lookup() -> Dict[str, str]:
+    lookup = {}
+    for field, aliases in HEADER_ALIASES.items():
+        for name in [field] + aliases:
+            lookup[name.lower()] = field
+    return lookup
+
+
+HEADER_LOOKUP = _header_lookup()
+
+
+def _clean(value) -> str:
+    return '' if value is None else str(value).strip()
+
+
+def _integer(value) -> Optional[int]:
+    """表格中的数字可能是512、'512'、512.0、'512分'或'2024年'"""
+    text = _clean(value).rstrip('分名年').replace(',', '')
+    if not text or text in ('-', '—', '/'):
+        return None
+    return int(float(text))
+
+
+def read_csv(path: str) -> Iterator[List]:
+    """逐行读取CSV；Excel另存的CSV常为GBK编码"""
+    encoding = 'utf-8-sig'
+    with open(path, 'rb') as f:
+        head = f.read(65536)
+    try:
+        head.decode('utf-8')
+    except UnicodeDecodeError as e:
+        # 截断在多字节字符中间时不是编码问题
+        if e.start < len(head) - 3:
+            encoding = 'gb18030'
+    with open(path, 'r', encoding=encoding, newline='') as f:
+        yield from csv.reader(f)
+
+
+def read_xlsx(path: str, sheet: str = None) -> Iterator[List]:
+    """以只读模式逐行读取工作表，不把整个文件加载到内存"""
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise RuntimeError("Reading .xlsx files requires openpyxl (pip install openpyxl)")
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        worksheet = workbook[sheet] if sheet else workbook.worksheets[0]
+        for row in worksheet.iter_rows(values_only=True):
+            yield list(row)
+    finally:
+        workbook.close()
+
+
+def read_rows(path: str, sheet: str = None) -> Iterator[List]:
+    extension = os.path.splitext(path)[1].lower()
+    if extension in ('.xlsx', '.xlsm'):
+        return read_xlsx(path, sheet)
+    if extension in ('.csv', '.txt'):
+        return read_csv(path)
+    raise ValueError(f"Unsupported file type: {extension} (expected .csv or .xlsx)")
+
+
+class ScoreIngester:
+    """招生办导出的录取分数表（CSV/XLSX）流式导入admission_scores
+
+    逐行读取并校验、规范化（省份别名、科类名称），按chunk_size批量写入；
+    以 (年份, 省份, 科类, 专业, 批次) 为键覆盖已有数据，完成后只重新生成涉及的年份/省份的知识库条目。
+    """
+
+    def __init__(self, db, chunk_size: int = 2000, replace: bool = False, dry_run: bool = False):
+        self.db = db
+        self.chunk_size = chunk_size
+        # replace=True时先删除文件涉及的每个年份/省份的已有数据（含省份别名写法的旧数据）
+        self.replace = replace
+        self.dry_run = dry_run
+        self.logger = logging.getLogger(__name__)
+        self.counts: Counter = Counter()
+        self.rejected: Counter = Counter()
+        # 前20个被拒绝的行，便于核对原表
+        self.samples: List[str] = []
+        self.affected: Set[Tuple[int, str]] = set()
+
+    def check_table(self) -> Optional[str]:
+        """admission_scores缺少导入需要的列时返回说明"""
+        columns = set(self.db.table_columns('admission_scores'))
+        if not columns:
+            return "admission_scores table not found; run database/create_admission_tables.sql"
+        missing = [c for c in TABLE_COLUMNS if c not in columns]
+        if missing:
+            return (f"admission_scores is missing columns {', '.join(missing)}; "
+                    f"run database/migrate_admission_scores.sql")
+        return None
+
+    def map_header(self, header: List) -> Dict[str, int]:
+        mapping = {}
+        for index, name in enumerate(header):
+            field = HEADER_LOOKUP.get(_clean(name).replace(' ', '').lower())
+            if field and field not in mapping:
+                mapping[field] = index
+        missing = [f for f in REQUIRED_FIELDS if f not in mapping]
+        if missing:
+            raise ValueError(f"Missing required columns: {', '.join(missing)} (header: {header})")
+        if not any(f in mapping for f in SCORE_FIELDS):
+            raise ValueError(f"No score column found (header: {header})")
+        return mapping
+
+    def normalize(self, values: List, mapping: Dict[str, int]) -> Tuple[Optional[Dict], Optional[str]]:
+        """返回 (规范化后的行, None) 或 (None, 拒绝原因)"""
+        def get(field):
+            index = mapping.get(field)
+            return values[index] if index is not None and index < len(values) else None
+
+        try:
+            year = _integer(get('year'))
+        except ValueError:
+            return None, 'invalid_year'
+        if year is None or not 2000 <= year <= 2100:
+            return None, 'invalid_year'
+
+        province = canonical_province(_clean(get('province')))
+        if province is None:
+            return None, 'unknown_province'
+        raw_category = _clean(get('category'))
+        category = canonical_category(raw_category) or SUBJECT_CATEGORIES.get(raw_category)
+        if category is None:
+            return None, 'unknown_category'
+
+        row = {'year': year, 'province': province, 'category': category,
+               'major': _clean(get('major'))[:100], 'batch': _clean(get('batch'))[:50]}
+        try:
+            for field in SCORE_FIELDS + ('rank_position',):
+                row[field] = _integer(get(field))
+        except ValueError:
+            return None, 'invalid_number'
+        scores = [row[f] for f in SCORE_FIELDS if row[f] is not None]
+        if not scores:
+            return None, 'no_score'
+        if any(not 0 < score <= MAX_SCORE for score in scores):
+            return None, 'score_out_of_range'
+        # 最低分、平均分、最高分应依次不减
+        if scores != sorted(scores):
+            return None, 'inconsistent_scores'
+        return row, None
+
+    def iter_valid(self, rows: Iterator[List]) -> Iterator[Dict]:
+        mapping = None
+        for line, values in enumerate(rows, 1):
+            if not any(_clean(v) for v in values):
+                continue
+            if mapping is None:
+                mapping = self.map_header(values)
+                continue
+            self.counts['read'] += 1
+            row, reason = self.normalize(values, mapping)
+            if reason:
+                self.rejected[reason] += 1
+                if len(self.samples) < 20:
+                    self.samples.append(f"line {line}: {reason} {values}")
+                continue
+            yield row
+
+    def upsert(self, chunk: List[Dict]) -> int:
+        # 同一批内重复的键保留最后一行
+        unique = {(r['year'], r['province'], r['category'], r['major'], r['batch']): r for r in chunk}
+        if self.replace:
+            self.delete_scopes({(r['year'], r['province']) for r in unique.values()} - self.affected)
+        query = """
+            INSERT INTO admission_scores
+                (year, province, category, major, batch, min_score, avg_score, max_score, rank_position)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE
+                min_score = VALUES(min_score),
+                avg_score = VALUES(avg_score),
+                max_score = VALUES(max_score),
+                rank_position = VALUES(rank_position),
+                update_time = NOW()
+        """
+        written = self.db.execute_many(query, [
+            (r['year'], r['province'], r['category'], r['major'], r['batch'],
+             r['min_score'], r['avg_score'], r['max_score'], r['rank_position'])
+            for r in unique.values()
+        ])
+        if not written:
+            raise RuntimeError("Bulk upsert failed; check that admission_scores has the uk_score unique key")
+        return len(unique)
+
+    def delete_scopes(self, scopes: Set[Tuple[int, str]]):
+        for year, province in sorted(scopes):
+            names = [province] + PROVINCE_ALIASES.get(province, [])
+            placeholders = ', '.join(['%s'] * len(names))
+            self.counts['deleted'] += self.db.execute_update(
+                f"DELETE FROM admission_scores WHERE year = %s AND province IN ({placeholders})",
+                tuple([year] + names))
+
+    def ingest(self, path: str, sheet: str = None) -> Dict:
+        """导入文件，返回计数、拒绝原因和每秒处理行数"""
+        problem = None if self.dry_run else self.check_table()
+        if problem:
+            raise RuntimeError(problem)
+
+        self.counts, self.rejected, self.samples, self.affected = Counter(), Counter(), [], set()
+        start = time.perf_counter()
+        chunk: List[Dict] = []
+        for row in self.iter_valid(read_rows(path, sheet)):
+            chunk.append(row)
+            if len(chunk) >= self.chunk_size:
+                self._flush(chunk, start)
+                chunk = []
+        if chunk:
+            self._flush(chunk, start)
+        load_seconds = time.perf_counter() - start
+
+        knowledge = {'updated': 0, 'created': 0}
+        if not self.dry_run and self.affected:
+            knowledge = self.regenerate_knowledge(self.affected)
+        elapsed = time.perf_counter() - start
+        report = {
+            'file': path,
+            'rows_read': self.counts['read'],
+            'rows_valid': self.counts['valid'],
+            'rows_rejected': sum(self.rejected.values()),
+            'rejected': dict(self.rejected),
+            'rows_written': self.counts['written'],
+            'rows_deleted': self.counts['deleted'],
+            'chunks': self.counts['chunks'],
+            'scopes': len(self.affected),
+            'knowledge_updated': knowledge['updated'],
+            'knowledge_created': knowledge['created'],
+            'load_seconds': round(load_seconds, 2),
+            'elapsed_seconds': round(elapsed, 2),
+            'rows_per_second': round(self.counts['read'] / load_seconds, 1) if load_seconds else 0.0,
+            'dry_run': self.dry_run,
+        }
+        return report
+
+    def _flush(self, chunk: List[Dict], start: float):
+        self.counts['valid'] += len(chunk)
+        self.counts['chunks'] += 1
+        if not self.dry_run:
+            self.counts['written'] += self.upsert(chunk)
+        self.affected.update((r['year'], r['province']) for r in chunk)
+        elapsed = time.perf_counter() - start
+        self.logger.info(f"Processed {self.counts['read']} rows ({self.counts['read'] / elapsed:.0f} rows/s)")
+
+    def summary_rows(self, year: int, province: str) -> List[Dict]:
+        """年份/省份的学校整体分数线；只有分专业数据时按科类汇总"""
+        names = [province] + PROVINCE_ALIASES.get(province, [])
+        placeholders = ', '.join(['%s'] * len(names))
+        params = tuple([year] + names)
+        rows = self.db.execute_query(
+            f"""
+            SELECT year, province, category, major, min_score, avg_score, max_score
+            FROM admission_scores
+            WHERE year = %s AND province IN ({placeholders}) AND (major IS NULL OR major = '')
+            ORDER BY category
+            """, params)
+        if rows:
+            return rows
+        return self.db.execute_query(
+            f"""
+            SELECT year, province, category, '' AS major, MIN(min_score) AS min_score,
+                   ROUND(AVG(avg_score)) AS avg_score, MAX(max_score) AS max_score
+            FROM admission_scores
+            WHERE year = %s AND province IN ({placeholders})
+            GROUP BY year, province, category
+            ORDER BY category
+            """, params)
+
+    def regenerate_knowledge(self, scopes: Set[Tuple[int, str]]) -> Dict:
+        """重新生成涉及的年份/省份的知识库条目：已有条目就地更新（ID不变，检索索引快照仍然有效）"""
+        counts = {'updated': 0, 'created': 0}
+        for year, province in sorted(scopes):
+            rows = self.summary_rows(year, province)
+            if not rows:
+                continue
+            for row in rows:
+                if row['avg_score'] is not None:
+                    row['avg_score'] = int(row['avg_score'])
+            answer = format_score_answer({'major': None, 'year': year}, rows)
+            question = KB_QUESTION.format(year=year, province=province)
+            existing = self.db.execute_query("SELECT id FROM knowledge_base WHERE question = %s", (question,))
+            if existing:
+                self.db.execute_update("UPDATE knowledge_base SET answer = %s WHERE id = %s",
+                                       (answer, existing[0]['id']))
+                counts['updated'] += 1
+            else:
+                self.db.save_knowledge(question, answer, KB_URL, "招生录取",
+                                       f"{year},{province},录取人数,招生人数,分数线", 0.9)
+                counts['created'] += 1
+        self.logger.info(f"Regenerated knowledge for {len(scopes)} year/province scopes: {counts}")
+        return counts
@@ -0,0 +1,173 @@
+import time
+import logging
+import threading
+from typing import Dict, List, Optional
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# 省级行政区：标准简称 -> 全称及常见别名
+PROVINCE_ALIASES = {
+    '北京': ['北京市', '京'], '天津': ['天津市', '津'], '河北': ['河北省', '冀'],
+    '山西': ['山西省', '晋'], '内蒙古': ['内蒙古自治区', '内蒙'], '辽宁': ['辽宁省', '辽'],
+    '吉林': ['吉林省'], '黑龙江': ['黑龙江省', '黑省', '龙江'], '上海': ['上海市', '沪'],
+    '江苏': ['江苏省', '苏'], '浙江': ['浙江省', '浙'], '安徽': ['安徽省', '皖'],
+    '福建': ['福建省', '闽'], '江西': ['江西省', '赣'], '山东': ['山东省', '鲁'],
+    '河南': ['河南省', '豫'], '湖北': ['湖北省', '鄂'], '湖南': ['湖南省', '湘'],
+    '广东': ['广东省', '粤'], '广西': ['广西壮族自治区', '广西自治区', '桂'], '海南': ['海南省', '琼'],
+    '重庆': ['重庆市', '渝'], '四川': ['四川省', '川'], '贵州': ['贵州省', '黔'],
+    '云南': ['云南省', '滇'], '西藏': ['西藏自治区', '藏'], '陕西': ['陕西省', '陕'],
+    '甘肃': ['甘肃省', '甘'], '青海': ['青海省', '青'], '宁夏': ['宁夏回族自治区', '宁'],
+    '新疆': ['新疆维吾尔自治区', '新'],
+}
+
+# 文理科类别：标准名称 -> 别名（数据表中两种写法都存在）
+CATEGORY_ALIASES = {
+    '文史': ['文史类', '文科', '历史类', '文'],
+    '理工': ['理工类', '理科', '物理类', '理'],
+    '综合': ['综合类', '综合改革', '不分文理'],
+}
+
+# 问分数线的意图词
+SCORE_INTENT_WORDS = ['分数线', '录取线', '最低分', '最高分', '平均分', '多少分', '录取分', '分数', '投档线']
+
+# 单字简称（如“鲁”“文”）容易误匹配，不参与识别
+MIN_ALIAS_LENGTH = 2
+
+# 校名中含有省份名，解析时整体匹配，不识别为省份
+SCHOOL_NAMES = ['黑龙江东方学院', '东方学院']
+
+
+def _build_lookup(aliases: Dict[str, List[str]]) -> Dict[str, str]:
+    lookup = {}
+    for canonical, alias_list in aliases.items():
+        lookup[canonical] = canonical
+        for alias in alias_list:
+            lookup[alias] = canonical
+    return lookup
+
+
+PROVINCE_LOOKUP = _build_lookup(PROVINCE_ALIASES)
+CATEGORY_LOOKUP = _build_lookup(CATEGORY_ALIASES)
+
+
+def canonical_province(name: str) -> Optional[str]:
+    return PROVINCE_LOOKUP.get(name.strip()) if name else None
+
+
+def canonical_category(name: str) -> Optional[str]:
+    return CATEGORY_LOOKUP.get(name.strip()) if name else None
+
+
+def format_score_answer(entities: Dict, rows: List[Dict]) -> str:
+    """分数线回答文本，rows为同一年份/省份各科类的分数线"""
+    first = rows[0]
+    subject = f"{first['major']}专业" if entities['major'] else ''
+    province = canonical_province(first['province']) or first['province']
+    # 用全称展示，避免出现“北京省”
+    province_name = PROVINCE_ALIASES[province][0] if province in PROVINCE_ALIASES else province
+    lines = [f"{first['year']}年黑龙江东方学院在{province_name}{subject}的录取分数线如下："]
+    for row in rows:
+        parts = []
+        for label, key in (('最低分', 'min_score'), ('平均分', 'avg_score'), ('最高分', 'max_score')):
+            if row.get(key) is not None:
+                parts.append(f"{label}{row[key]}分")
+        category = canonical_category(row.get('category')) or row.get('category') or '综合'
+        lines.append(f"- {category}类：{'，'.join(parts) if parts else '暂无分数数据'}")
+    if entities['year'] is None:
+        lines.append(f"（您未指定年份，以上为最近一年{first['year']}年的数据）")
+    lines.append("以上数据仅供参考，请以各省招生考试院公布的信息为准。详情可咨询招生办：0451-87505389。")
+    return '\n'.join(lines)
+
+
+class AdmissionFastPath:
+    """分数线类问题直接查询admission_scores，绕过大模型和知识库模糊匹配"""
+
+    def __init__(self, db):
+        self.db = db
+        # 查询理解词表（省份、科类、年份、专业）与知识库检索共用
+        self.matcher = db.get_query_matcher()
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        self._stats = {'total': 0, 'hits': 0, 'no_data': 0, 'not_matched': 0}
+
+    def _count(self, key: str):
+        with self._lock:
+            self._stats['total'] += 1
+            self._stats[key] += 1
+
+    def lookup_scores(self, entities: Dict) -> List[Dict]:
+        """按(year, province)索引查询分数线"""
+        province = entities['province']
+        provinces = [province] + [a for a in PROVINCE_ALIASES[province] if len(a) >= MIN_ALIAS_LENGTH]
+        province_placeholders = ', '.join(['%s'] * len(provinces))
+
+        year = entities['year']
+        if year is None:
+            rows = self.db.execute_query(
+                f"SELECT MAX(year) AS year FROM admission_scores WHERE province IN ({province_placeholders})",
+                tuple(provinces)
+            )
+            if not rows or rows[0]['year'] is None:
+                return []
+            year = rows[0]['year']
+
+        conditions = ["year = %s", f"province IN ({province_placeholders})"]
+        params = [str(year)] + provinces
+
+        category = entities['category']
+        if category:
+            categories = [category] + CATEGORY_ALIASES[category]
+            conditions.append(f"category IN ({', '.join(['%s'] * len(categories))})")
+            params.extend(categories)
+
+        if entities['major']:
+            conditions.append("major = %s")
+            params.append(entities['major'])
+        else:
+            conditions.append("(major IS NULL OR major = '')")
+
+        query = f"""
+            SELECT year, province, category, major, min_score, avg_score, max_score
+            FROM admission_scores
+            WHERE {' AND '.join(conditions)}
+            ORDER BY category
+        """
+        return self.db.execute_query(query, tuple(params))
+
+    def format_answer(self, entities: Dict, rows: List[Dict]) -> str:
+        return format_score_answer(entities, rows)
+
+    def answer(self, question: str) -> Optional[Dict]:
+        """能直接回答时返回结果，否则返回None交由常规流程处理"""
+        start_time = time.time()
+        try:
+            analysis = self.matcher.analyze(question)
+            entities = analysis['entities']
+            if not (analysis['score_intent'] and entities['province']):
+                self._count('not_matched')
+                return None
+
+            rows = self.lookup_scores(entities)
+            if not rows:
+                self._count('no_data')
+                return None
+
+            self._count('hits')
+            return {
+                'answer': self.format_answer(entities, rows),
+                'source': 'admission_fast_path',
+                'response_time': int((time.time() - start_time) * 1000),
+                'confidence': 1.0,
+                'entities': entities
+            }
+        except Exception as e:
+            self.logger.error(f"Admission fast path failed: {str(e)}")
+            self._count('not_matched')
+            return None
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats)
+        stats['hit_rate'] = round(stats['hits'] / stats['total'], 4) if stats['total'] else 0.0
+        return stats
@@ -0,0 +1,122 @@
+import re
+import math
+import logging
+from array import array
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+import warnings
+warnings.filterwarnings("ignore", message="pkg_resources is deprecated")
+import jieba
+jieba.setLogLevel(logging.WARNING)
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.config import Config
+
+# 统计时忽略的常见虚词
+STOP_WORDS = {
+    '的', '有', '是', '在', '个', '多少', '哪些', '什么', '如何', '怎么',
+    '我们', '你们', '他们', '以及', '进行', '通过', '一个', '没有', '可以',
+    '这个', '那个', '这些', '并且', '或者', '但是', '因为', '所以', '已经'
+}
+
+_TERM_PATTERN = re.compile(r'^[\u4e00-\u9fa5A-Za-z][\u4e00-\u9fa5A-Za-z0-9]*$')
+
+
+def tokenize(text: str) -> List[str]:
+    """分词并过滤单字、停用词和非文字词项"""
+    return [w for w in jieba.cut(text)
+            if len(w) > 1 and w not in STOP_WORDS and _TERM_PATTERN.match(w)]
+
+
+class CorpusStatistics:
+    """单次流式扫描语料，统计文档频率、IDF以及词项倒排表"""
+
+    def __init__(self, db=None):
+        self.db = db
+        self.logger = logging.getLogger(__name__)
+        self.total_docs = 0
+        self.doc_freq: Dict[str, int] = {}
+        self.idf: Dict[str, float] = {}
+        # 词项 -> 包含该词的页面ID（按ID递增）
+        self.postings: Dict[str, array] = {}
+        # 词项在各文档中的归一化词频之和，用于计算语料级TF-IDF
+        self.norm_tf_sum: Dict[str, float] = {}
+        self.page_titles: Dict[int, str] = {}
+        # 页面分词后的词项数
+        self.doc_lengths: Dict[int, int] = {}
+
+    def build(self, pages: Iterable[Dict] = None) -> 'CorpusStatistics':
+        """流式扫描页面，pages为空时从数据库分批读取"""
+        if pages is None:
+            pages = self.db.iter_crawled_pages(columns='id, title, content')
+
+        doc_freq = defaultdict(int)
+        norm_tf_sum = defaultdict(float)
+        postings = defaultdict(lambda: array('i'))
+        total_docs = 0
+        self.page_titles = {}
+        self.doc_lengths = {}
+
+        for page in pages:
+            terms = tokenize(page['content'] or '')
+            total_docs += 1
+            self.page_titles[page['id']] = page.get('title') or ''
+            self.doc_lengths[page['id']] = len(terms)
+            if not terms:
+                continue
+            length = len(terms)
+            for term, count in Counter(terms).items():
+                doc_freq[term] += 1
+                norm_tf_sum[term] += count / length
+                postings[term].append(page['id'])
+
+        self.total_docs = total_docs
+        self.doc_freq = dict(doc_freq)
+        self.norm_tf_sum = dict(norm_tf_sum)
+        self.postings = dict(postings)
+        self.idf = {term: self.compute_idf(df) for term, df in self.doc_freq.items()}
+
+        self.logger.info(f"Corpus statistics built: {total_docs} pages, {len(self.idf)} terms")
+        return self
+
+    def compute_idf(self, doc_freq: int) -> float:
+        """平滑IDF，避免出现在所有文档中的词得到0或负值"""
+        return math.log((self.total_docs + 1) / (doc_freq + 1)) + 1.0
+
+    def get_idf(self, term: str) -> Optional[float]:
+        return self.idf.get(term)
+
+    def top_terms(self, limit: int = 50) -> List[Tuple[str, float]]:
+        """按语料级TF-IDF返回主题词"""
+        scored = ((term, tf * self.idf[term]) for term, tf in self.norm_tf_sum.items())
+        return sorted(scored, key=lambda x: x[1], reverse=True)[:limit]
+
+    def pages_containing(self, term: str, limit: int = None) -> List[int]:
+        """返回包含该词的页面ID，无需扫描数据库"""
+        ids = self.postings.get(term)
+        if not ids:
+            return []
+        return list(ids[:limit]) if limit else list(ids)
+
+    def save(self, db=None, idf_file: str = None) -> int:
+        """持久化IDF表：写入数据库，并导出jieba可加载的IDF文件"""
+        db = db or self.db
+        rows = [(term, self.doc_freq[term], idf) for term, idf in self.idf.items()
+                if len(term) <= 100]
+        saved = db.save_term_idf(rows) if db else 0
+        self.export_jieba_idf(idf_file or Config.IDF_FILE)
+        return saved
+
+    def export_jieba_idf(self, path: str):
+        """导出为jieba IDF文件格式（每行：词 IDF）"""
+        if not self.idf:
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for term, idf in self.idf.items():
+                f.write(f"{term} {idf:.6f}\n")
+        os.replace(tmp_path, path)
+        self.logger.info(f"Domain IDF exported to {path}")
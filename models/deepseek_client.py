@@ -14,37 +14,21 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from config.config import Config
+from utils.tracing import traced
 
 class DeepSeekClient:
     def __init__(self):
         self.api_key = Config.DEEPSEEK_API_KEY
         self.api_url = "https://api.deepseek.com/chat/completions"  # 官方标准接口
+        # 日志级别由Config.LOG_LEVELS统一配置
         self.logger = logging.getLogger(__name__)
+        self.logger.info(f"DeepSeek client initialized (API key {'configured' if self.api_key else 'not configured'})")
         
-        # 强制设置日志级别为DEBUG
-        self.logger.setLevel(logging.DEBUG)
-        
-        # 如果没有handler，添加一个console handler
-        if not self.logger.handlers:
-            handler = logging.StreamHandler()
-            handler.setLevel(logging.DEBUG)
-            formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-            handler.setFormatter(formatter)
-            self.logger.addHandler(handler)
-        
-        self.logger.info(f"*** DeepSeek Client初始化完成 ***")
-        self.logger.info(f"*** API Key: {self.api_key[:20]}...（已配置）***" if self.api_key else "*** API Key未配置 ***")
-        
-        # 输出到控制台用于调试
-        print(f"[INIT] DeepSeek Client初始化 - API Key: {'已配置' if self.api_key else '未配置'}")
-        
+    @traced('llm_deepseek')
     def call_api(self, messages: List[Dict]) -> Optional[str]:
         """调用DeepSeek API - 严格按照官方文档"""
-        print(f"[DEBUG] call_api被调用，消息数量: {len(messages)}")
-        
         if not self.api_key:
-            print("[ERROR] DeepSeek API key未配置")
-            self.logger.error("*** DeepSeek API key未配置 ***")
+            self.logger.error("DeepSeek API key未配置")
             return None
         
         # 构建请求体 - 完全按照官方文档
@@ -62,62 +46,46 @@ class DeepSeekClient:
         }
         
         try:
-            self.logger.info(f"*** 开始调用DeepSeek API ***")
-            self.logger.info(f"*** 请求URL: {self.api_url} ***")
-            self.logger.info(f"*** 消息数量: {len(messages)} ***")
-            
             start_time = time.time()
             
             response = requests.post(
                 self.api_url,
                 headers=headers,
                 json=payload,  # 使用json参数而不是data
-                timeout=30
+                timeout=Config.LLM_REQUEST_TIMEOUT
             )
             
             response_time = int((time.time() - start_time) * 1000)
             
-            self.logger.info(f"*** API响应状态码: {response.status_code} ***")
-            self.logger.info(f"*** 响应时间: {response_time}ms ***")
-            
             if response.status_code == 200:
                 try:
                     result = response.json()
-                    self.logger.info(f"*** API响应解析成功 ***")
                     
                     if 'choices' in result and len(result['choices']) > 0:
                         content = result['choices'][0]['message']['content']
-                        self.logger.info(f"*** DeepSeek回答长度: {len(content)} 字符 ***")
-                        self.logger.info(f"*** DeepSeek回答前100字符: {content[:100]}... ***")
+                        self.logger.info(f"DeepSeek API {response_time}ms, {len(messages)} messages, {len(content)} chars")
                         return content
                     else:
-                        self.logger.error(f"*** API响应格式错误，无choices字段: {result} ***")
+                        self.logger.error(f"DeepSeek API响应格式错误，无choices字段: {str(result)[:500]}")
                         return None
                         
                 except json.JSONDecodeError as e:
-                    self.logger.error(f"*** JSON解析失败: {e} ***")
-                    self.logger.error(f"*** 原始响应: {response.text[:500]} ***")
+                    self.logger.error(f"DeepSeek API JSON解析失败: {e}, 原始响应: {response.text[:500]}")
                     return None
             else:
-                self.logger.error(f"*** DeepSeek API错误: {response.status_code} ***")
-                self.logger.error(f"*** 错误内容: {response.text} ***")
+                self.logger.error(f"DeepSeek API错误: {response.status_code} - {response.text[:500]}")
                 return None
                 
         except requests.exceptions.Timeout:
-            self.logger.error("*** DeepSeek API请求超时 ***")
+            self.logger.error("DeepSeek API请求超时")
             return None
         except Exception as e:
-            self.logger.error(f"*** DeepSeek API异常: {str(e)} ***")
-            import traceback
-            self.logger.error(f"*** 完整错误: {traceback.format_exc()} ***")
+            self.logger.error(f"DeepSeek API异常: {str(e)}", exc_info=True)
             return None
 
-    def answer_with_context(self, question: str, knowledge_base_results: List[Dict], 
-                           history: List[Dict] = None, page_content: str = None) -> Dict:
-        """基于上下文回答问题"""
-        self.logger.info(f"*** DeepSeek answer_with_context被调用 ***")
-        self.logger.info(f"*** 问题: {question} ***")
-        
+    def build_messages(self, question: str, knowledge_base_results: List[Dict],
+                       history: List[Dict] = None, page_content: str = None) -> List[Dict]:
+        """构建对话消息"""
         # 构建上下文
         context_parts = []
         
@@ -158,15 +126,23 @@ class DeepSeekClient:
         user_content = f"参考信息：\n{context_text}\n\n用户问题：{question}"
         messages.append({"role": "user", "content": user_content})
         
-        self.logger.info(f"*** 构建消息完成，共{len(messages)}条 ***")
-        
+        self.logger.debug(f"构建消息完成，共{len(messages)}条")
+        return messages
+
+    def generate_answer(self, question: str, knowledge_base_results: List[Dict],
+                        history: List[Dict] = None, page_content: str = None) -> Optional[str]:
+        """生成回答，失败返回None（不做知识库回退，供服务路由使用）"""
+        return self.call_api(self.build_messages(question, knowledge_base_results, history, page_content))
+
+    def answer_with_context(self, question: str, knowledge_base_results: List[Dict], 
+                           history: List[Dict] = None, page_content: str = None) -> Dict:
+        """基于上下文回答问题"""
         # 强制调用DeepSeek API
         start_time = time.time()
-        answer = self.call_api(messages)
+        answer = self.generate_answer(question, knowledge_base_results, history, page_content)
         response_time = int((time.time() - start_time) * 1000)
         
         if answer:
-            self.logger.info(f"*** DeepSeek API调用成功！返回结果 ***")
             return {
                 'answer': answer,
                 'source': 'deepseek_api',  # 明确标记为DeepSeek API
@@ -174,7 +150,7 @@ class DeepSeekClient:
                 'confidence': 0.95
             }
         else:
-            self.logger.warning(f"*** DeepSeek API调用失败，回退到知识库 ***")
+            self.logger.warning("DeepSeek API调用失败，回退到知识库")
             # API调用失败，回退到知识库
             if knowledge_base_results:
                 best_result = max(knowledge_base_results, key=lambda x: x.get('relevance', 0))
@@ -205,11 +181,8 @@ class DeepSeekClient:
             questions = [q.strip() for q in response.split('\n') if q.strip()]
             return questions[:3]
         
-        return [
-            "学校有哪些热门专业？",
-            "如何报考这所学校？", 
-            "学校的录取分数线如何？"
-        ]
+        # 调用失败返回空列表，由路由计入熔断统计，调用方使用默认推荐问题
+        return []
 
 # 测试函数
 def test_deepseek_client():
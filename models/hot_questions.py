@@ -0,0 +1,145 @@
+import time
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.text import question_fingerprint
+
+
+class SpaceSaving:
+    """Space-Saving算法：固定容量内近似统计高频项，计数误差不超过被替换项的计数"""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.counts: Dict[str, int] = {}
+        self.errors: Dict[str, int] = {}
+
+    def add(self, key: str, count: int = 1):
+        if key in self.counts:
+            self.counts[key] += count
+        elif len(self.counts) < self.capacity:
+            self.counts[key] = count
+            self.errors[key] = 0
+        else:
+            # 替换当前计数最小的项，新项继承其计数作为误差上界
+            victim = min(self.counts, key=self.counts.get)
+            floor = self.counts.pop(victim)
+            self.errors.pop(victim, None)
+            self.counts[key] = floor + count
+            self.errors[key] = floor
+
+
+class HotQuestionTracker:
+    """按小时分桶的热门问题统计，窗口外的桶自动丢弃，读取时返回缓存结果"""
+
+    def __init__(self, db, window_hours: int = 7 * 24, capacity: int = 200,
+                 refresh_seconds: int = 5, resync_seconds: int = 300):
+        self.db = db
+        self.window_hours = window_hours
+        self.capacity = capacity
+        self.refresh_seconds = refresh_seconds
+        self.resync_seconds = resync_seconds
+        self.logger = logging.getLogger(__name__)
+
+        self._lock = threading.Lock()
+        self.buckets: Dict[datetime, SpaceSaving] = {}
+        # 指纹 -> 最近一次出现的原始问法，用于展示
+        self.labels: OrderedDict = OrderedDict()
+        self.max_labels = capacity * 20
+        self._cached: List[Dict] = []
+        self._cached_at = 0.0
+        self._synced_at = 0.0
+
+    @staticmethod
+    def current_hour() -> datetime:
+        return datetime.now().replace(minute=0, second=0, microsecond=0)
+
+    def record(self, question: str, fingerprint: str = None):
+        """记录一次提问"""
+        fingerprint = fingerprint or question_fingerprint(question)
+        with self._lock:
+            hour = self.current_hour()
+            bucket = self.buckets.get(hour)
+            if bucket is None:
+                bucket = self.buckets[hour] = SpaceSaving(self.capacity)
+            bucket.add(fingerprint)
+            self._remember_label(fingerprint, question)
+
+    def _remember_label(self, fingerprint: str, question: str):
+        self.labels[fingerprint] = question
+        self.labels.move_to_end(fingerprint)
+        while len(self.labels) > self.max_labels:
+            self.labels.popitem(last=False)
+
+    def sync_from_db(self):
+        """从数据库重建窗口内各小时桶，用于启动预热以及合并其他进程的写入"""
+        since = self.current_hour() - timedelta(hours=self.window_hours)
+        query = """
+            SELECT question_fp,
+                   DATE_FORMAT(create_time, '%%Y-%%m-%%d %%H:00:00') AS hour_start,
+                   COUNT(*) AS count, MAX(user_question) AS question
+            FROM qa_history
+            WHERE create_time >= %s AND question_fp IS NOT NULL
+            GROUP BY question_fp, hour_start
+        """
+        rows = self.db.execute_query(query, (since,))
+        buckets: Dict[datetime, SpaceSaving] = {}
+        for row in rows:
+            hour = datetime.strptime(row['hour_start'], '%Y-%m-%d %H:%M:%S')
+            bucket = buckets.get(hour)
+            if bucket is None:
+                bucket = buckets[hour] = SpaceSaving(self.capacity)
+            bucket.add(row['question_fp'], int(row['count']))
+
+        with self._lock:
+            self.buckets = buckets
+            for row in rows:
+                if row['question_fp'] not in self.labels:
+                    self._remember_label(row['question_fp'], row['question'])
+            self._cached_at = 0.0
+        self._synced_at = time.time()
+        self.logger.info(f"Hot question tracker synced with {len(rows)} hourly groups")
+
+    def top(self, limit: int = 10) -> List[Dict]:
+        """返回热门问题，结果缓存refresh_seconds秒"""
+        now = time.time()
+        if now - self._synced_at >= self.resync_seconds:
+            self._synced_at = now
+            try:
+                self.sync_from_db()
+            except Exception as e:
+                self.logger.error(f"Hot question sync failed: {str(e)}")
+
+        if now - self._cached_at >= self.refresh_seconds:
+            with self._lock:
+                self._cached = self._merge(limit=max(limit, 50))
+                self._cached_at = now
+        return self._cached[:limit]
+
+    def _merge(self, limit: int) -> List[Dict]:
+        window_start = self.current_hour() - timedelta(hours=self.window_hours)
+        for hour in [h for h in self.buckets if h < window_start]:
+            del self.buckets[hour]
+
+        totals: Dict[str, int] = {}
+        for bucket in self.buckets.values():
+            for fingerprint, count in bucket.counts.items():
+                totals[fingerprint] = totals.get(fingerprint, 0) + count
+
+        ranked = sorted(totals.items(), key=lambda x: x[1], reverse=True)
+        result = []
+        for fingerprint, count in ranked:
+            question = self.labels.get(fingerprint)
+            if question:
+                result.append({'question': question, 'count': count})
+            if len(result) >= limit:
+                break
+        return result
+
+    def get_label(self, fingerprint: str) -> Optional[str]:
+        return self.labels.get(fingerprint)
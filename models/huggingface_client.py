@@ -8,6 +8,7 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from config.config import Config
+from utils.tracing import traced
 
 class HuggingFaceClient:
     def __init__(self):
@@ -83,6 +84,7 @@ class HuggingFaceClient:
         
         return "\n".join(prompt_parts)
     
+    @traced('llm_huggingface')
     def call_api(self, prompt: str, max_retries: int = 3) -> Optional[str]:
         """调用Hugging Face API"""
         headers = {}
@@ -99,7 +101,8 @@ class HuggingFaceClient:
                 "return_full_text": False
             },
             "options": {
-                "wait_for_model": True  # 等待模型加载
+                # 模型未加载时立即返回503，不占用请求线程等待
+                "wait_for_model": False
             }
         }
         
@@ -111,7 +114,7 @@ class HuggingFaceClient:
                     self.api_url,
                     headers=headers,
                     json=payload,
-                    timeout=60  # 增加超时时间
+                    timeout=Config.LLM_REQUEST_TIMEOUT
                 )
                 
                 response_time = int((time.time() - start_time) * 1000)
@@ -133,33 +136,23 @@ class HuggingFaceClient:
                     self.logger.info(f"HuggingFace API call successful. Response time: {response_time}ms")
                     return text
                     
-                elif response.status_code == 503:
-                    # 模型正在加载，等待后重试
-                    wait_time = 20 * (attempt + 1)
-                    self.logger.warning(f"Model is loading, waiting {wait_time}s...")
-                    time.sleep(wait_time)
-                    continue
+                elif response.status_code in (503, 429):
+                    # 模型加载中或被限速：不在请求线程中休眠重试，直接失败，由服务路由切换到其他服务
+                    self.logger.warning(f"HuggingFace API unavailable: {response.status_code}")
+                    return None
                     
                 else:
                     self.logger.error(f"HuggingFace API error: {response.status_code} - {response.text}")
-                    
-                    # 如果是速率限制，等待后重试
-                    if response.status_code == 429:
-                        time.sleep(30)
-                        continue
-                    
                     return None
                     
             except requests.exceptions.Timeout:
+                # 超时已占用完整的等待时间，不再重试
                 self.logger.error("HuggingFace API timeout")
-                if attempt < max_retries - 1:
-                    time.sleep(10)
-                    continue
+                return None
                     
             except Exception as e:
                 self.logger.error(f"HuggingFace API exception: {str(e)}")
                 if attempt < max_retries - 1:
-                    time.sleep(5)
                     continue
         
         return None
@@ -253,6 +246,15 @@ class HuggingFaceClient:
                     'confidence': 0.3
                 }
     
+    def generate_answer(self, question: str, knowledge_base_results: List[Dict],
+                        history: List[Dict] = None, page_content: str = None) -> Optional[str]:
+        """生成回答，失败返回None（不做知识库回退，供服务路由使用）"""
+        context = self.build_context(knowledge_base_results)
+        if page_content:
+            context = f"{context}\n{page_content[:1000]}" if context else page_content[:1000]
+        prompt = self.create_prompt(question, context, history)
+        return self.call_api(prompt, max_retries=1)
+    
     def build_context(self, knowledge_base_results: List[Dict]) -> str:
         """构建上下文信息"""
         if not knowledge_base_results:
@@ -0,0 +1,328 @@
+import json
+import mmap
+import time
+import zlib
+import struct
+import bisect
+import logging
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+import numpy as np
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+try:
+    import fcntl
+except ImportError:  # Windows开发环境不加文件锁
+    fcntl = None
+
+from config.config import Config
+from models.corpus_stats import CorpusStatistics
+from models.vector_index import HashedNgramEncoder, VectorIndex, encode_entries, knowledge_entry_text
+
+# 文件布局：定长前缀（魔数、格式版本、头部长度、头部CRC） + JSON头部 + 按64字节对齐的数组段
+MAGIC = b'HLGIDX\x00\x00'
+FORMAT_VERSION = 1
+_PREFIX = struct.Struct('<8sIII')
+ALIGN = 64
+
+# 与快照内容对应的数据库表，行数、最大ID、最后更新时间任一变化即视为过期
+SIGNATURE_TABLES = ('crawled_pages', 'knowledge_base')
+
+
+def _align(offset: int) -> int:
+    return (offset + ALIGN - 1) // ALIGN * ALIGN
+
+
+def _string_table(values: List[str]):
+    """字符串列表编码为 (UTF-8拼接字节, 偏移数组)，第i项为 blob[offsets[i]:offsets[i+1]]"""
+    encoded = [value.encode('utf-8') for value in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    if encoded:
+        offsets[1:] = np.cumsum([len(item) for item in encoded])
+    return np.frombuffer(b''.join(encoded), dtype=np.uint8), offsets
+
+
+def _bytes(array: np.ndarray) -> np.ndarray:
+    """数组的字节视图（不复制），空数组也可用"""
+    return array.reshape(-1).view(np.uint8)
+
+
+class _StringColumn:
+    """只读字符串序列视图，按下标解码，不整体载入内存"""
+
+    def __init__(self, blob: np.ndarray, offsets: np.ndarray):
+        self.blob = blob
+        self.offsets = offsets
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def raw(self, i: int) -> bytes:
+        return self.blob[self.offsets[i]:self.offsets[i + 1]].tobytes()
+
+    def __getitem__(self, i: int) -> str:
+        return self.raw(i).decode('utf-8')
+
+
+class _RawColumn(_StringColumn):
+    # 供bisect按字节序二分查找
+    __getitem__ = _StringColumn.raw
+
+
+def db_signature(db) -> Dict:
+    """快照对应的数据库状态"""
+    signature = {}
+    for table in SIGNATURE_TABLES:
+        rows = db.execute_query(
+            f"SELECT COUNT(*) AS total, MAX(id) AS max_id, MAX(update_time) AS updated FROM {table}")
+        row = rows[0] if rows else {}
+        signature[table] = {
+            'count': int(row.get('total') or 0),
+            'max_id': int(row.get('max_id') or 0),
+            'updated': str(row['updated']) if row.get('updated') is not None else None
+        }
+    return signature
+
+
+def write_snapshot(path: str, stats: CorpusStatistics, kb_index: VectorIndex, signature: Dict) -> Dict:
+    """写入快照：先写临时文件再原子替换，读取方要么看到旧文件要么看到完整的新文件"""
+    terms = sorted(stats.idf, key=lambda term: term.encode('utf-8'))
+    term_blob, term_offsets = _string_table(terms)
+    postings_offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+    if terms:
+        postings_offsets[1:] = np.cumsum([len(stats.postings.get(term, ())) for term in terms])
+    postings = np.zeros(int(postings_offsets[-1]), dtype=np.int32)
+    for i, term in enumerate(terms):
+        postings[postings_offsets[i]:postings_offsets[i + 1]] = stats.postings.get(term, ())
+
+    doc_ids = sorted(stats.page_titles)
+    title_blob, title_offsets = _string_table([stats.page_titles[page_id] for page_id in doc_ids])
+
+    sections = {
+        'term_blob': term_blob,
+        'term_offsets': term_offsets,
+        'idf': np.array([stats.idf[term] for term in terms], dtype=np.float32),
+        'doc_freq': np.array([stats.doc_freq[term] for term in terms], dtype=np.int32),
+        'postings_offsets': postings_offsets,
+        'postings': postings,
+        'doc_ids': np.array(doc_ids, dtype=np.int64),
+        'doc_lengths': np.array([stats.doc_lengths.get(page_id, 0) for page_id in doc_ids], dtype=np.int32),
+        'title_blob': title_blob,
+        'title_offsets': title_offsets,
+        'kb_ids': np.ascontiguousarray(kb_index.ids, dtype=np.int64),
+        'kb_vectors': np.ascontiguousarray(kb_index.vectors, dtype=np.float32),
+        'kb_idf': np.ascontiguousarray(kb_index.idf, dtype=np.float32),
+        'kb_projection': np.ascontiguousarray(kb_index.encoder.projection, dtype=np.float32),
+    }
+
+    layout = {}
+    offset = 0
+    for name, array in sections.items():
+        layout[name] = {
+            'offset': offset,
+            'dtype': array.dtype.str,
+            'shape': list(array.shape),
+            'crc32': zlib.crc32(_bytes(array))
+        }
+        offset = _align(offset + array.nbytes)
+
+    header = {
+        'version': FORMAT_VERSION,
+        'created': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'signature': signature,
+        'encoder': kb_index.encoder.config(),
+        'total_docs': stats.total_docs,
+        'max_idf': max(stats.idf.values()) if stats.idf else None,
+        'sections': layout,
+    }
+    header_bytes = json.dumps(header, ensure_ascii=False, sort_keys=True).encode('utf-8')
+    data_start = _align(_PREFIX.size + len(header_bytes))
+    header['file_size'] = data_start + offset
+    # file_size写入后头部变长，重新计算起始位置直到稳定
+    while True:
+        header_bytes = json.dumps(header, ensure_ascii=False, sort_keys=True).encode('utf-8')
+        start = _align(_PREFIX.size + len(header_bytes))
+        if start == data_start:
+            break
+        data_start = start
+        header['file_size'] = data_start + offset
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(_PREFIX.pack(MAGIC, FORMAT_VERSION, len(header_bytes), zlib.crc32(header_bytes)))
+        f.write(header_bytes)
+        for name, array in sections.items():
+            f.seek(data_start + layout[name]['offset'])
+            f.write(_bytes(array))
+        f.truncate(header['file_size'])
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    return header
+
+
+class IndexSnapshot:
+    """内存映射的检索索引快照：词典、倒排表、页面元数据和知识库向量
+
+    打开时只解析头部并建立数组视图，耗时与语料规模无关；数据页由操作系统按需载入，
+    gunicorn主进程映射后fork出的worker共享同一份物理页。
+    """
+
+    def __init__(self, path: str, buffer: mmap.mmap, header: Dict, arrays: Dict[str, np.ndarray]):
+        self.path = path
+        self.header = header
+        self.signature = header['signature']
+        self.total_docs = header['total_docs']
+        self.max_idf = header['max_idf']
+        self.stat = os.stat(path)
+        self._buffer = buffer
+        self._arrays = arrays
+        self.terms = _StringColumn(arrays['term_blob'], arrays['term_offsets'])
+        self._raw_terms = _RawColumn(arrays['term_blob'], arrays['term_offsets'])
+        self.titles = _StringColumn(arrays['title_blob'], arrays['title_offsets'])
+        self.doc_ids = arrays['doc_ids']
+        self.doc_lengths = arrays['doc_lengths']
+        self.vector_index = VectorIndex(arrays['kb_ids'], arrays['kb_vectors'], arrays['kb_idf'],
+                                        HashedNgramEncoder(**header['encoder'], projection=arrays['kb_projection']))
+
+    @classmethod
+    def open(cls, path: str = None) -> Optional['IndexSnapshot']:
+        """映射快照文件，文件不存在、损坏或格式版本不符时返回None"""
+        path = path or Config.INDEX_SNAPSHOT_FILE
+        logger = logging.getLogger(__name__)
+        if not os.path.isfile(path):
+            return None
+        try:
+            with open(path, 'rb') as f:
+                buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, version, header_len, header_crc = _PREFIX.unpack_from(buffer, 0)
+            if magic != MAGIC or version != FORMAT_VERSION:
+                logger.warning(f"Index snapshot format mismatch: {path} (version {version})")
+                return None
+            header_bytes = buffer[_PREFIX.size:_PREFIX.size + header_len]
+            if zlib.crc32(header_bytes) != header_crc:
+                raise ValueError('header checksum mismatch')
+            header = json.loads(header_bytes.decode('utf-8'))
+            if header.get('file_size') != len(buffer):
+                raise ValueError(f"truncated file ({len(buffer)} of {header.get('file_size')} bytes)")
+            data_start = _align(_PREFIX.size + header_len)
+            arrays = {}
+            for name, section in header['sections'].items():
+                shape = tuple(section['shape'])
+                arrays[name] = np.frombuffer(buffer, dtype=np.dtype(section['dtype']),
+                                             count=int(np.prod(shape)),
+                                             offset=data_start + section['offset']).reshape(shape)
+            return cls(path, buffer, header, arrays)
+        except Exception as e:
+            logger.error(f"Failed to open index snapshot {path}: {str(e)}")
+            return None
+
+    def refresh(self) -> 'IndexSnapshot':
+        """快照文件被替换后返回新映射，旧映射在不再被引用后释放"""
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return self
+        if (stat.st_ino, stat.st_mtime_ns) == (self.stat.st_ino, self.stat.st_mtime_ns):
+            return self
+        return IndexSnapshot.open(self.path) or self
+
+    def verify(self) -> bool:
+        """校验全部数组段的CRC32（需读取整个文件，启动时只校验头部）"""
+        for name, section in self.header['sections'].items():
+            if zlib.crc32(_bytes(self._arrays[name])) != section['crc32']:
+                logging.getLogger(__name__).error(f"Index snapshot section corrupted: {name}")
+                return False
+        return True
+
+    def matches(self, signature: Dict) -> bool:
+        return self.signature == signature
+
+    def term_index(self, term: str) -> int:
+        """词项在词典中的下标，不存在时返回-1"""
+        key = term.encode('utf-8')
+        i = bisect.bisect_left(self._raw_terms, key)
+        if i < len(self._raw_terms) and self._raw_terms[i] == key:
+            return i
+        return -1
+
+    def get_idf(self, term: str) -> Optional[float]:
+        i = self.term_index(term)
+        return float(self._arrays['idf'][i]) if i >= 0 else None
+
+    def idf_of(self, terms: List[str]) -> np.ndarray:
+        """一组词项的IDF，语料中没有的词按最稀有处理"""
+        default = self.max_idf if self.max_idf is not None else 1.0
+        values = [self.get_idf(term) for term in terms]
+        return np.array([default if value is None else value for value in values], dtype=np.float32)
+
+    def pages_containing(self, term: str, limit: int = None) -> List[int]:
+        i = self.term_index(term)
+        if i < 0:
+            return []
+        offsets = self._arrays['postings_offsets']
+        ids = self._arrays['postings'][offsets[i]:offsets[i + 1]]
+        return ids[:limit].tolist() if limit else ids.tolist()
+
+    def page_title(self, page_id: int) -> Optional[str]:
+        i = int(np.searchsorted(self.doc_ids, page_id))
+        if i < len(self.doc_ids) and self.doc_ids[i] == page_id:
+            return self.titles[i]
+        return None
+
+
+def build_snapshot(db, path: str = None, stats: CorpusStatistics = None) -> Dict:
+    """从数据库构建快照；stats为空时重新扫描语料"""
+    path = path or Config.INDEX_SNAPSHOT_FILE
+    signature = db_signature(db)
+    stats = stats or CorpusStatistics(db).build()
+    rows = db.execute_query("SELECT id, question, keywords FROM knowledge_base ORDER BY id")
+    kb_index = encode_entries([(row['id'], knowledge_entry_text(row)) for row in rows])
+    header = write_snapshot(path, stats, kb_index, signature)
+    logging.getLogger(__name__).info(
+        f"Index snapshot written to {path}: {stats.total_docs} pages, {len(stats.idf)} terms, "
+        f"{len(kb_index.ids)} knowledge vectors, {header['file_size']} bytes")
+    return header
+
+
+@contextmanager
+def _build_lock(path: str):
+    """多个进程同时发现快照失效时只由一个进程重建"""
+    if fcntl is None:
+        yield
+        return
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path + '.lock', 'w') as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def load_snapshot(db, path: str = None, rebuild_stale: bool = None) -> Optional[IndexSnapshot]:
+    """启动时加载快照并与数据库核对
+
+    文件缺失、损坏或格式不符时重建；与数据库不一致时默认继续使用旧快照（重建需全量分词，
+    耗时随语料增长），INDEX_SNAPSHOT_REBUILD_STALE开启时重建。
+    """
+    path = path or Config.INDEX_SNAPSHOT_FILE
+    rebuild_stale = Config.INDEX_SNAPSHOT_REBUILD_STALE if rebuild_stale is None else rebuild_stale
+    logger = logging.getLogger(__name__)
+    snapshot = IndexSnapshot.open(path)
+    signature = db_signature(db)
+    if snapshot is not None and (snapshot.matches(signature) or not rebuild_stale):
+        if not snapshot.matches(signature):
+            logger.warning(f"Index snapshot is stale (built {snapshot.header['created']}), rebuild the knowledge base")
+        return snapshot
+    with _build_lock(path):
+        # 等锁期间其他进程可能已完成重建
+        snapshot = IndexSnapshot.open(path)
+        if snapshot is not None and snapshot.matches(db_signature(db)):
+            return snapshot
+        logger.info(f"Rebuilding index snapshot: {path}")
+        build_snapshot(db, path)
+    return IndexSnapshot.open(path)
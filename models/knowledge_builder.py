@@ -6,16 +6,20 @@ warnings.filterwarnings("ignore", message="pkg_resources is deprecated")
 import jieba
 jieba.setLogLevel(logging.WARNING)  # 设置jieba日志级别
 import jieba.analyse
-from collections import defaultdict
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from config.config import Config
 from database.db_manager import DatabaseManager
+from models.corpus_stats import CorpusStatistics
+from models.passages import split_passages
+from models.qa_extractor import extract_qa_pairs
+from models.index_snapshot import build_snapshot
 
 class KnowledgeBuilder:
-    def __init__(self):
-        self.db = DatabaseManager()
+    def __init__(self, db: DatabaseManager = None):
+        self.db = db or DatabaseManager()
         self.logger = logging.getLogger(__name__)
         
         # 问答模板
@@ -51,12 +55,29 @@ class KnowledgeBuilder:
             'topK': 5,  # 提取前5个关键词
             'withWeight': False
         }
+        
+        # 语料统计（构建知识库时生成）
+        self.corpus_stats = None
+        self.keyword_extractor = None
+        self.load_domain_idf()
+    
+    def load_domain_idf(self, idf_file: str = None):
+        """加载语料IDF表，关键词提取优先使用领域IDF"""
+        idf_file = idf_file or Config.IDF_FILE
+        if os.path.isfile(idf_file):
+            try:
+                self.keyword_extractor = jieba.analyse.TFIDF(idf_file)
+                self.logger.info(f"Loaded domain IDF from {idf_file}")
+            except Exception as e:
+                self.logger.warning(f"Failed to load domain IDF: {str(e)}")
+                self.keyword_extractor = None
     
     def extract_keywords(self, text: str) -> List[str]:
         """提取文本关键词"""
         try:
-            # 使用TF-IDF提取关键词
-            keywords = jieba.analyse.extract_tags(
+            # 使用TF-IDF提取关键词（有领域IDF时使用领域IDF）
+            extractor = self.keyword_extractor or jieba.analyse.default_tfidf
+            keywords = extractor.extract_tags(
                 text, 
                 topK=self.keyword_config['topK'],
                 withWeight=self.keyword_config['withWeight']
@@ -69,45 +90,7 @@ class KnowledgeBuilder:
     
     def extract_qa_from_content(self, content: str, url: str = None) -> List[Tuple[str, str]]:
         """从页面内容中提取问答对"""
-        qa_pairs = []
-        
-        # 1. 查找FAQ类型的内容
-        faq_patterns = [
-            r'问[:：]\s*(.+?)\s*答[:：]\s*(.+?)(?=问[:：]|\Z)',
-            r'Q[:：]\s*(.+?)\s*A[:：]\s*(.+?)(?=Q[:：]|\Z)',
-            r'【问】(.+?)【答】(.+?)(?=【问】|\Z)'
-        ]
-        
-        for pattern in faq_patterns:
-            matches = re.findall(pattern, content, re.DOTALL)
-            for q, a in matches:
-                q = q.strip()[:200]  # 限制问题长度
-                a = a.strip()[:500]  # 限制答案长度
-                if len(q) > 5 and len(a) > 5:
-                    qa_pairs.append((q, a))
-        
-        # 2. 从标题和内容提取
-        title_pattern = r'([^。！？\n]{5,30}[？?])'
-        potential_questions = re.findall(title_pattern, content)
-        
-        for question in potential_questions:
-            # 查找问题后面的内容作为答案
-            idx = content.find(question)
-            if idx != -1:
-                answer_start = idx + len(question)
-                answer_end = answer_start + 300  # 最多取300个字符
-                answer = content[answer_start:answer_end]
-                
-                # 清理答案
-                answer = re.sub(r'\s+', ' ', answer).strip()
-                if len(answer) > 20:
-                    # 截断到句号
-                    sentences = re.split(r'[。！？]', answer)
-                    if sentences:
-                        answer = sentences[0] + '。'
-                        qa_pairs.append((question, answer))
-        
-        return qa_pairs
+        return extract_qa_pairs(content)
     
     def generate_qa_from_pages(self, page_type: str = None, limit: int = 100):
         """从爬取的页面生成问答知识库"""
@@ -148,20 +131,22 @@ class KnowledgeBuilder:
     
     def build_structured_knowledge(self):
         """构建结构化知识"""
-        # 统计页面分类
+        # 统计页面分类（标题在Python中去重合并，SQL不依赖GROUP_CONCAT的方言差异）
         query = """
-            SELECT page_type, category, COUNT(*) as count,
-                   GROUP_CONCAT(DISTINCT title SEPARATOR '|||') as titles
+            SELECT page_type, category, title, COUNT(*) as count
             FROM crawled_pages
-            GROUP BY page_type, category
+            GROUP BY page_type, category, title
         """
-        stats = self.db.execute_query(query)
+        groups = {}
+        for row in self.db.execute_query(query):
+            group = groups.setdefault((row['page_type'], row['category']), {'count': 0, 'titles': []})
+            group['count'] += row['count']
+            if row['title']:
+                group['titles'].append(row['title'])
         
-        for stat in stats:
-            page_type = stat['page_type']
-            category = stat['category']
-            count = stat['count']
-            titles = stat['titles'].split('|||') if stat['titles'] else []
+        for (page_type, category), group in groups.items():
+            count = group['count']
+            titles = group['titles']
             
             # 生成分类相关的问答
             if page_type == 'academic':
@@ -188,48 +173,54 @@ class KnowledgeBuilder:
                     confidence=0.7
                 )
     
+    def build_corpus_statistics(self) -> CorpusStatistics:
+        """流式统计语料文档频率，持久化领域IDF表"""
+        self.corpus_stats = CorpusStatistics(self.db).build()
+        saved = self.corpus_stats.save()
+        self.logger.info(f"Saved {saved} IDF terms")
+        self.load_domain_idf()
+        return self.corpus_stats
+    
+    def build_passages(self) -> int:
+        """重新切分所有页面的段落（爬取时已逐页生成，这里覆盖历史数据）"""
+        total = 0
+        for page in self.db.iter_crawled_pages(columns='id, url, content'):
+            total += self.db.save_page_passages(page['url'], split_passages(page['content']))
+        self.logger.info(f"Built {total} page passages")
+        return total
+    
     def analyze_content_topics(self):
         """分析内容主题"""
-        query = "SELECT content FROM crawled_pages WHERE content IS NOT NULL AND content != ''"
-        pages = self.db.execute_query(query)
-        
-        # 统计词频
-        word_freq = defaultdict(int)
-        
-        for page in pages:
-            keywords = self.extract_keywords(page['content'])
-            for keyword in keywords:
-                word_freq[keyword] += 1
-        
-        # 获取高频词
-        top_words = sorted(word_freq.items(), key=lambda x: x[1], reverse=True)[:50]
+        if self.corpus_stats is None:
+            self.build_corpus_statistics()
+        stats = self.corpus_stats
         
-        # 基于高频词生成问答
-        for word, freq in top_words[:20]:
-            if len(word) >= 2:  # 过滤掉单字
-                question = f"关于{word}的信息有哪些？"
-                
-                # 搜索包含该词的内容
-                search_query = """
-                    SELECT title, SUBSTRING(content, 1, 200) as snippet
-                    FROM crawled_pages
-                    WHERE content LIKE %s
-                    LIMIT 3
-                """
-                results = self.db.execute_query(search_query, (f'%{word}%',))
+        # 基于语料级TF-IDF的高频主题词生成问答
+        for word, score in stats.top_terms(20):
+            question = f"关于{word}的信息有哪些？"
+            
+            # 通过倒排表查找包含该词的页面
+            page_ids = stats.pages_containing(word, limit=3)
+            titles = [stats.page_titles.get(page_id) for page_id in page_ids]
+            titles = [t for t in titles if t]
+            
+            if page_ids:
+                answer = f"关于{word}的相关信息包括："
+                for title in titles:
+                    answer += f"\n- {title}"
                 
-                if results:
-                    answer = f"关于{word}的相关信息包括："
-                    for r in results:
-                        if r['title']:
-                            answer += f"\n- {r['title']}"
-                    
-                    self.db.save_knowledge(
-                        question=question,
-                        answer=answer,
-                        keywords=word,
-                        confidence=0.6
-                    )
+                self.db.save_knowledge(
+                    question=question,
+                    answer=answer,
+                    keywords=word,
+                    confidence=0.6
+                )
+    
+    def build_index_snapshot(self) -> Dict:
+        """写入检索索引快照：语料词典、倒排表、页面元数据和知识库向量（一个标准问法即可覆盖多种说法）"""
+        if self.corpus_stats is None:
+            self.build_corpus_statistics()
+        return build_snapshot(self.db, stats=self.corpus_stats)
     
     def create_default_qa(self):
         """创建默认的问答对"""
@@ -257,21 +248,32 @@ class KnowledgeBuilder:
         
         self.logger.info(f"Created {len(default_qas)} default QA pairs")
     
-    def build_all(self):
-        """构建完整的知识库"""
+    def build_all(self, progress=None):
+        """构建完整的知识库
+
+        progress(已完成步骤, 总步骤, 步骤名) 每步开始时回调，供后台任务上报进度
+        """
         self.logger.info("Starting knowledge base building...")
-        
-        # 1. 创建默认问答
-        self.create_default_qa()
-        
-        # 2. 从页面内容生成问答
-        self.generate_qa_from_pages()
-        
-        # 3. 构建结构化知识
-        self.build_structured_knowledge()
-        
-        # 4. 分析内容主题
-        self.analyze_content_topics()
+        steps = [
+            # 0. 统计语料，生成领域IDF；页面切分为检索段落
+            ('corpus_statistics', lambda: (self.build_corpus_statistics(), self.build_passages())),
+            # 1. 创建默认问答
+            ('default_qa', self.create_default_qa),
+            # 2. 从页面内容生成问答
+            ('page_qa', self.generate_qa_from_pages),
+            # 3. 构建结构化知识
+            ('structured_knowledge', self.build_structured_knowledge),
+            # 4. 分析内容主题
+            ('content_topics', self.analyze_content_topics),
+            # 5. 写入检索索引快照（含语义检索向量）
+            ('index_snapshot', self.build_index_snapshot),
+        ]
+        for done, (name, step) in enumerate(steps):
+            if progress:
+                progress(done, len(steps), name)
+            step()
+        if progress:
+            progress(len(steps), len(steps), 'done')
         
         # 获取统计信息
         stats = self.db.get_statistics()
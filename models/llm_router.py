@@ -0,0 +1,262 @@
+import time
+import logging
+import threading
+import contextvars
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Dict, List, Optional
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.config import Config
+
+
+class CircuitBreaker:
+    """按最近N次调用的失败率（含慢调用）熔断，冷却后放行一次试探调用"""
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, window: int = None, error_rate: float = None, slow_ms: int = None,
+                 cooldown: int = None, min_calls: int = 5):
+        self.error_rate = error_rate or Config.LLM_BREAKER_ERROR_RATE
+        self.slow_ms = slow_ms or Config.LLM_BREAKER_SLOW_MS
+        self.cooldown = cooldown or Config.LLM_BREAKER_COOLDOWN
+        self.min_calls = min_calls
+        self.outcomes = deque(maxlen=window or Config.LLM_BREAKER_WINDOW)  # True表示失败
+        self.state = self.CLOSED
+        self.opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """是否允许发起调用；半开状态下同一时间只放行一个试探调用"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.cooldown:
+                self.state = self.HALF_OPEN
+                self._probing = False
+            if self.state == self.HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def record(self, success: bool, latency_ms: float):
+        failed = not success or latency_ms >= self.slow_ms
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self._probing = False
+                if failed:
+                    self._open()
+                else:
+                    self.state = self.CLOSED
+                    self.outcomes.clear()
+                return
+            if self.state == self.OPEN:
+                return
+            self.outcomes.append(failed)
+            if len(self.outcomes) >= self.min_calls and sum(self.outcomes) / len(self.outcomes) >= self.error_rate:
+                self._open()
+
+    def _open(self):
+        self.state = self.OPEN
+        self.opened_at = time.monotonic()
+        self.outcomes.clear()
+
+    def failure_rate(self) -> float:
+        with self._lock:
+            return round(sum(self.outcomes) / len(self.outcomes), 4) if self.outcomes else 0.0
+
+
+class LLMProvider:
+    """路由中的一个大模型服务：客户端、熔断器及延迟统计"""
+
+    def __init__(self, name: str, client, source: str, confidence: float):
+        self.name = name
+        self.client = client
+        self.source = source
+        self.confidence = confidence
+        self.breaker = CircuitBreaker()
+        self.latencies = deque(maxlen=100)  # 最近成功调用的耗时（毫秒）
+        self.stats = {'calls': 0, 'failures': 0, 'wins': 0}
+        self._lock = threading.Lock()
+
+    def record(self, success: bool, latency_ms: float):
+        self.breaker.record(success, latency_ms)
+        with self._lock:
+            self.stats['calls'] += 1
+            if success:
+                self.latencies.append(latency_ms)
+            else:
+                self.stats['failures'] += 1
+
+    def record_win(self):
+        with self._lock:
+            self.stats['wins'] += 1
+
+    def p95(self) -> Optional[float]:
+        with self._lock:
+            if len(self.latencies) < 10:
+                return None
+            ordered = sorted(self.latencies)
+        return ordered[int(len(ordered) * 0.95) - 1]
+
+    def hedge_delay(self) -> float:
+        """主服务超过该时间（秒）未返回时请求备用服务"""
+        p95 = self.p95()
+        if p95 is None:
+            return Config.LLM_HEDGE_DEFAULT_MS / 1000
+        return max(p95, Config.LLM_HEDGE_MIN_MS) / 1000
+
+    def health(self) -> Dict:
+        p95 = self.p95()
+        with self._lock:
+            stats = dict(self.stats)
+        stats.update({
+            'state': self.breaker.state,
+            'failure_rate': self.breaker.failure_rate(),
+            'p95_ms': int(p95) if p95 is not None else None,
+            'hedge_delay_ms': int(self.hedge_delay() * 1000)
+        })
+        return stats
+
+
+class ProviderRouter:
+    """按优先级调用大模型服务：熔断的服务直接跳过，主服务超过其p95仍未返回时对冲请求备用服务"""
+
+    def __init__(self, providers: List[LLMProvider], max_workers: int = 8, timeout: float = None):
+        self.providers = providers
+        self.timeout = timeout or Config.LLM_REQUEST_TIMEOUT
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='llm')
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        self.stats = {'requests': 0, 'hedged': 0, 'failover': 0, 'unavailable': 0}
+
+    def _count(self, key: str):
+        with self._lock:
+            self.stats[key] += 1
+
+    def _next_provider(self, used: List[LLMProvider], method: str = 'generate_answer') -> Optional[LLMProvider]:
+        for provider in self.providers:
+            if provider not in used and hasattr(provider.client, method) and provider.breaker.allow():
+                return provider
+        return None
+
+    def _call(self, provider: LLMProvider, args: tuple, method: str = 'generate_answer',
+              timeout: float = None):
+        """调用服务并计入熔断和延迟统计；指定timeout时超时返回的结果也计为失败"""
+        start = time.monotonic()
+        try:
+            result = getattr(provider.client, method)(*args)
+        except Exception as e:
+            self.logger.error(f"{provider.name} {method} failed: {str(e)}")
+            result = None
+        latency_ms = (time.monotonic() - start) * 1000
+        provider.record(bool(result) and (timeout is None or latency_ms <= timeout * 1000), latency_ms)
+        return result
+
+    def answer(self, question: str, knowledge_results: List[Dict], history: List[Dict] = None,
+               page_content: str = None) -> Optional[Dict]:
+        """返回第一个成功的回答，所有服务都失败或熔断时返回None"""
+        self._count('requests')
+        start = time.monotonic()
+        args = (question, knowledge_results, history, page_content)
+
+        primary = self._next_provider([])
+        if primary is None:
+            self._count('unavailable')
+            return None
+        used = [primary]
+        # 复制上下文，使调用线程中的span计入当前请求
+        futures = {self.executor.submit(contextvars.copy_context().run, self._call, primary, args): primary}
+        deadline = start + self.timeout
+        hedge_at = start + primary.hedge_delay()
+        backup_tried = False
+
+        while futures:
+            now = time.monotonic()
+            if now >= deadline:
+                break
+            wait_until = deadline if backup_tried else min(hedge_at, deadline)
+            done, _ = wait(list(futures), timeout=max(0.0, wait_until - now), return_when=FIRST_COMPLETED)
+            for future in done:
+                provider = futures.pop(future)
+                answer = future.result()
+                if answer:
+                    provider.record_win()
+                    return {
+                        'answer': answer,
+                        'source': provider.source,
+                        'provider': provider.name,
+                        'hedged': len(used) > 1,
+                        'response_time': int((time.monotonic() - start) * 1000),
+                        'confidence': provider.confidence
+                    }
+
+            # 主服务失败，或超过p95仍未返回：请求下一个可用服务（未完成的调用继续执行，结果计入熔断统计）
+            if not backup_tried and (not futures or time.monotonic() >= hedge_at):
+                backup_tried = True
+                backup = self._next_provider(used)
+                if backup is not None:
+                    self._count('hedged' if futures else 'failover')
+                    used.append(backup)
+                    futures[self.executor.submit(contextvars.copy_context().run, self._call, backup, args)] = backup
+
+        self._count('unavailable')
+        self.logger.warning(f"All LLM providers failed for question: {question[:50]}")
+        return None
+
+    def generate_similar_questions(self, question: str, timeout: float = None) -> List[str]:
+        """按优先级生成相关问题：每个服务最多等待timeout秒，失败或超时后换下一个可用服务
+
+        与回答一样经过熔断器，失败和超时计入熔断统计，半开的服务也会被试探；所有服务都失败时返回空列表。
+        """
+        timeout = timeout or Config.LLM_SIMILAR_TIMEOUT
+        used = []
+        while True:
+            provider = self._next_provider(used, 'generate_similar_questions')
+            if provider is None:
+                return []
+            used.append(provider)
+            future = self.executor.submit(contextvars.copy_context().run, self._call, provider, (question,),
+                                          'generate_similar_questions', timeout)
+            try:
+                questions = future.result(timeout=timeout)
+            except FutureTimeoutError:
+                # 超时的调用在后台继续执行，结束时计为失败
+                self.logger.warning(f"{provider.name} similar questions timed out after {timeout}s")
+                continue
+            if questions:
+                return questions
+
+    def health(self) -> Dict:
+        with self._lock:
+            stats = dict(self.stats)
+        stats['providers'] = {provider.name: provider.health() for provider in self.providers}
+        return stats
+
+
+def build_default_router(max_workers: int = 8) -> Optional[ProviderRouter]:
+    """按Config.LLM_PROVIDERS创建路由，未配置密钥的DeepSeek不参与"""
+    providers = []
+    for name in [n.strip() for n in Config.LLM_PROVIDERS.split(',') if n.strip()]:
+        try:
+            if name == 'deepseek':
+                if not Config.DEEPSEEK_API_KEY:
+                    continue
+                from models.deepseek_client import DeepSeekClient
+                providers.append(LLMProvider('deepseek', DeepSeekClient(), 'deepseek_api', 0.95))
+            elif name == 'huggingface':
+                from models.huggingface_client import HuggingFaceClient
+                providers.append(LLMProvider('huggingface', HuggingFaceClient(), 'huggingface', 0.8))
+            else:
+                logging.getLogger(__name__).warning(f"Unknown LLM provider: {name}")
+        except ImportError as e:
+            logging.getLogger(__name__).warning(f"LLM provider {name} unavailable: {str(e)}")
+    if not providers:
+        return None
+    return ProviderRouter(providers, max_workers=max_workers)
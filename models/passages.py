@@ -0,0 +1,80 @@
+import re
+from typing import Dict, List
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.config import Config
+from models.corpus_stats import tokenize
+
+# 句子以句末标点结束；页面正文由段落以空格拼接，空白也视为句子边界
+SENTENCE_PATTERN = re.compile(r'[^。！？!?；;\s]+(?:[。！？!?；;]+|(?=\s)|$)')
+
+
+def split_passages(content: str, max_chars: int = None) -> List[Dict]:
+    """按句子切分页面正文，相邻句子合并为不超过max_chars的段落
+
+    返回 [{'seq', 'start_offset', 'end_offset', 'content', 'char_count', 'token_count', 'term_count'}]，
+    偏移为段落在原正文中的字符位置（左闭右开）。超长句子按max_chars硬切。
+    """
+    max_chars = max_chars or Config.PASSAGE_MAX_CHARS
+    passages = []
+    start = end = None
+
+    def flush():
+        if start is not None:
+            passages.append(_passage(len(passages), content, start, end))
+
+    for match in SENTENCE_PATTERN.finditer(content or ''):
+        sentence_start, sentence_end = match.span()
+        # 超长句子先结束当前段落，再按长度硬切
+        while sentence_end - sentence_start > max_chars:
+            flush()
+            start, end = sentence_start, sentence_start + max_chars
+            flush()
+            start = None
+            sentence_start += max_chars
+        if start is not None and sentence_end - start > max_chars:
+            flush()
+            start = None
+        if start is None:
+            start = sentence_start
+        end = sentence_end
+    flush()
+    return passages
+
+
+def _passage(seq: int, content: str, start: int, end: int) -> Dict:
+    text = content[start:end]
+    terms = tokenize(text)
+    return {
+        'seq': seq,
+        'start_offset': start,
+        'end_offset': end,
+        'content': text,
+        'char_count': len(text),
+        'token_count': len(terms),
+        'term_count': len(set(terms))
+    }
+
+
+def passage_context(passages: List[Dict], max_chars: int = None) -> str:
+    """检索到的段落拼接为提示词参考内容，同一页面的段落按原文顺序排列"""
+    max_chars = max_chars or Config.PASSAGE_CONTEXT_CHARS
+    pages: Dict[str, List[Dict]] = {}
+    for passage in passages:
+        pages.setdefault(passage['url'], []).append(passage)
+    parts = []
+    used = 0
+    for url, items in pages.items():
+        title = items[0].get('title') or url
+        text = ' … '.join(p['content'] for p in sorted(items, key=lambda p: p['start_offset']))
+        part = f"《{title}》{text}"
+        if used + len(part) > max_chars:
+            part = part[:max_chars - used]
+        if part:
+            parts.append(part)
+            used += len(part)
+        if used >= max_chars:
+            break
+    return "\n".join(parts)
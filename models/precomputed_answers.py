@@ -0,0 +1,171 @@
+import json
+import time
+import hashlib
+import logging
+import threading
+from typing import Dict, Iterable, List, Optional, Set
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.config import Config
+from utils.text import question_fingerprint
+
+# 答案引用的数据来源：类型 -> (表, 参与摘要的列)
+SOURCE_TABLES = {
+    'knowledge': ('knowledge_base', 'question, answer'),
+    'pages': ('crawled_pages', 'title, content'),
+}
+# 每条IN查询最多的ID数
+ID_CHUNK = 500
+
+
+def _chunks(ids: List[int], size: int = ID_CHUNK) -> Iterable[List[int]]:
+    for start in range(0, len(ids), size):
+        yield ids[start:start + size]
+
+
+def source_digest(*parts) -> str:
+    return hashlib.md5('\n'.join(str(part or '') for part in parts).encode('utf-8')).hexdigest()[:16]
+
+
+def source_stamps(db, kind: str, ids: Iterable[int], with_digest: bool = True) -> Dict[int, list]:
+    """来源行的 {id: [更新时间, 内容摘要]}；with_digest=False时只查询更新时间，摘要为None"""
+    table, columns = SOURCE_TABLES[kind]
+    stamps = {}
+    ids = sorted({int(i) for i in ids})
+    for chunk in _chunks(ids):
+        placeholders = ', '.join(['%s'] * len(chunk))
+        select = f"id, update_time, {columns}" if with_digest else "id, update_time"
+        rows = db.execute_query(f"SELECT {select} FROM {table} WHERE id IN ({placeholders})", tuple(chunk))
+        for row in rows:
+            digest = None
+            if with_digest:
+                digest = source_digest(*(row[c.strip()] for c in columns.split(',')))
+            stamps[int(row['id'])] = [str(row['update_time']), digest]
+    return stamps
+
+
+def kb_version(db) -> str:
+    """知识库和页面数据的版本：各表行数、最大ID和最后更新时间的摘要"""
+    from models.index_snapshot import db_signature
+    return source_digest(json.dumps(db_signature(db), sort_keys=True))[:12]
+
+
+class PrecomputedAnswers:
+    """问答接口使用的预生成答案（按进程缓存）
+
+    每refresh_seconds秒从数据库重新加载有效答案，并核对答案引用的知识库条目和页面：
+    更新时间未变的直接保留；更新时间变化的重新计算内容摘要，内容未变（如重新爬取同一页面）
+    只更新记录的时间，内容变化或来源已删除的答案标记为stale，不再使用。
+    """
+
+    COLUMNS = """
+        id, question_fp, question, answer, answer_source, confidence, similar_questions,
+        reference_links, provenance, kb_version, update_time
+    """
+
+    def __init__(self, db, refresh_seconds: int = None):
+        self.db = db
+        self.refresh_seconds = refresh_seconds if refresh_seconds is not None else Config.PRECOMPUTE_REFRESH_SECONDS
+        self.logger = logging.getLogger(__name__)
+        self.entries: Dict[str, Dict] = {}
+        self._refresh_lock = threading.Lock()
+        self._loaded_at = 0.0
+        self.stats = {'hits': 0, 'misses': 0, 'invalidated': 0}
+
+    def lookup(self, question: str) -> Optional[Dict]:
+        """问题的预生成答案，没有或已失效时返回None"""
+        if not Config.PRECOMPUTE_ENABLED:
+            return None
+        self._maybe_refresh()
+        entry = self.entries.get(question_fingerprint(question))
+        # 计数为近似值，不加锁
+        self.stats['hits' if entry else 'misses'] += 1
+        return entry
+
+    def _maybe_refresh(self):
+        if time.time() - self._loaded_at < self.refresh_seconds:
+            return
+        # 只有一个线程执行刷新，其他线程继续使用旧数据
+        if not self._refresh_lock.acquire(blocking=False):
+            return
+        try:
+            self.refresh()
+        except Exception as e:
+            self.logger.error(f"Precomputed answers refresh failed: {str(e)}")
+        finally:
+            self._loaded_at = time.time()
+            self._refresh_lock.release()
+
+    def refresh(self) -> int:
+        rows = self.db.execute_query(
+            f"SELECT {self.COLUMNS} FROM precomputed_answers WHERE status = 'active' AND expire_time > NOW()")
+        stale = self.validate(rows)
+        if stale:
+            ids = sorted(stale)
+            for chunk in _chunks(ids):
+                placeholders = ', '.join(['%s'] * len(chunk))
+                self.db.execute_update(
+                    f"UPDATE precomputed_answers SET status = 'stale' WHERE id IN ({placeholders})", tuple(chunk))
+            self.stats['invalidated'] += len(ids)
+            self.logger.info(f"Invalidated {len(ids)} precomputed answers whose sources changed")
+        self.entries = {row['question_fp']: self._entry(row) for row in rows if row['id'] not in stale}
+        return len(self.entries)
+
+    def validate(self, rows: List[Dict]) -> Set[int]:
+        """返回来源已变化的答案ID；来源只是更新时间变化的，更新记录的时间"""
+        for row in rows:
+            try:
+                row['provenance'] = json.loads(row['provenance'] or '{}')
+            except ValueError:
+                row['provenance'] = {}
+        stale = set()
+        touched = {}
+        for kind in SOURCE_TABLES:
+            ids = {int(i) for row in rows for i in row['provenance'].get(kind, {})}
+            if not ids:
+                continue
+            current = source_stamps(self.db, kind, ids, with_digest=False)
+            changed = {int(key) for row in rows for key, (stamp_time, _) in row['provenance'].get(kind, {}).items()
+                       if int(key) in current and current[int(key)][0] != stamp_time}
+            digests = source_stamps(self.db, kind, changed) if changed else {}
+            for row in rows:
+                for key, (stamp_time, digest) in row['provenance'].get(kind, {}).items():
+                    source_id = int(key)
+                    if source_id not in current:
+                        stale.add(row['id'])
+                    elif current[source_id][0] == stamp_time:
+                        continue
+                    elif source_id in digests and digests[source_id][1] == digest:
+                        row['provenance'][kind][key] = digests[source_id]
+                        touched[row['id']] = row
+                    else:
+                        stale.add(row['id'])
+        for row_id, row in touched.items():
+            if row_id not in stale:
+                self.db.execute_update("UPDATE precomputed_answers SET provenance = %s WHERE id = %s",
+                                       (json.dumps(row['provenance']), row_id))
+        return stale
+
+    @staticmethod
+    def _entry(row: Dict) -> Dict:
+        def loads(value, default):
+            try:
+                return json.loads(value) if value else default
+            except ValueError:
+                return default
+
+        return {
+            'answer': row['answer'],
+            'source': 'precomputed',
+            'answer_source': row['answer_source'],
+            'confidence': row['confidence'] if row['confidence'] is not None else 0.8,
+            'similar_questions': loads(row['similar_questions'], []),
+            'references': loads(row['reference_links'], []),
+            'kb_version': row['kb_version'],
+            'generated_at': str(row['update_time']),
+        }
+
+    def get_stats(self) -> Dict:
+        return dict(self.stats, entries=len(self.entries), enabled=Config.PRECOMPUTE_ENABLED)
@@ -0,0 +1,119 @@
+import re
+from typing import List, Tuple
+
+# FAQ标记：(问题标记, 答案标记)，每种格式独立配对
+FAQ_SCHEMES = [
+    ('问[:：]', '答[:：]'),
+    ('Q[:：]', 'A[:：]'),
+    ('【问】', '【答】'),
+]
+
+# 所有FAQ标记合并为一个模式，组名为 q0/a0、q1/a1 ...
+# 前置的字符集断言让引擎快速跳过不可能是标记开头的字符
+FAQ_MARKER_PATTERN = re.compile('(?=[问答QA【])(?:' + '|'.join(
+    f'(?P<q{i}>{q})|(?P<a{i}>{a})' for i, (q, a) in enumerate(FAQ_SCHEMES)
+) + ')')
+
+# 以问号结尾的短句视为潜在问题：先定位问号，再向前回溯至多30个字符
+QUESTION_MARK_PATTERN = re.compile(r'[？?]')
+QUESTION_DELIMITERS = ('。', '！', '？', '\n')
+MIN_QUESTION_BODY = 5
+MAX_QUESTION_BODY = 30
+WHITESPACE_PATTERN = re.compile(r'\s+')
+SENTENCE_END_PATTERN = re.compile(r'[。！？]')
+
+MAX_QUESTION_LENGTH = 200
+MAX_FAQ_ANSWER_LENGTH = 500
+ANSWER_WINDOW = 300
+
+
+def extract_faq_pairs(content: str) -> List[Tuple[str, str]]:
+    """提取FAQ格式的问答对"""
+    return _scan_faq(content)[0]
+
+
+def _scan_faq(content: str) -> Tuple[List[Tuple[str, str]], List[Tuple[int, int]]]:
+    """单次扫描所有FAQ标记，按标记偏移切分问答，同时返回已覆盖的区间"""
+    pending_question = {}  # 格式 -> (问题标记起点, 问题起始偏移)
+    open_answer = {}       # 格式 -> (问题标记起点, 问题, 答案起始偏移)
+    pairs_by_scheme = [[] for _ in FAQ_SCHEMES]
+    spans = []
+
+    def close_answer(scheme: int, end: int):
+        span_start, question, answer_start = open_answer.pop(scheme)
+        if _append_faq_pair(pairs_by_scheme[scheme], question, content[answer_start:end]):
+            spans.append((span_start, end))
+
+    for match in FAQ_MARKER_PATTERN.finditer(content):
+        kind, scheme = match.lastgroup[0], int(match.lastgroup[1:])
+        if kind == 'q':
+            if scheme in open_answer:
+                close_answer(scheme, match.start())
+            # 连续出现问题标记时以最后一个为准
+            pending_question[scheme] = (match.start(), match.end())
+        elif scheme in pending_question:
+            span_start, question_start = pending_question.pop(scheme)
+            open_answer[scheme] = (span_start, content[question_start:match.start()], match.end())
+
+    for scheme in list(open_answer):
+        close_answer(scheme, len(content))
+
+    spans.sort()
+    return [pair for pairs in pairs_by_scheme for pair in pairs], spans
+
+
+def _append_faq_pair(pairs: List[Tuple[str, str]], question: str, answer: str) -> bool:
+    question = question.strip()[:MAX_QUESTION_LENGTH]
+    answer = answer.strip()[:MAX_FAQ_ANSWER_LENGTH]
+    if len(question) > 5 and len(answer) > 5:
+        pairs.append((question, answer))
+        return True
+    return False
+
+
+def extract_question_pairs(content: str, skip_spans: List[Tuple[int, int]] = None) -> List[Tuple[str, str]]:
+    """提取以问号结尾的句子，并取其后的首句作为答案
+
+    skip_spans为按起点排序的区间（如已提取的FAQ），与之重叠的问题会被跳过。
+    """
+    pairs = []
+    skip_spans = skip_spans or []
+    span_index = 0
+    last_end = 0
+    for mark in QUESTION_MARK_PATTERN.finditer(content):
+        end = mark.end()
+        body_end = mark.start()
+        # 问题主体不跨越句末标点，且不与上一个问题重叠
+        body_start = max(last_end, body_end - MAX_QUESTION_BODY)
+        window = content[body_start:body_end]
+        cut = max(window.rfind(d) for d in QUESTION_DELIMITERS)
+        if cut != -1:
+            body_start += cut + 1
+        if body_end - body_start < MIN_QUESTION_BODY:
+            continue
+        last_end = end
+
+        # 区间与匹配均按偏移递增，指针只前进不回退
+        while span_index < len(skip_spans) and skip_spans[span_index][1] <= body_start:
+            span_index += 1
+        if span_index < len(skip_spans) and skip_spans[span_index][0] < end:
+            continue
+
+        answer = content[end:end + ANSWER_WINDOW]
+
+        # 清理答案
+        answer = WHITESPACE_PATTERN.sub(' ', answer).strip()
+        if len(answer) > 20:
+            # 截断到句号
+            stop = SENTENCE_END_PATTERN.search(answer)
+            first_sentence = answer[:stop.start()] if stop else answer
+            pairs.append((content[body_start:end].strip(), first_sentence + '。'))
+    return pairs
+
+
+def extract_qa_pairs(content: str) -> List[Tuple[str, str]]:
+    """从页面内容中提取问答对"""
+    if not content:
+        return []
+    faq_pairs, faq_spans = _scan_faq(content)
+    return faq_pairs + extract_question_pairs(content, faq_spans)
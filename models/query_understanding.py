@@ -0,0 +1,226 @@
+import re
+import time
+import logging
+import threading
+from collections import deque
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.admission_qa import (PROVINCE_ALIASES, CATEGORY_ALIASES, SCORE_INTENT_WORDS, SCHOOL_NAMES,
+                                 MIN_ALIAS_LENGTH)
+
+# 同义词组：标准词 -> 其他说法。查询中的任一说法改写为标准词，检索时再扩展为整组
+SYNONYM_GROUPS = {
+    '分数线': ['录取线', '录取分数线', '最低分', '投档线', '录取分', '最低录取分'],
+    '学费': ['学杂费', '学费标准', '收费标准'],
+    '宿舍': ['寝室', '住宿条件', '宿舍条件'],
+    '招生计划': ['招生人数', '计划人数', '招多少人'],
+    '录取结果': ['录取查询', '查录取', '录取状态'],
+    '转专业': ['换专业', '调专业'],
+    '地址': ['校址', '地理位置', '在哪里', '在哪儿'],
+    '官网': ['官方网站', '学校网站', '网址'],
+    '电话': ['联系电话', '联系方式', '咨询电话', '招生电话'],
+}
+
+RELATIVE_YEARS = {'今年': 0, '去年': -1, '前年': -2}
+YEAR_RANGE = range(2000, 2100)
+
+# 从院系页面标题中提取院系名称
+DEPARTMENT_PATTERN = re.compile(r'[\u4e00-\u9fa5]{2,12}?(?:学院|学部|教学部|体育部)')
+
+ENTITY_KINDS = ('year', 'province', 'category', 'major', 'department')
+
+
+class AhoCorasick:
+    """多模式串匹配自动机：构建后对文本做一次线性扫描，找出所有模式的出现位置
+
+    每个模式带一组 (kind, value) 标注，同一模式可多次添加不同标注。
+    """
+
+    def __init__(self):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._labels: List[List[Tuple[str, object]]] = [[]]
+        self._depth: List[int] = [0]
+        # 以该节点结尾的最长模式所在节点（自身或沿失败链的第一个终止节点）
+        self._output: List[int] = [-1]
+
+    def add(self, pattern: str, kind: str, value):
+        node = 0
+        for char in pattern:
+            child = self._goto[node].get(char)
+            if child is None:
+                child = len(self._goto)
+                self._goto[node][char] = child
+                self._goto.append({})
+                self._fail.append(0)
+                self._labels.append([])
+                self._depth.append(self._depth[node] + 1)
+                self._output.append(-1)
+            node = child
+        if (kind, value) not in self._labels[node]:
+            self._labels[node].append((kind, value))
+
+    def build(self) -> 'AhoCorasick':
+        """按广度优先计算失败指针"""
+        queue = deque()
+        for child in self._goto[0].values():
+            self._fail[child] = 0
+            queue.append(child)
+        while queue:
+            node = queue.popleft()
+            fail = self._fail[node]
+            self._output[node] = node if self._labels[node] else self._output[fail]
+            for char, child in self._goto[node].items():
+                state = fail
+                while state and char not in self._goto[state]:
+                    state = self._fail[state]
+                target = self._goto[state].get(char, 0)
+                self._fail[child] = target if target != child else 0
+                queue.append(child)
+        return self
+
+    def longest_matches(self, text: str) -> List[Tuple[int, int, List[Tuple[str, object]]]]:
+        """单次扫描，返回不重叠的最左最长匹配 [(start, end, labels)]"""
+        goto, fail, output, depth, labels = self._goto, self._fail, self._output, self._depth, self._labels
+        candidates = []
+        node = 0
+        for end, char in enumerate(text, 1):
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            hit = output[node]
+            if hit > 0:
+                candidates.append((end - depth[hit], end, labels[hit]))
+        # 同一终点只保留最长模式；再从左到右取不重叠的匹配，起点相同时取较长者
+        candidates.sort(key=lambda m: (m[0], -m[1]))
+        matches = []
+        last_end = 0
+        for start, end, item_labels in candidates:
+            if start >= last_end:
+                matches.append((start, end, item_labels))
+                last_end = end
+        return matches
+
+
+class QueryMatcher:
+    """查询理解：一次扫描抽取年份、省份、科类、专业、院系，识别分数线意图，并把同义说法改写为标准词
+
+    专业取自admission_plans和admission_scores，院系取自院系页面标题，定期从数据库刷新；
+    db为空时只使用静态词表和set_vocabulary提供的词。
+    """
+
+    REFRESH_SECONDS = 600
+
+    def __init__(self, db=None, majors: List[str] = None, departments: List[str] = None):
+        self.db = db
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        self._loaded_at = 0.0
+        self.set_vocabulary(majors or [], departments or [])
+
+    def set_vocabulary(self, majors: List[str], departments: List[str]):
+        """重建自动机（构建完成后整体替换，查询线程不加锁）"""
+        automaton = AhoCorasick()
+        for canonical, aliases in PROVINCE_ALIASES.items():
+            for name in [canonical] + aliases:
+                # 单字简称（如“鲁”“文”）容易误匹配，不参与识别
+                if len(name) >= MIN_ALIAS_LENGTH:
+                    automaton.add(name, 'province', canonical)
+        for canonical, aliases in CATEGORY_ALIASES.items():
+            for name in [canonical] + aliases:
+                if len(name) >= MIN_ALIAS_LENGTH:
+                    automaton.add(name, 'category', canonical)
+        for year in YEAR_RANGE:
+            automaton.add(str(year), 'year', year)
+        for word, offset in RELATIVE_YEARS.items():
+            automaton.add(word, 'relative_year', offset)
+        for word in SCORE_INTENT_WORDS:
+            automaton.add(word, 'score_intent', True)
+        for canonical, aliases in SYNONYM_GROUPS.items():
+            for name in [canonical] + aliases:
+                automaton.add(name, 'synonym', canonical)
+        for major in majors:
+            if major and len(major) >= MIN_ALIAS_LENGTH:
+                automaton.add(major, 'major', major)
+        for department in departments:
+            automaton.add(department, 'department', department)
+        # 校名中含有省份名（黑龙江），作为更长的模式优先匹配后丢弃
+        for name in SCHOOL_NAMES:
+            automaton.add(name, 'school', '学校')
+        self.automaton = automaton.build()
+
+    def refresh(self):
+        """定期从数据库重新加载专业和院系名称，刷新期间其他线程继续使用旧词表"""
+        if self.db is None or time.time() - self._loaded_at < self.REFRESH_SECONDS:
+            return
+        if not self._lock.acquire(blocking=False):
+            return
+        try:
+            self._loaded_at = time.time()
+            rows = self.db.execute_query("""
+                SELECT DISTINCT major FROM admission_plans WHERE major IS NOT NULL AND major != ''
+                UNION
+                SELECT DISTINCT major FROM admission_scores WHERE major IS NOT NULL AND major != ''
+            """)
+            majors = [row['major'] for row in rows]
+            rows = self.db.execute_query("SELECT DISTINCT title FROM crawled_pages WHERE page_type = 'department'")
+            departments = sorted({name for row in rows for name in DEPARTMENT_PATTERN.findall(row['title'] or '')
+                                  if not any(school in name for school in SCHOOL_NAMES)})
+            self.set_vocabulary(majors, departments)
+            self.logger.info(f"Query vocabulary refreshed: {len(majors)} majors, {len(departments)} departments")
+        except Exception as e:
+            self.logger.error(f"Failed to refresh query vocabulary: {str(e)}")
+        finally:
+            self._lock.release()
+
+    def analyze(self, question: str) -> Dict:
+        """返回 {'entities', 'score_intent', 'synonyms', 'canonical', 'expansions'}
+
+        entities中每类实体取第一次出现的值；canonical为同义词、省份、科类改写为标准词后的问题；
+        expansions为命中的同义词组的全部说法，供检索扩展。
+        """
+        self.refresh()
+        question = question or ''
+        entities: Dict[str, Optional[object]] = dict.fromkeys(ENTITY_KINDS)
+        score_intent = False
+        synonyms = []
+        parts = []
+        last = 0
+        for start, end, labels in self.automaton.longest_matches(question):
+            replacement = question[start:end]
+            for kind, value in labels:
+                if kind == 'score_intent':
+                    score_intent = True
+                elif kind == 'synonym':
+                    if value not in synonyms:
+                        synonyms.append(value)
+                    replacement = value
+                elif kind == 'relative_year':
+                    if entities['year'] is None:
+                        entities['year'] = datetime.now().year + value
+                elif kind == 'school':
+                    replacement = value
+                elif entities[kind] is None:
+                    entities[kind] = value
+                    if kind in ('province', 'category'):
+                        replacement = value
+            parts.append(question[last:start])
+            parts.append(replacement)
+            last = end
+        parts.append(question[last:])
+
+        expansions = []
+        for canonical in synonyms:
+            expansions.append(canonical)
+            expansions.extend(SYNONYM_GROUPS[canonical])
+        return {
+            'entities': entities,
+            'score_intent': score_intent,
+            'synonyms': synonyms,
+            'canonical': ''.join(parts),
+            'expansions': expansions
+        }
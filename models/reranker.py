@@ -0,0 +1,115 @@
+import math
+import logging
+from datetime import datetime
+from typing import Dict, List
+import numpy as np
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.config import Config
+from models.corpus_stats import tokenize
+from utils.tracing import traced
+
+# 特征顺序与权重，权重之和为1
+FEATURES = ('overlap', 'bm25', 'retrieval', 'confidence', 'freshness', 'prior')
+FEATURE_WEIGHTS = np.array([0.3, 0.25, 0.15, 0.1, 0.1, 0.1], dtype=np.float32)
+
+# 页面类型先验（spider.classify_url的分类），知识库条目为1.0
+PAGE_TYPE_PRIOR = {
+    'admission': 1.0,
+    'about': 0.9,
+    'academic': 0.8,
+    'department': 0.8,
+    'news': 0.6,
+    'general': 0.5
+}
+KB_PRIOR = 1.0
+PASSAGE_CONFIDENCE = 0.7  # 页面段落没有置信度，按自动抽取的问答对估计
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+
+class Reranker:
+    """从知识库和页面段落各取一批候选，统一打分后返回一个有序列表
+
+    每个候选返回原始行，附加 kind（kb/passage）和 rerank_score。
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self.logger = logging.getLogger(__name__)
+
+    def retrieve(self, question: str, limit: int = None, candidates: int = None) -> List[Dict]:
+        """检索并重排，返回前limit个候选"""
+        candidates = candidates or Config.RERANK_CANDIDATES
+        rows = [dict(row, kind='kb') for row in self.db.get_knowledge_base(question, limit=candidates)]
+        rows += [dict(row, kind='passage') for row in self.db.search_passages(question, limit=candidates)]
+        return self.rerank(question, rows, limit or Config.RERANK_TOP_K)
+
+    @traced('rerank')
+    def rerank(self, question: str, rows: List[Dict], limit: int) -> List[Dict]:
+        if not rows:
+            return []
+        scores = self.features(question, rows) @ FEATURE_WEIGHTS
+        order = np.argsort(-scores, kind='stable')[:limit]
+        ranked = []
+        for i in order:
+            rows[i]['rerank_score'] = round(float(scores[i]), 4)
+            ranked.append(rows[i])
+        return ranked
+
+    def features(self, question: str, rows: List[Dict]) -> np.ndarray:
+        """候选特征矩阵（候选数 x 特征数），各特征取值在0~1"""
+        texts = [candidate_text(row) for row in rows]
+        terms = list(dict.fromkeys(tokenize(question)))
+        matrix = np.zeros((len(rows), len(FEATURES)), dtype=np.float32)
+
+        if terms:
+            # 词频按子串计数，候选文本不再分词
+            tf = np.array([[text.count(term) for term in terms] for text in texts], dtype=np.float32)
+            idf = self.term_weights(terms, tf)
+            matrix[:, 0] = ((tf > 0) @ idf) / idf.sum()
+            doc_len = np.array([len(text) for text in texts], dtype=np.float32)
+            avg_len = max(float(doc_len.mean()), 1.0)
+            saturation = tf * (BM25_K1 + 1) / (tf + BM25_K1 * (1 - BM25_B + BM25_B * doc_len / avg_len)[:, None])
+            bm25 = saturation @ idf
+            if bm25.max() > 0:
+                matrix[:, 1] = bm25 / bm25.max()
+
+        kinds = np.array([row['kind'] == 'kb' for row in rows])
+        relevance = np.array([float(row.get('relevance') or 0) for row in rows], dtype=np.float32)
+        # 知识库相关度为1.0~3.0，段落相关度（全文检索得分）按本次最大值归一化
+        matrix[kinds, 2] = np.clip(relevance[kinds] / 3.0, 0, 1)
+        if (~kinds).any() and relevance[~kinds].max() > 0:
+            matrix[~kinds, 2] = np.clip(relevance[~kinds] / relevance[~kinds].max(), 0, 1)
+
+        matrix[:, 3] = [min(max(float(row.get('confidence_score') or 0), 0.0), 1.0) if row['kind'] == 'kb'
+                        else PASSAGE_CONFIDENCE for row in rows]
+        now = datetime.now()
+        matrix[:, 4] = [freshness(row.get('update_time'), now) for row in rows]
+        matrix[:, 5] = [KB_PRIOR if row['kind'] == 'kb' else PAGE_TYPE_PRIOR.get(row.get('page_type'), 0.5)
+                        for row in rows]
+        return matrix
+
+    def term_weights(self, terms: List[str], tf: np.ndarray) -> np.ndarray:
+        """问题词项的IDF，取自索引快照的语料词典；没有快照时用候选集估计"""
+        snapshot = self.db.get_index_snapshot()
+        if snapshot is not None and snapshot.max_idf is not None:
+            return snapshot.idf_of(terms)
+        doc_freq = np.count_nonzero(tf, axis=0)
+        return np.log((len(tf) + 1) / (doc_freq + 1)).astype(np.float32) + 1.0
+
+def candidate_text(row: Dict) -> str:
+    if row['kind'] == 'kb':
+        return f"{row.get('question') or ''}\n{row.get('answer') or ''}"
+    return f"{row.get('title') or ''}\n{row.get('content') or ''}"
+
+
+def freshness(update_time, now: datetime) -> float:
+    """按更新时间指数衰减，半衰期为RERANK_HALF_LIFE_DAYS，时间未知时取0.5"""
+    if not isinstance(update_time, datetime):
+        return 0.5
+    age_days = max((now - update_time).total_seconds(), 0) / 86400
+    return math.pow(0.5, age_days / Config.RERANK_HALF_LIFE_DAYS)
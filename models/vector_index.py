@@ -0,0 +1,117 @@
+import re
+import zlib
+from typing import List, Tuple
+import numpy as np
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_NUMBER_PATTERN = re.compile(r'\d+')
+_NOISE_PATTERN = re.compile(r'[\s　，。！？、；：“”‘’（）【】《》,.!?;:()\[\]"\'-]+')
+
+
+class HashedNgramEncoder:
+    """字符n-gram哈希向量，经固定随机矩阵投影为稠密向量，可离线在CPU上计算"""
+
+    def __init__(self, hash_dim: int = 8192, dim: int = 384, ngram_range: Tuple[int, int] = (1, 2),
+                 number_weight: float = 2.0, seed: int = 20240601, projection: np.ndarray = None):
+        self.hash_dim = hash_dim
+        self.dim = dim
+        self.ngram_range = tuple(ngram_range)
+        self.number_weight = number_weight
+        self.seed = seed
+        if projection is None:
+            rng = np.random.default_rng(seed)
+            # 高斯随机投影近似保持向量间的夹角
+            projection = (rng.standard_normal((hash_dim, dim)) / np.sqrt(dim)).astype(np.float32)
+        # 可传入索引快照中映射的矩阵，省去每个进程重新生成
+        self.projection = projection
+
+    def config(self) -> dict:
+        return {
+            'hash_dim': self.hash_dim,
+            'dim': self.dim,
+            'ngram_range': list(self.ngram_range),
+            'number_weight': self.number_weight,
+            'seed': self.seed
+        }
+
+    def features(self, text: str) -> List[Tuple[str, float]]:
+        """提取特征：字符n-gram，以及整体数字（年份等）"""
+        text = _NOISE_PATTERN.sub('', text.lower())
+        feats = []
+        low, high = self.ngram_range
+        for n in range(low, high + 1):
+            # 单字权重较低，主要用于兜底
+            weight = 0.5 if n == 1 else 1.0
+            for i in range(len(text) - n + 1):
+                feats.append((text[i:i + n], weight))
+        for number in _NUMBER_PATTERN.findall(text):
+            feats.append(('#' + number, self.number_weight))
+        return feats
+
+    def hash_vector(self, text: str) -> np.ndarray:
+        vec = np.zeros(self.hash_dim, dtype=np.float32)
+        for feat, weight in self.features(text):
+            h = zlib.crc32(feat.encode('utf-8'))
+            # 用哈希的最高位作为符号，减小碰撞带来的偏差
+            sign = 1.0 if h & 0x80000000 else -1.0
+            vec[h % self.hash_dim] += sign * weight
+        return vec
+
+    def hash_matrix(self, texts: List[str]) -> np.ndarray:
+        if not texts:
+            return np.zeros((0, self.hash_dim), dtype=np.float32)
+        return np.stack([self.hash_vector(t or '') for t in texts])
+
+    def fit_idf(self, hashed: np.ndarray) -> np.ndarray:
+        """按哈希桶统计文档频率，模板化的公共片段（如“录取”）权重降低"""
+        doc_freq = np.count_nonzero(hashed, axis=0)
+        return (np.log((len(hashed) + 1) / (doc_freq + 1)) + 1.0).astype(np.float32)
+
+    def encode(self, texts: List[str], idf: np.ndarray = None, hashed: np.ndarray = None) -> np.ndarray:
+        """批量编码为L2归一化的向量"""
+        if hashed is None:
+            hashed = self.hash_matrix(texts)
+        if idf is not None:
+            hashed = hashed * idf
+        dense = hashed @ self.projection
+        norms = np.linalg.norm(dense, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return (dense / norms).astype(np.float32)
+
+
+class VectorIndex:
+    """稠密向量索引（数组通常是索引快照的内存映射视图），支持top-k余弦相似度检索"""
+
+    def __init__(self, ids: np.ndarray, vectors: np.ndarray, idf: np.ndarray, encoder: HashedNgramEncoder):
+        self.ids = ids
+        self.vectors = vectors
+        self.idf = idf
+        self.encoder = encoder
+
+    def search(self, text: str, k: int = 5, min_score: float = 0.0) -> List[Tuple[int, float]]:
+        """返回最相似的k个(条目ID, 余弦相似度)"""
+        if not len(self.ids):
+            return []
+        query = self.encoder.encode([text], idf=self.idf)[0]
+        scores = self.vectors @ query
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(self.ids[i]), float(scores[i])) for i in top if scores[i] >= min_score]
+
+
+def encode_entries(entries: List[Tuple[int, str]], encoder: HashedNgramEncoder = None) -> VectorIndex:
+    """编码(条目ID, 文本)列表，IDF由这批文本拟合"""
+    encoder = encoder or HashedNgramEncoder()
+    ids = np.array([entry_id for entry_id, _ in entries], dtype=np.int64)
+    hashed = encoder.hash_matrix([text for _, text in entries])
+    idf = encoder.fit_idf(hashed)
+    vectors = encoder.encode(None, idf=idf, hashed=hashed)
+    return VectorIndex(ids, vectors, idf, encoder)
+
+
+def knowledge_entry_text(row: dict) -> str:
+    """知识条目用于向量化的文本：问题加关键词"""
+    return f"{row.get('question') or ''} {row.get('keywords') or ''}".strip()
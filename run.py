@@ -20,25 +20,23 @@ warnings.filterwarnings("ignore", category=UserWarning, module="jieba")
 project_root = Path(__file__).parent
 sys.path.insert(0, str(project_root))
 
+# 各子命令只导入自己用到的模块（爬虫依赖BeautifulSoup，知识库构建依赖jieba.analyse，导入都较慢）
 from config.config import Config
-from api.app import app
-from database.db_manager import DatabaseManager
-from crawler.spider import HLJEUSpider
-from models.knowledge_builder import KnowledgeBuilder
+from utils.metrics_dir import is_production_server, prepare_metrics_dir
+
+# 生产模式的多进程指标目录须在导入prometheus_client之前设置（检查数据库时就会导入）
+if is_production_server(sys.argv[1:]):
+    prepare_metrics_dir()
+
+from utils.logging_setup import setup_logging
 
 # 配置日志
-logging.basicConfig(
-    level=getattr(logging, Config.LOG_LEVEL),
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler(Config.LOG_FILE),
-        logging.StreamHandler()
-    ]
-)
+setup_logging()
 logger = logging.getLogger(__name__)
 
 def check_database():
     """检查数据库连接"""
+    from database.db_manager import DatabaseManager
     try:
         db = DatabaseManager()
         stats = db.get_statistics()
@@ -65,22 +63,85 @@ def init_system():
     logger.info("System initialized successfully")
     return True
 
+def run_job(job_type: str):
+    """在当前进程执行后台任务；与Web管理接口和后台任务进程共用jobs表，同类任务不会同时运行"""
+    from api.worker import JobWorker
+    job = JobWorker().run_inline(job_type)
+    if job and job['status'] == 'failed':
+        logger.error(f"Job {job['id']} ({job_type}) failed: {job.get('error_message')}")
+    return job
+
 def run_crawler():
     """运行爬虫"""
     logger.info("Starting crawler...")
-    spider = HLJEUSpider()
-    spider.start_crawling()
-    logger.info("Crawler completed")
+    job = run_job('crawl')
+    if job and job['status'] == 'completed':
+        logger.info("Crawler completed")
 
 def build_knowledge():
     """构建知识库"""
     logger.info("Building knowledge base...")
-    builder = KnowledgeBuilder()
-    stats = builder.build_all()
-    logger.info(f"Knowledge base built. Entries: {stats.get('knowledge_entries', 0)}")
+    job = run_job('build_knowledge')
+    if job and job['status'] == 'completed':
+        result = job.get('result') or {}
+        logger.info(f"Knowledge base built. Entries: {result.get('knowledge_entries', 0)}")
+        if result.get('precompute_job'):
+            logger.info(f"Answer precompute job {result['precompute_job']} queued; "
+                        f"run 'python run.py worker' or 'python run.py precompute' to execute it")
 
-def run_server():
+def precompute_answers():
+    """为近期的热门问题预生成大模型答案"""
+    logger.info("Precomputing answers for top questions...")
+    job = run_job('precompute_answers')
+    if job and job['status'] == 'completed':
+        logger.info(f"Answers precomputed: {job.get('result')}")
+
+def run_worker(args):
+    """运行后台任务进程：执行管理接口提交的任务，并按system_config定时提交爬取任务"""
+    from api.worker import JobWorker
+    worker = JobWorker()
+    if args.once:
+        worker.jobs.recover_stale()
+        worker.schedule()
+        logger.info(f"Executed {worker.run_pending()} pending job(s)")
+        return
+    worker.run_forever()
+
+def ingest_scores(args):
+    """流式导入招生办导出的录取分数表（CSV/XLSX），并更新涉及的知识库条目"""
+    import json
+    from database.db_manager import DatabaseManager
+    from models.admission_ingest import ScoreIngester
+    
+    path = args.target or args.file
+    if not path or not os.path.exists(path):
+        logger.error(f"Score file not found: {path}")
+        return
+    db = DatabaseManager()
+    ingester = ScoreIngester(db, chunk_size=args.chunk_size, replace=args.replace, dry_run=args.dry_run)
+    try:
+        report = ingester.ingest(path, sheet=args.sheet)
+    except (RuntimeError, ValueError) as e:
+        logger.error(f"Ingest failed: {str(e)}")
+        return
+    finally:
+        db.close()
+    for sample in ingester.samples:
+        logger.warning(f"Rejected {sample}")
+    logger.info(f"Ingested {report['rows_written']}/{report['rows_read']} rows from {path} "
+                f"({report['rows_per_second']:.0f} rows/s, {report['scopes']} year/province scopes)")
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+def run_server(args=None):
     """运行Web服务器"""
+    if (args is not None and args.prod) or Config.SERVER_MODE == 'production':
+        run_production_server(args)
+        return
+    from api.app import create_app, warm_up
+    app = create_app()
+    # 调试模式下重载器的监控进程不处理请求，只在实际服务的子进程中预热
+    if not Config.FLASK_DEBUG or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        warm_up()
     logger.info(f"Starting web server on {Config.FLASK_HOST}:{Config.FLASK_PORT}")
     app.run(
         host=Config.FLASK_HOST,
@@ -88,16 +149,101 @@ def run_server():
         debug=Config.FLASK_DEBUG
     )
 
+def run_production_server(args=None):
+    """以gunicorn预派生多进程方式运行Web服务器"""
+    try:
+        from api import server
+    except ImportError:
+        logger.error("gunicorn is not installed (pip install gunicorn); it is not available on Windows")
+        return
+    server.run(
+        workers=getattr(args, 'workers', None),
+        threads=getattr(args, 'threads', None),
+        max_requests=getattr(args, 'max_requests', None),
+        bind=getattr(args, 'bind', None)
+    )
+
+def ask_questions(args):
+    """批量回答文件中的问题（每行一个），结果以JSON Lines输出"""
+    import json
+    import time
+    from api.app import services
+    from api.chat_service import BatchAnswerer
+    from utils.text import question_fingerprint
+    
+    with open(args.file, 'r', encoding='utf-8') as f:
+        questions = [line.strip() for line in f if line.strip() and not line.startswith('#')]
+    if not questions:
+        logger.error(f"No questions found in {args.file}")
+        return
+    
+    batch_answerer = services.batch_answerer
+    answerer = batch_answerer
+    if args.concurrency:
+        answerer = BatchAnswerer(batch_answerer.db, batch_answerer.llm_router, batch_answerer.fast_path,
+                                 concurrency=args.concurrency, reranker=batch_answerer.reranker)
+    
+    output = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+    start = time.time()
+    count = 0
+    try:
+        for item in answerer.run(questions):
+            output.write(json.dumps(item, ensure_ascii=False, default=str) + '\n')
+            output.flush()
+            count += 1
+    finally:
+        if args.output:
+            output.close()
+    elapsed = time.time() - start
+    unique = len({question_fingerprint(q) for q in questions})
+    logger.info(f"Answered {count} questions ({unique} distinct) in {elapsed:.1f}s "
+                f"({count / elapsed if elapsed else 0:.2f} questions/s)")
+
+def reload_server():
+    """通知gunicorn主进程平滑重启worker"""
+    import signal
+    try:
+        with open(Config.SERVER_PID_FILE) as f:
+            pid = int(f.read().strip())
+        os.kill(pid, signal.SIGHUP)
+        logger.info(f"Sent SIGHUP to server master (pid: {pid})")
+    except (OSError, ValueError) as e:
+        logger.error(f"Failed to reload server: {str(e)}")
+
 def main():
     """主函数"""
     parser = argparse.ArgumentParser(description='东方智答系统管理工具')
-    parser.add_argument('command', choices=['init', 'crawl', 'build', 'server', 'all'],
+    parser.add_argument('command', choices=['init', 'crawl', 'build', 'precompute', 'ingest-scores', 'server', 'worker', 'reload', 'ask',
+                                'all'],
                        help='要执行的命令')
+    parser.add_argument('target', nargs='?',
+                       help='ingest-scores命令的录取分数文件（.csv/.xlsx）')
     parser.add_argument('--force', action='store_true',
                        help='强制执行，忽略警告')
+    parser.add_argument('--prod', action='store_true',
+                       help='server命令使用gunicorn多进程生产模式')
+    parser.add_argument('--workers', type=int, help='生产模式worker进程数')
+    parser.add_argument('--threads', type=int, help='生产模式每个worker的线程数')
+    parser.add_argument('--max-requests', type=int, help='worker处理多少请求后回收，0为不回收')
+    parser.add_argument('--bind', help='生产模式监听地址，如 0.0.0.0:5001')
+    parser.add_argument('--once', action='store_true',
+                       help='worker命令只执行当前待执行的任务后退出')
+    parser.add_argument('--sheet', help='ingest-scores命令读取的工作表，默认第一个')
+    parser.add_argument('--chunk-size', type=int, default=2000, help='ingest-scores命令每批写入的行数')
+    parser.add_argument('--replace', action='store_true',
+                       help='ingest-scores命令先删除文件涉及的年份/省份的已有分数数据')
+    parser.add_argument('--dry-run', action='store_true', help='ingest-scores命令只校验，不写入数据库')
+    parser.add_argument('--file', help='ask命令的问题文件，每行一个问题')
+    parser.add_argument('--output', help='ask命令的结果文件（JSON Lines），默认输出到标准输出')
+    parser.add_argument('--concurrency', type=int, help='ask命令同时调用大模型的问题数')
     
     args = parser.parse_args()
     
+    # 重载只需向运行中的主进程发信号
+    if args.command == 'reload':
+        reload_server()
+        return
+    
     # 初始化系统
     if not init_system() and not args.force:
         logger.error("System initialization failed. Use --force to continue anyway.")
@@ -105,6 +251,11 @@ def main():
     
     # 执行命令
     if args.command == 'init':
+        from database.db_manager import DatabaseManager
+        db = DatabaseManager()
+        backfilled = db.backfill_question_fingerprints()
+        db.close()
+        logger.info(f"Backfilled {backfilled} question fingerprints")
         logger.info("System initialization completed")
     
     elif args.command == 'crawl':
@@ -113,8 +264,23 @@ def main():
     elif args.command == 'build':
         build_knowledge()
     
+    elif args.command == 'precompute':
+        precompute_answers()
+    
+    elif args.command == 'ingest-scores':
+        ingest_scores(args)
+    
     elif args.command == 'server':
-        run_server()
+        run_server(args)
+    
+    elif args.command == 'worker':
+        run_worker(args)
+    
+    elif args.command == 'ask':
+        if not args.file:
+            logger.error("Please specify the question file with --file")
+            return
+        ask_questions(args)
     
     elif args.command == 'all':
         # 执行完整流程
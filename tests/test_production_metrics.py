@@ -0,0 +1,50 @@
+"""
+生产模式（run.py server --prod）下 /metrics 汇总多进程指标
+"""
+
+import os
+import sys
+import subprocess
+import textwrap
+
+import pytest
+
+pytest.importorskip('prometheus_client')
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 按run.py的导入顺序：模块顶层设置指标目录，然后检查数据库（导入prometheus_client），最后记录请求指标
+SCRIPT = textwrap.dedent("""
+    import sys
+    sys.argv = ['run.py', 'server', '--prod']
+    import run
+    assert run.check_database()
+
+    from utils import tracing
+    trace = tracing.start_trace()
+    with tracing.span('kb_search'):
+        pass
+    tracing.finish_trace(trace, 'chat', 200)
+
+    payload, _ = tracing.metrics_payload()
+    sys.stdout.write(payload.decode('utf-8'))
+""")
+
+
+def test_metrics_payload_covers_multiprocess_dir(tmp_path):
+    metrics_dir = tmp_path / 'prometheus'
+    metrics_dir.mkdir()
+    # 上次运行残留的文件在启动时清除
+    (metrics_dir / 'histogram_1.db').write_bytes(b'stale')
+    env = dict(os.environ, DB_BACKEND='sqlite', SQLITE_PATH=str(tmp_path / 'test.db'),
+               DATA_DIR=str(tmp_path), PROMETHEUS_MULTIPROC_DIR=str(metrics_dir), LOG_FILE=str(tmp_path / 'test.log'))
+    env.pop('SERVER_MODE', None)
+
+    result = subprocess.run([sys.executable, '-c', SCRIPT], cwd=PROJECT_ROOT, env=env,
+                            capture_output=True, text=True, timeout=120)
+
+    assert result.returncode == 0, result.stderr
+    assert 'hlg_stage_duration_seconds' in result.stdout
+    assert 'hlg_request_duration_seconds_count{endpoint="chat"' in result.stdout
+    assert not (metrics_dir / 'histogram_1.db').exists()
+    assert any(name.endswith('.db') for name in os.listdir(metrics_dir))
@@ -0,0 +1,115 @@
+"""
+请求准入控制：并发限制（带有界等待队列）与按键限速的令牌桶
+"""
+
+import time
+import threading
+from collections import OrderedDict
+from typing import Dict
+
+
+class ConcurrencyLimiter:
+    """限制同时执行的请求数，超出时最多排队max_queue个，等待超时或队列已满则拒绝"""
+
+    def __init__(self, max_concurrent: int, max_queue: int = 0, queue_timeout: float = 1.0):
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_queue = max(0, max_queue)
+        self.queue_timeout = queue_timeout
+        self._cond = threading.Condition()
+        self.active = 0
+        self.waiting = 0
+        self._stats = {'admitted': 0, 'queued': 0, 'shed_queue_full': 0, 'shed_timeout': 0, 'peak_waiting': 0}
+
+    def acquire(self) -> bool:
+        """申请一个执行名额，成功后须调用release"""
+        with self._cond:
+            # 有人排队时新请求也要排队，避免插队
+            if self.active < self.max_concurrent and self.waiting == 0:
+                self.active += 1
+                self._stats['admitted'] += 1
+                return True
+            if self.waiting >= self.max_queue:
+                self._stats['shed_queue_full'] += 1
+                return False
+
+            self.waiting += 1
+            self._stats['queued'] += 1
+            self._stats['peak_waiting'] = max(self._stats['peak_waiting'], self.waiting)
+            deadline = time.monotonic() + self.queue_timeout
+            try:
+                while self.active >= self.max_concurrent:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._stats['shed_timeout'] += 1
+                        return False
+                    self._cond.wait(remaining)
+                self.active += 1
+                self._stats['admitted'] += 1
+                return True
+            finally:
+                self.waiting -= 1
+
+    def saturated(self) -> bool:
+        """排队已满、acquire会立即被拒绝时返回True（不等待，计入shed_queue_full），用于在检索等准备工作之前降级"""
+        with self._cond:
+            full = (self.active >= self.max_concurrent or self.waiting > 0) and self.waiting >= self.max_queue
+            if full:
+                self._stats['shed_queue_full'] += 1
+            return full
+
+    def release(self):
+        with self._cond:
+            self.active -= 1
+            self._cond.notify()
+
+    def get_stats(self) -> Dict:
+        with self._cond:
+            stats = dict(self._stats)
+            stats.update({
+                'active': self.active,
+                'waiting': self.waiting,
+                'max_concurrent': self.max_concurrent,
+                'max_queue': self.max_queue,
+                'shed': self._stats['shed_queue_full'] + self._stats['shed_timeout']
+            })
+        return stats
+
+
+class KeyedRateLimiter:
+    """按键（会话ID、IP等）独立计数的令牌桶，长期不活跃的键按LRU淘汰"""
+
+    def __init__(self, rate: float, burst: int, max_keys: int = 10000):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        # 键 -> [剩余令牌, 上次更新时间]
+        self.buckets: OrderedDict = OrderedDict()
+        self.limited = 0
+
+    def acquire(self, key: str) -> float:
+        """取一个令牌，返回0表示放行，否则为需要等待的秒数"""
+        if self.rate <= 0 or not key:
+            return 0.0
+        now = time.monotonic()
+        with self._lock:
+            bucket = self.buckets.get(key)
+            if bucket is None:
+                bucket = self.buckets[key] = [float(self.burst), now]
+                while len(self.buckets) > self.max_keys:
+                    self.buckets.popitem(last=False)
+            else:
+                self.buckets.move_to_end(key)
+                bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+                bucket[1] = now
+
+            if bucket[0] >= 1.0:
+                bucket[0] -= 1.0
+                return 0.0
+            self.limited += 1
+            return (1.0 - bucket[0]) / self.rate
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return {'limited': self.limited, 'tracked_keys': len(self.buckets),
+                    'rate': self.rate, 'burst': self.burst}
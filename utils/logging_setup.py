@@ -0,0 +1,168 @@
+"""
+日志配置：请求线程只把日志记录放入队列，由后台线程统一格式化并写入控制台和文件
+"""
+
+import os
+import time
+import queue
+import atexit
+import logging
+import threading
+from contextvars import ContextVar
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.config import Config
+
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - [%(request_id)s] %(message)s'
+
+# 当前请求ID，日志记录时写入record.request_id
+request_id_var: ContextVar[str] = ContextVar('request_id', default='-')
+
+_listener: Optional[QueueListener] = None
+_queue_handler: Optional['DroppingQueueHandler'] = None
+_setup_lock = threading.Lock()
+
+
+def set_request_id(request_id: str):
+    request_id_var.set(request_id or '-')
+
+
+def get_request_id() -> str:
+    return request_id_var.get()
+
+
+class RequestIdFilter(logging.Filter):
+    """在调用方线程中记录请求ID"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        return True
+
+
+class VerboseRateLimitFilter(logging.Filter):
+    """按调用位置限制INFO及以下级别日志的速率，WARNING及以上不受限制
+
+    每个调用位置一个令牌桶，被丢弃的条数附加在下一条放行的日志末尾。
+    """
+
+    def __init__(self, per_second: float, burst: int = None):
+        super().__init__()
+        self.per_second = per_second
+        self.burst = burst or max(1, int(per_second * 2))
+        self._buckets: Dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.per_second <= 0 or record.levelno >= logging.WARNING:
+            return True
+        key = (record.pathname, record.lineno)
+        now = time.monotonic()
+        with self._lock:
+            # [令牌数, 上次更新时间, 被丢弃条数]
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = [float(self.burst), now, 0]
+            else:
+                bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.per_second)
+                bucket[1] = now
+            if bucket[0] < 1.0:
+                bucket[2] += 1
+                return False
+            bucket[0] -= 1.0
+            suppressed, bucket[2] = bucket[2], 0
+        if suppressed:
+            record.msg = f"{record.getMessage()} (省略同类日志{suppressed}条)"
+            record.args = None
+        return True
+
+
+class DroppingQueueHandler(QueueHandler):
+    """队列满时丢弃日志而不是阻塞请求线程"""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def parse_levels(spec: str) -> Dict[str, int]:
+    """解析子系统日志级别，如 "models.deepseek_client=WARNING,crawler=DEBUG" """
+    levels = {}
+    for item in (spec or '').split(','):
+        if '=' not in item:
+            continue
+        name, level = item.split('=', 1)
+        level = logging.getLevelName(level.strip().upper())
+        if isinstance(level, int):
+            levels[name.strip()] = level
+    return levels
+
+
+def _build_handlers():
+    formatter = logging.Formatter(LOG_FORMAT)
+    handlers = [logging.StreamHandler()]
+    if Config.LOG_FILE:
+        handlers.append(logging.FileHandler(Config.LOG_FILE, encoding='utf-8'))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+    return handlers
+
+
+def _start_listener():
+    """创建队列和后台写日志线程"""
+    global _listener
+    log_queue = queue.Queue(maxsize=Config.LOG_QUEUE_SIZE)
+    _queue_handler.queue = log_queue
+    _listener = QueueListener(log_queue, *_build_handlers(), respect_handler_level=True)
+    _listener.start()
+
+
+def _after_fork_in_child():
+    # 线程不会被fork复制：子进程（如gunicorn worker）需要重新启动写日志线程
+    if _queue_handler is not None:
+        _start_listener()
+
+
+def stop_logging():
+    """停止后台线程，写完队列中剩余的日志"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def setup_logging():
+    """配置根日志器，重复调用无副作用"""
+    global _queue_handler
+    with _setup_lock:
+        if _queue_handler is not None:
+            return
+        root = logging.getLogger()
+        root.setLevel(getattr(logging, Config.LOG_LEVEL.upper(), logging.INFO))
+        for name, level in parse_levels(Config.LOG_LEVELS).items():
+            logging.getLogger(name).setLevel(level)
+
+        _queue_handler = DroppingQueueHandler(queue.Queue(maxsize=Config.LOG_QUEUE_SIZE))
+        _queue_handler.addFilter(RequestIdFilter())
+        _queue_handler.addFilter(VerboseRateLimitFilter(Config.LOG_VERBOSE_PER_SECOND))
+        root.addHandler(_queue_handler)
+        _start_listener()
+
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=_after_fork_in_child)
+        atexit.register(stop_logging)
+
+
+def get_logging_stats() -> Dict:
+    return {
+        'queued': _queue_handler.queue.qsize() if _queue_handler else 0,
+        'dropped': _queue_handler.dropped if _queue_handler else 0
+    }
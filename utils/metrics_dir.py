@@ -0,0 +1,40 @@
+"""
+多进程Prometheus指标目录：gunicorn生产模式下各worker的指标写入该目录，/metrics汇总全部worker
+"""
+
+import os
+import sys
+import glob
+import logging
+
+from config.config import Config
+
+logger = logging.getLogger(__name__)
+
+_prepared = None
+
+
+def is_production_server(argv) -> bool:
+    """命令行是否以生产模式启动Web服务（run.py server --prod 或 SERVER_MODE=production）"""
+    return 'server' in argv and ('--prod' in argv or Config.SERVER_MODE == 'production')
+
+
+def prepare_metrics_dir() -> str:
+    """设置并清空指标目录，同一进程只执行一次
+
+    prometheus_client在导入时决定指标值的存储方式，必须在任何模块导入它之前调用
+    （utils.tracing在导入时创建直方图，数据库查询也会计入指标）。
+    """
+    global _prepared
+    if _prepared:
+        return _prepared
+    if 'prometheus_client' in sys.modules:
+        logger.warning("prometheus_client was imported before PROMETHEUS_MULTIPROC_DIR was set; "
+                       "/metrics will only cover the worker serving the scrape")
+    path = os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', Config.PROMETHEUS_MULTIPROC_DIR)
+    os.makedirs(path, exist_ok=True)
+    # 上次运行的worker已不存在，残留文件会让计数重复累加
+    for stale in glob.glob(os.path.join(path, '*.db')):
+        os.remove(stale)
+    _prepared = path
+    return path
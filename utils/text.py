@@ -0,0 +1,28 @@
+"""
+文本处理工具
+"""
+
+import re
+import hashlib
+import unicodedata
+
+_PUNCTUATION_PATTERN = re.compile(r'[\s\W_]+', re.UNICODE)
+# 句首客套语和句尾语气词不影响问题含义
+_PREFIX_PATTERN = re.compile(r'^(你好|您好|请问|想问一下|想问|我想知道|问一下)+')
+_SUFFIX_PATTERN = re.compile(r'(吗|呢|呀|啊|吧|么|啦)+$')
+_SCHOOL_PATTERN = re.compile(r'(黑龙江东方学院|东方学院|贵校|你们学校|学校的|你校)')
+
+
+def normalize_question(question: str) -> str:
+    """归一化问题文本：全角转半角、去标点空白、去客套语和语气词"""
+    text = unicodedata.normalize('NFKC', question or '').lower()
+    text = _PUNCTUATION_PATTERN.sub('', text)
+    text = _PREFIX_PATTERN.sub('', text)
+    text = _SUFFIX_PATTERN.sub('', text)
+    text = _SCHOOL_PATTERN.sub('学校', text)
+    return text
+
+
+def question_fingerprint(question: str) -> str:
+    """问题指纹：归一化文本的哈希前16位"""
+    return hashlib.md5(normalize_question(question).encode('utf-8')).hexdigest()[:16]
@@ -0,0 +1,144 @@
+"""
+轻量级分阶段耗时统计：请求内记录各阶段span，导出为Prometheus直方图和Server-Timing响应头
+"""
+
+import os
+import time
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Dict, List, Optional, Tuple
+
+try:
+    from prometheus_client import CollectorRegistry, Histogram, CONTENT_TYPE_LATEST, generate_latest, multiprocess
+    PROMETHEUS_AVAILABLE = True
+except ImportError:
+    PROMETHEUS_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# 覆盖从几毫秒的数据库查询到数十秒的大模型调用
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+if PROMETHEUS_AVAILABLE:
+    STAGE_SECONDS = Histogram('hlg_stage_duration_seconds', '各处理阶段耗时',
+                              ['stage', 'source'], buckets=BUCKETS)
+    REQUEST_SECONDS = Histogram('hlg_request_duration_seconds', '接口请求总耗时',
+                                ['endpoint', 'status', 'source'], buckets=BUCKETS)
+
+
+class Trace:
+    """一次请求内的span记录"""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.spans: List[Tuple[str, float]] = []
+        self.source = 'none'
+
+    def add(self, stage: str, seconds: float):
+        # list.append是原子操作，对冲请求的线程也可以安全写入
+        self.spans.append((stage, seconds))
+
+    def totals(self) -> Dict[str, float]:
+        """按阶段合并耗时（如一次请求中的多次数据库查询），保持首次出现的顺序"""
+        totals: Dict[str, float] = {}
+        for stage, seconds in self.spans:
+            totals[stage] = totals.get(stage, 0.0) + seconds
+        return totals
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.start
+
+
+_current_trace: ContextVar[Optional[Trace]] = ContextVar('current_trace', default=None)
+# 当前所在span的子span耗时合计（单元素列表，子span结束时累加）
+_parent_children: ContextVar[Optional[List[float]]] = ContextVar('parent_children', default=None)
+
+
+def start_trace() -> Trace:
+    trace = Trace()
+    _current_trace.set(trace)
+    return trace
+
+
+def current_trace() -> Optional[Trace]:
+    return _current_trace.get()
+
+
+def set_source(source: str):
+    """记录本次请求的答案来源，作为指标标签"""
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.source = source or 'none'
+
+
+def record(stage: str, seconds: float):
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add(stage, seconds)
+    elif PROMETHEUS_AVAILABLE:
+        # 请求之外（爬虫、知识库构建）直接计入指标
+        STAGE_SECONDS.labels(stage, 'none').observe(seconds)
+
+
+@contextmanager
+def span(stage: str):
+    """记录阶段的自身耗时：嵌套的子span（如kb_search中的db）不重复计入父span，各阶段之和不超过请求总耗时"""
+    parent = _parent_children.get()
+    children = [0.0]
+    token = _parent_children.set(children)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        duration = time.perf_counter() - start
+        _parent_children.reset(token)
+        if parent is not None:
+            parent[0] += duration
+        # 对冲请求的子span在其他线程中并行执行，合计可能超过父span
+        record(stage, max(duration - children[0], 0.0))
+
+
+def traced(stage: str):
+    """函数耗时记为一个span"""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def finish_trace(trace: Trace, endpoint: str, status: int) -> str:
+    """结束请求：写入指标，返回Server-Timing头的内容"""
+    _current_trace.set(None)
+    elapsed = trace.elapsed()
+    totals = trace.totals()
+    if PROMETHEUS_AVAILABLE:
+        try:
+            for stage, seconds in totals.items():
+                STAGE_SECONDS.labels(stage, trace.source).observe(seconds)
+            REQUEST_SECONDS.labels(endpoint or 'unknown', str(status), trace.source).observe(elapsed)
+        except Exception as e:
+            logger.error(f"Failed to record metrics: {str(e)}")
+
+    entries = [f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in totals.items()]
+    entries.append(f"total;dur={elapsed * 1000:.1f}")
+    return ', '.join(entries)
+
+
+def metrics_payload() -> Tuple[bytes, str]:
+    """Prometheus文本格式的指标；多进程部署时合并各worker的数据"""
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(), CONTENT_TYPE_LATEST
+
+
+def mark_process_dead(pid: int):
+    """gunicorn回收worker后清理其多进程指标文件"""
+    if PROMETHEUS_AVAILABLE and os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        multiprocess.mark_process_dead(pid)